@@ -0,0 +1,67 @@
+"""
+Benchmark of HTML table parsing: BeautifulSoup + pandas.read_html (get_table_data_using_soup)
+against single pass parser (get_table_data_using_parser) on synthetic tables
+
+python -m benchmarks.html_table_parsing --rows 10000 --columns 8
+"""
+import argparse
+import random
+import time
+from draftcoreatqc.ui.locator import Locators
+from draftcoreatqc.helpers.ui_tabular_data import TableHelper
+
+
+def table_page(rows: int, columns: int, seed: int = 0) -> str:
+    """
+    Page source with synthetic report table: text and formatted number columns, spans and totals
+    """
+    rnd = random.Random(seed)
+    header = "".join(f"<th>Column {c}</th>" for c in range(columns))
+    body = []
+    for r in range(rows):
+        cells = [f"<td>{rnd.randint(0, 10 ** 6):,}</td>" if c % 2 else f"<td>Name {r}-{c}</td>"
+                 for c in range(columns)]
+        if r % 100 == 0:
+            cells[:2] = [f'<td colspan="2">Group {r // 100}</td>']
+        body.append("<tr>" + "".join(cells) + "</tr>")
+    totals = "".join(f"<td>{c}</td>" for c in range(columns))
+    return "<html><body><div class='report'>" \
+           f"<table class='grid'><thead><tr>{header}</tr></thead><tbody>{''.join(body)}</tbody>" \
+           f"<tfoot><tr>{totals}</tr></tfoot></table></div></body></html>"
+
+
+def measure(func, repeat: int) -> float:
+    """
+    Best time of the function call in seconds
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--columns", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    page_source = table_page(args.rows, args.columns)
+    locator = Locators.css("div.report table.grid")
+    helper = TableHelper(base=None)
+
+    expected = helper.get_table_data_using_soup(locator, page_source)
+    assert expected.equals(helper.get_table_data_using_parser(locator, page_source)), "Dataframes are different"
+
+    soup = measure(lambda: helper.get_table_data_using_soup(locator, page_source), args.repeat)
+    single_pass = measure(lambda: helper.get_table_data_using_parser(locator, page_source), args.repeat)
+    print(f"rows: {args.rows}, columns: {args.columns}, page size: {len(page_source) / 2 ** 20:.1f} MB")
+    print(f"get_table_data_using_soup:   {soup:.3f}s")
+    print(f"get_table_data_using_parser: {single_pass:.3f}s ({soup / single_pass:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Import time benchmark of draftcoreatqc modules, guarding against import time regressions. \n
+Every module is imported in a fresh interpreter; the run fails if a module imports
+a heavy dependency it does not need, or if it is slower than the budget
+
+python -m benchmarks.import_time --repeat 5 --budget 1.5
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+# module: heavy dependencies which must not be imported together with it
+MODULES = {
+    "draftcoreatqc.api": ["selenium.webdriver", "pandas", "bs4", "jsonschema"],
+    "draftcoreatqc.wrappers": ["requests", "selenium.webdriver", "pandas"],
+    "draftcoreatqc.wrappers.rest": ["selenium.webdriver", "pandas", "bs4", "jsonschema"],
+    "draftcoreatqc.api.validators": ["jsonschema", "selenium.webdriver", "pandas", "bs4"],
+    "draftcoreatqc.api.validators.validate_response": ["selenium.webdriver", "pandas", "bs4", "jsonschema"],
+    "draftcoreatqc.helpers": ["pandas", "selenium.webdriver", "requests"],
+    "draftcoreatqc.helpers.ui_tabular_data": ["pandas", "numpy", "bs4", "requests", "selenium.webdriver", "allure"],
+    "draftcoreatqc.fixtures": ["selenium.webdriver", "requests", "pandas", "jsonschema"],
+    "draftcoreatqc.fixtures.fixtures": ["selenium.webdriver", "requests", "pandas", "jsonschema"],
+    "draftcoreatqc.ui.base_page": ["pandas", "requests", "jsonschema"],
+}
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"time": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+
+def measure(module: str, repeat: int):
+    """
+    The best import time of the module in fresh interpreters and modules imported with it
+    """
+    best, modules = None, []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", PROBE.format(module=module)],
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output)
+        if best is None or result["time"] < best:
+            best, modules = result["time"], result["modules"]
+    return best, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--modules", nargs="+", default=list(MODULES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=None,
+                        help="Maximum import time of the slowest module relative to importing requests")
+    args = parser.parse_args()
+
+    baseline, _ = measure("requests", args.repeat)
+    failures = []
+    print(f"{'module':<50} {'time':>9} {'x requests':>11}")
+    for module in args.modules:
+        elapsed, modules = measure(module, args.repeat)
+        print(f"{module:<50} {elapsed * 1000:>7.1f}ms {elapsed / baseline:>10.2f}x")
+        for forbidden in MODULES.get(module, []):
+            if forbidden in modules:
+                failures.append(f"{module} imports {forbidden}")
+        if args.budget is not None and elapsed > baseline * args.budget:
+            failures.append(f"{module} import takes {elapsed / baseline:.2f}x of requests import")
+    for failure in failures:
+        print(f"FAILED: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""
+Offline benchmark suite of the framework hot paths with baseline regression gates
+
+python -m benchmarks.suite run --output results.json --baseline baseline.json --threshold 0.2
+"""
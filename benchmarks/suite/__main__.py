@@ -0,0 +1,92 @@
+"""
+Command line of the benchmark suite
+
+python -m benchmarks.suite list
+python -m benchmarks.suite run [-k tables validators] [--quick] [--output results.json]
+                               [--baseline baseline.json] [--threshold 0.2] [--statistic min]
+python -m benchmarks.suite compare results.json baseline.json [--threshold 0.2]
+
+Exits with status 1 if any measurement is slower than the baseline by more than the threshold
+"""
+import argparse
+import sys
+from benchmarks.suite import cases  # noqa: F401 (registers the cases)
+from benchmarks.suite.registry import select
+from benchmarks.suite.runner import STATISTICS, compare, format_time, load, result_key, run, save
+from benchmarks.suite.stub_server import stop_stub_server
+
+
+def print_measurement(measurement):
+    print(f"{result_key(measurement.case, measurement.size):<50} {format_time(measurement.min):>10} "
+          f"{format_time(measurement.median):>10} {format_time(measurement.stdev):>10} {measurement.number:>7}",
+          flush=True)
+
+
+def report_comparison(current: dict, baseline: dict, threshold: float, statistic: str) -> int:
+    comparisons = compare(current, baseline, threshold, statistic)
+    print(f"\n{'benchmark':<50} {'baseline':>10} {'current':>10} {'ratio':>7}  status")
+    for comparison in comparisons:
+        ratio = f"{comparison.ratio:.2f}x" if comparison.ratio is not None else "-"
+        print(f"{comparison.key:<50} {format_time(comparison.baseline):>10} {format_time(comparison.current):>10} "
+              f"{ratio:>7}  {comparison.status}")
+    regressed = [comparison for comparison in comparisons if comparison.status == "regressed"]
+    if regressed:
+        print(f"\n{len(regressed)} regression(s) beyond the threshold: "
+              f"{', '.join(comparison.key for comparison in regressed)}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list", help="List registered cases and their sizes")
+
+    run_parser = commands.add_parser("run", help="Run cases, save results and compare them with the baseline")
+    run_parser.add_argument("-k", "--keyword", nargs="+", default=[],
+                            help="Run cases which names contain any of the keywords")
+    run_parser.add_argument("--quick", action="store_true", help="Run only the smallest size of every case")
+    run_parser.add_argument("--repeat", type=int, default=5, help="Number of measured samples")
+    run_parser.add_argument("--min-time", type=float, default=0.05, help="Minimum duration of a sample, seconds")
+    run_parser.add_argument("--output", help="Path of results JSON")
+    run_parser.add_argument("--baseline", help="Path of baseline results JSON to compare with")
+
+    compare_parser = commands.add_parser("compare", help="Compare saved results with the baseline")
+    compare_parser.add_argument("results", help="Path of results JSON")
+    compare_parser.add_argument("baseline", help="Path of baseline results JSON")
+
+    for command_parser in (run_parser, compare_parser):
+        command_parser.add_argument("--threshold", type=float, default=0.2,
+                                    help="Allowed slowdown against the baseline, 0.2 is 20%%")
+        command_parser.add_argument("--statistic", choices=STATISTICS, default="min",
+                                    help="Compared statistic of the samples")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for case in select():
+            print(f"{case.name:<50} sizes: {', '.join(map(str, case.sizes))}")
+        return 0
+    if args.command == "compare":
+        return report_comparison(load(args.results), load(args.baseline), args.threshold, args.statistic)
+
+    selected = select(args.keyword)
+    if not selected:
+        parser.error(f"No cases match {' '.join(args.keyword)}")
+    print(f"{'benchmark':<50} {'min':>10} {'median':>10} {'stdev':>10} {'calls':>7}")
+    try:
+        results = run(selected, repeat=args.repeat, min_time=args.min_time, quick=args.quick,
+                      progress=print_measurement)
+    finally:
+        stop_stub_server()
+    if args.output:
+        save(results, args.output)
+        print(f"\nResults saved to {args.output}")
+    if args.baseline:
+        return report_comparison(results, load(args.baseline), args.threshold, args.statistic)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
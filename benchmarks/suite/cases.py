@@ -0,0 +1,100 @@
+"""
+Benchmark cases of the table helpers, the validators and the request layer
+"""
+from benchmarks.suite.registry import benchmark
+from benchmarks.suite import corpora
+from benchmarks.suite.stub_server import stub_server
+
+TABLE_COLUMNS = 8
+REQUESTS_PER_CALL = 20
+# loopback round trips are noisier than in-process cases
+LOOPBACK_THRESHOLD = 0.5
+
+
+@benchmark("tables.transform_values_to_column_rows", sizes=(1000, 10000, 100000))
+def transform_values_to_column_rows(cells: int):
+    from draftcoreatqc.helpers.ui_tabular_data import TableHelper
+    names, values, totals = corpora.table_cells(cells, TABLE_COLUMNS)
+    return lambda: TableHelper.transform_values_to_column_rows(columns=names, values=values, totals=totals)
+
+
+@benchmark("tables.transform_values_to_frame", sizes=(1000, 10000, 100000))
+def transform_values_to_frame(cells: int):
+    from draftcoreatqc.helpers.ui_tabular_data import TableHelper
+    names, values, totals = corpora.table_cells(cells, TABLE_COLUMNS)
+    return lambda: TableHelper.transform_values_to_frame(columns=names, values=values, totals=totals)
+
+
+@benchmark("tables.get_table_data_using_soup", sizes=(100, 1000, 5000))
+def get_table_data_using_soup(rows: int):
+    from draftcoreatqc.helpers.ui_tabular_data import TableHelper
+    from draftcoreatqc.ui.locator import Locators
+    page_source, locator = corpora.table_page(rows, TABLE_COLUMNS), Locators.css("div.report table.grid")
+    return lambda: TableHelper(base=None).get_table_data_using_soup(locator, page_source)
+
+
+@benchmark("tables.get_table_data_using_parser", sizes=(100, 1000, 5000))
+def get_table_data_using_parser(rows: int):
+    from draftcoreatqc.helpers.ui_tabular_data import TableHelper
+    from draftcoreatqc.ui.locator import Locators
+    page_source, locator = corpora.table_page(rows, TABLE_COLUMNS), Locators.css("div.report table.grid")
+    return lambda: TableHelper(base=None).get_table_data_using_parser(locator, page_source)
+
+
+@benchmark("tables.coerce_frame", sizes=(1000, 10000))
+def coerce_frame(rows: int):
+    from benchmarks.table_coercion import report
+    from draftcoreatqc.helpers.table_types import coerce_frame as coerce
+    frame = report(rows, columns=10)
+    return lambda: coerce(frame)
+
+
+@benchmark("tables.compare_tables", sizes=(1000, 10000, 100000))
+def compare_tables(rows: int):
+    from benchmarks.table_diff import tables
+    from draftcoreatqc.helpers.table_diff import compare_tables as compare
+    ui_chunks, api = tables(rows, mismatch_every=100, chunk_rows=10000)
+    return lambda: compare(iter(ui_chunks), api, "Id", atol={"Amount": 0.001}, attach=False)
+
+
+@benchmark("validators.validate_json", sizes=(100, 1000))
+def validate_json(count: int):
+    from draftcoreatqc.api.validators.validate_response import JsonSchemaValidator
+    bodies, schema_path, validator = corpora.response_corpus(count), corpora.schema_path(), JsonSchemaValidator()
+    return lambda: [validator.validate_json(body, schema_path) for body in bodies]
+
+
+@benchmark("validators.validate_many", sizes=(1000,))
+def validate_many(count: int):
+    from draftcoreatqc.api.validators.validate_response import JsonSchemaValidator
+    bodies, schema_path, validator = corpora.response_corpus(count), corpora.schema_path(), JsonSchemaValidator()
+    # in-process path: pool start-up depends on the machine rather than on the code
+    return lambda: list(validator.validate_many(((body, schema_path) for body in bodies), processes=1))
+
+
+@benchmark("requests.session_get", sizes=(1, 100, 10000), threshold=LOOPBACK_THRESHOLD)
+def session_get(items: int):
+    """
+    Baseline of the request layer: requests session alone
+    """
+    from draftcoreatqc.wrappers.rest import Rest
+    session, url = Rest().rest, f"{stub_server().url}/orders?items={items}"
+    return lambda: [session.get(url).json() for _ in range(REQUESTS_PER_CALL)]
+
+
+@benchmark("requests.send_request", sizes=(1, 100, 10000), threshold=LOOPBACK_THRESHOLD)
+def send_request(items: int):
+    from draftcoreatqc.api.base_requests import Requests
+    from draftcoreatqc.wrappers.rest import Rest
+    requests, url = Requests(Rest().rest), f"{stub_server().url}/orders"
+    return lambda: [requests.get(url, params={"items": items}).json() for _ in range(REQUESTS_PER_CALL)]
+
+
+@benchmark("requests.send_request_post", sizes=(1, 1000), threshold=LOOPBACK_THRESHOLD)
+def send_request_post(items: int):
+    import json
+    from draftcoreatqc.api.base_requests import Requests
+    from draftcoreatqc.wrappers.rest import Rest
+    requests, url = Requests(Rest().rest), f"{stub_server().url}/echo"
+    body = json.loads(corpora.json_payload(items))
+    return lambda: [requests.post(url, body=body).json() for _ in range(REQUESTS_PER_CALL)]
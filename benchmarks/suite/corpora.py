@@ -0,0 +1,43 @@
+"""
+Synthetic data of the benchmark cases, built the same way as by the standalone benchmarks
+"""
+import atexit
+import functools
+import json
+import os
+import shutil
+import tempfile
+from typing import List
+from benchmarks.html_table_parsing import table_page
+from benchmarks.transform_values import table_cells
+from benchmarks.validate_many import SCHEMA, responses
+
+__all__ = ["table_page", "table_cells", "schema_path", "response_corpus", "json_payload"]
+
+
+@functools.lru_cache(maxsize=None)
+def schema_path() -> str:
+    """
+    Path of the order schema written to a temporary directory removed on exit
+    """
+    schema_dir = tempfile.mkdtemp(prefix="benchmarks-")
+    atexit.register(shutil.rmtree, schema_dir, ignore_errors=True)
+    path = os.path.join(schema_dir, "order.json")
+    with open(path, "w", encoding="utf-8") as schema_file:
+        json.dump(SCHEMA, schema_file)
+    return path
+
+
+def response_corpus(count: int, items: int = 20, invalid_every: int = 100) -> List[str]:
+    """
+    Order responses valid against the schema, every invalid_every-th of them is invalid
+    """
+    return list(responses(count, items, invalid_every))
+
+
+@functools.lru_cache(maxsize=16)
+def json_payload(items: int) -> bytes:
+    """
+    Order response with the number of items, encoded
+    """
+    return next(iter(responses(1, items, 0))).encode("utf-8")
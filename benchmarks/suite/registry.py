@@ -0,0 +1,36 @@
+"""
+Registry of benchmark cases
+"""
+from collections import namedtuple
+from typing import Callable, Dict, Iterable, List
+
+Case = namedtuple('Case', ['name', 'group', 'setup', 'sizes', 'threshold'])
+
+CASES: Dict[str, Case] = {}
+
+
+def benchmark(name: str, sizes: Iterable[int], threshold: float = None):
+    """
+    Register benchmark case: decorated setup function takes data size and returns the function that is timed,
+    so building of the data and the warm-up are not measured
+    :param name: Name of the case, the part before the first dot is its group
+    :param sizes: Data sizes the case is run with
+    :param threshold: Regression threshold of the case, overriding the threshold of the run
+    """
+
+    def register(setup: Callable[[int], Callable[[], object]]):
+        if name in CASES:
+            raise ValueError(f"Benchmark {name} is already registered")
+        CASES[name] = Case(name, name.split(".")[0], setup, tuple(sizes), threshold)
+        return setup
+
+    return register
+
+
+def select(patterns: Iterable[str] = ()) -> List[Case]:
+    """
+    Cases which names contain any of the patterns, all cases if there are no patterns
+    """
+    patterns = list(patterns)
+    return [case for name, case in sorted(CASES.items())
+            if not patterns or any(pattern in name for pattern in patterns)]
@@ -0,0 +1,165 @@
+"""
+Running of benchmark cases, JSON results and comparison with the baseline
+"""
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from importlib import metadata
+from typing import Callable, Dict, Iterable, List, Tuple
+from benchmarks.suite.registry import Case
+
+Measurement = namedtuple('Measurement', ['case', 'group', 'size', 'number', 'repeat', 'min', 'median', 'mean',
+                                         'stdev', 'threshold'])
+Comparison = namedtuple('Comparison', ['key', 'baseline', 'current', 'ratio', 'threshold', 'status'])
+
+PACKAGES = ("pandas", "numpy", "requests", "jsonschema", "beautifulsoup4", "orjson", "selenium")
+STATISTICS = ("min", "median", "mean")
+
+
+def result_key(case: str, size: int) -> str:
+    return f"{case}[{size}]"
+
+
+def measure(func: Callable[[], object], repeat: int = 5, min_time: float = 0.05) -> Tuple[int, List[float]]:
+    """
+    Time of a single call of the function in seconds, per each of repeat samples. \n
+    The first call warms up caches, imports and connections and is not measured.
+    Fast functions are called several times per sample, so every sample takes at least min_time.
+    Garbage collection is disabled while samples are taken, the same way timeit does it
+    :return: Number of calls per sample and times of a call
+    """
+    func()
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        number = 1
+        while True:
+            elapsed = _sample(func, number)
+            if elapsed >= min_time:
+                break
+            number *= 10 if elapsed < min_time / 10 else 2
+        timings = [elapsed / number] + [_sample(func, number) / number for _ in range(repeat - 1)]
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return number, timings
+
+
+def _sample(func: Callable[[], object], number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    return time.perf_counter() - start
+
+
+def run_case(case: Case, size: int, repeat: int = 5, min_time: float = 0.05) -> Measurement:
+    """
+    Build data of the case for the size and measure it
+    """
+    number, timings = measure(case.setup(size), repeat, min_time)
+    return Measurement(case.name, case.group, size, number, repeat, min(timings), statistics.median(timings),
+                       statistics.mean(timings), statistics.stdev(timings) if len(timings) > 1 else 0.0,
+                       case.threshold)
+
+
+def run(cases: Iterable[Case],
+        repeat: int = 5,
+        min_time: float = 0.05,
+        quick: bool = False,
+        progress: Callable[[Measurement], None] = None) -> Dict[str, dict]:
+    """
+    Run cases with all their sizes (only the smallest one if quick)
+    :return: Results JSON: environment and measurements by "case[size]" keys
+    """
+    results = {}
+    for case in cases:
+        for size in sorted(case.sizes)[:1] if quick else case.sizes:
+            measurement = run_case(case, size, repeat, min_time)
+            results[result_key(case.name, size)] = measurement._asdict()
+            if progress:
+                progress(measurement)
+    return {"environment": environment(), "results": results}
+
+
+def environment() -> dict:
+    """
+    Interpreter, machine and versions of the packages and of the code the results are measured with
+    """
+    versions = {}
+    for package in PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(__file__), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "packages": versions,
+        "commit": commit,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    }
+
+
+def save(results: dict, path: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as results_file:
+        json.dump(results, results_file, indent=2)
+
+
+def load(path: str) -> dict:
+    with open(path, encoding="utf-8") as results_file:
+        return json.load(results_file)
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.2, statistic: str = "min") -> List[Comparison]:
+    """
+    Compare measurements with the baseline ones
+    :param threshold: Allowed slowdown, e.g. 0.2 fails measurements more than 20% slower than the baseline
+                      (cases may set their own threshold)
+    :param statistic: Compared statistic: min (the least noisy), median or mean
+    :return: Comparison per measurement with status: ok, regressed, improved, new (not in baseline)
+    """
+    if statistic not in STATISTICS:
+        raise ValueError(f"Unknown statistic: {statistic}, expected one of {', '.join(STATISTICS)}")
+    comparisons = []
+    for key, measurement in current["results"].items():
+        case_threshold = measurement.get("threshold")
+        case_threshold = threshold if case_threshold is None else case_threshold
+        value = measurement[statistic]
+        previous = baseline["results"].get(key)
+        if previous is None:
+            comparisons.append(Comparison(key, None, value, None, case_threshold, "new"))
+            continue
+        ratio = value / previous[statistic] if previous[statistic] else float("inf")
+        if ratio > 1 + case_threshold:
+            status = "regressed"
+        elif ratio < 1 / (1 + case_threshold):
+            status = "improved"
+        else:
+            status = "ok"
+        comparisons.append(Comparison(key, previous[statistic], value, ratio, case_threshold, status))
+    return comparisons
+
+
+def format_time(seconds: float) -> str:
+    if seconds is None:
+        return "-"
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
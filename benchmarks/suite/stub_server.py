@@ -0,0 +1,87 @@
+"""
+Local HTTP stub server of the request layer benchmarks
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from benchmarks.suite.corpora import json_payload
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    GET /orders?items=N returns order JSON with N items, POST /echo returns the request body.
+    Connections are kept alive, so the client overhead is measured rather than TCP handshakes
+    """
+    protocol_version = "HTTP/1.1"
+    # headers and body are sent separately, without TCP_NODELAY every response waits for delayed ACK
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+        self._reply(json_payload(int(query.get("items", ["1"])[0])))
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self._reply(self.rfile.read(length))
+
+    def _reply(self, body: bytes):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer:
+    """
+    Stub server on a free local port, running in a daemon thread
+    """
+
+    def __init__(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-server", daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def start(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+_server = None
+
+
+def stub_server() -> StubServer:
+    """
+    Stub server shared by the cases of the run, started on the first use
+    """
+    global _server
+    if _server is None:
+        _server = StubServer().start()
+    return _server
+
+
+def stop_stub_server():
+    """
+    Stop the shared stub server if it was started
+    """
+    global _server
+    if _server is not None:
+        _server.stop()
+        _server = None
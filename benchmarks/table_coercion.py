@@ -0,0 +1,71 @@
+"""
+Benchmark of typed columns coercion of wide scraped report: memory of string and coerced Dataframes,
+coercion time and numeric check re-parsing strings row by row against vectorized check of coerced columns
+
+python -m benchmarks.table_coercion --rows 10000 100000 --columns 30
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from draftcoreatqc.helpers.table_types import coerce_frame
+
+STATUSES = np.array(["Active", "Paused", "Archived", "Draft"], dtype=object)
+
+
+def report(rows: int, columns: int) -> pd.DataFrame:
+    """
+    Report of strings as scraped from UI: amounts, percents, counts, dates and statuses in turn
+    """
+    rng = np.random.default_rng(0)
+    data = {}
+    for column in range(columns):
+        kind = column % 5
+        if kind == 0:
+            values = pd.Series(rng.random(rows) * 1e6).map("{:,.2f}".format)
+        elif kind == 1:
+            values = pd.Series(rng.random(rows) * 100).map("{:.1f}%".format)
+        elif kind == 2:
+            values = pd.Series(rng.integers(0, 100000, rows)).map("{:,}".format)
+        elif kind == 3:
+            values = pd.Series((pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D"))
+                               .strftime("%Y-%m-%d"))
+        else:
+            values = pd.Series(STATUSES[rng.integers(0, len(STATUSES), rows)])
+        data[f"Column {column}"] = values.to_numpy(dtype=object)
+    return pd.DataFrame(data)
+
+
+def parse_row_by_row(frame: pd.DataFrame, column: str) -> int:
+    return sum(float(value.replace(",", "")) > 500000 for value in frame[column])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--columns", type=int, default=30)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'strings MiB':>12} {'coerced MiB':>12} {'coerce s':>9} "
+          f"{'row check s':>12} {'vector check s':>15}")
+    for rows in args.rows:
+        frame = report(rows, args.columns)
+        strings_size = frame.memory_usage(deep=True).sum() / 2 ** 20
+        start = time.perf_counter()
+        coerced = coerce_frame(frame).frame
+        coerce_time = time.perf_counter() - start
+        coerced_size = coerced.memory_usage(deep=True).sum() / 2 ** 20
+        amount_columns = [column for i, column in enumerate(frame.columns) if i % 5 == 0]
+        start = time.perf_counter()
+        row_count = sum(parse_row_by_row(frame, column) for column in amount_columns)
+        row_time = time.perf_counter() - start
+        start = time.perf_counter()
+        vector_count = int((coerced[amount_columns] > 500000).to_numpy().sum())
+        vector_time = time.perf_counter() - start
+        assert row_count == vector_count
+        print(f"{rows:>8} {strings_size:>12.1f} {coerced_size:>12.1f} {coerce_time:>9.3f} "
+              f"{row_time:>12.3f} {vector_time:>15.4f}")
+
+
+if __name__ == "__main__":
+    main()
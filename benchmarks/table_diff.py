@@ -0,0 +1,96 @@
+"""
+Benchmark of table comparison: merge with row-wise loop against compare_tables,
+in memory and with key hash buckets spilled to disk.
+With --memory every run is repeated under tracemalloc to report peak traced memory
+(tracing slows allocations down, so time is measured by the untraced run)
+
+python -m benchmarks.table_diff --rows 10000 100000 1000000 --buckets 1 8 --memory
+"""
+import argparse
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from draftcoreatqc.helpers.table_diff import compare_tables
+from draftcoreatqc.helpers.table_types import to_number, to_percent
+
+
+def tables(rows: int, mismatch_every: int, chunk_rows: int):
+    """
+    UI table chunks with formatted strings and API table with typed values, every mismatch_every-th row differs
+    """
+    ids = np.arange(rows)
+    amounts = np.round(ids * 1.37, 2)
+    shares = (ids % 1000) / 1000
+    dates = pd.Timestamp("2024-01-01") + pd.to_timedelta(ids % 365, unit="D")
+    api = pd.DataFrame({"Id": ids, "Amount": amounts, "Share": shares, "Date": dates,
+                        "Name": pd.Series(ids).map("name {}".format)})
+    api.loc[::mismatch_every, "Amount"] += 1
+    ui_chunks = []
+    for start in range(0, rows, chunk_rows):
+        chunk = slice(start, min(start + chunk_rows, rows))
+        ui_chunks.append(pd.DataFrame({
+            "Id": pd.Series(ids[chunk]).map("{:,}".format),
+            "Amount": pd.Series(amounts[chunk]).map("{:,.2f}".format),
+            "Share": pd.Series(shares[chunk] * 100).map("{:.1f}%".format),
+            "Date": dates[chunk].strftime("%Y-%m-%d"),
+            "Name": api["Name"].iloc[chunk].to_numpy()
+        }))
+    return ui_chunks, api
+
+
+def merge_and_loop(ui_chunks, api) -> int:
+    """
+    The way tests compared tables before: normalize, merge and check every row in Python
+    """
+    ui = pd.concat(ui_chunks, ignore_index=True)
+    ui = ui.assign(Id=to_number(ui["Id"]), Amount=to_number(ui["Amount"]), Share=to_percent(ui["Share"]),
+                   Date=pd.to_datetime(ui["Date"]))
+    merged = ui.merge(api.assign(Id=api["Id"].astype("float64")), on="Id", suffixes=("_ui", "_api"))
+    mismatches = 0
+    for _, row in merged.iterrows():
+        if (abs(row["Amount_ui"] - row["Amount_api"]) > 0.001 or abs(row["Share_ui"] - row["Share_api"]) > 1e-9
+                or row["Date_ui"] != row["Date_api"] or row["Name_ui"] != row["Name_api"]):
+            mismatches += 1
+    return mismatches
+
+
+def measure(function, memory: bool):
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    if not memory:
+        return result, elapsed, "-"
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, f"{peak / 2 ** 20:.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--buckets", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--chunk-rows", type=int, default=50000)
+    parser.add_argument("--mismatch-every", type=int, default=100)
+    parser.add_argument("--loop-limit", type=int, default=100000,
+                        help="Largest number of rows compared with the row-wise loop")
+    parser.add_argument("--memory", action="store_true", help="Report peak traced memory")
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'method':>16} {'seconds':>9} {'peak MiB':>9} {'mismatched':>10}")
+    for rows in args.rows:
+        ui_chunks, api = tables(rows, args.mismatch_every, args.chunk_rows)
+        if rows <= args.loop_limit:
+            mismatched, elapsed, peak = measure(lambda: merge_and_loop(ui_chunks, api), args.memory)
+            print(f"{rows:>9} {'merge + loop':>16} {elapsed:>9.3f} {peak:>9} {mismatched:>10}")
+        for buckets in args.buckets:
+            report, elapsed, peak = measure(lambda: compare_tables(
+                iter(ui_chunks), api, "Id", kinds={"Share": "percent"}, atol={"Amount": 0.001}, rtol=1e-9,
+                buckets=buckets, attach=False), args.memory)
+            print(f"{rows:>9} {f'compare ({buckets} b)':>16} {elapsed:>9.3f} {peak:>9} {report.mismatched:>10}")
+
+
+if __name__ == "__main__":
+    main()
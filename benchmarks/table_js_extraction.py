@@ -0,0 +1,80 @@
+"""
+Benchmark of table extraction: per element (get_table_data_using_selenium)
+against single script call (get_table_data_using_js)
+
+Requires a browser: local chrome by default or remote hub with --hub, e.g.
+python -m benchmarks.table_js_extraction --rows 200 --columns 10 --hub http://localhost:4444/wd/hub
+"""
+import argparse
+import base64
+import time
+from selenium import webdriver
+from draftcoreatqc.ui.base_page import BasePageActions
+from draftcoreatqc.ui.locator import Locators
+from draftcoreatqc.helpers.ui_tabular_data import TableHelper
+
+
+def table_page(rows: int, columns: int) -> str:
+    """
+    Data URL of the page with synthetic table
+    """
+    header = "".join(f"<th>Column {c}</th>" for c in range(columns))
+    body = "".join(
+        "<tr>" + "".join(f"<td>{r * columns + c:,}</td>" for c in range(columns)) + "</tr>"
+        for r in range(rows)
+    )
+    totals = "".join(f"<td>{c}</td>" for c in range(columns))
+    html = f"<table><thead><tr>{header}</tr></thead><tbody>{body}</tbody>" \
+           f"<tfoot><tr>{totals}</tr></tfoot></table>"
+    return "data:text/html;base64," + base64.b64encode(html.encode()).decode()
+
+
+def measure(func, repeat: int) -> float:
+    """
+    Best time of the function call in seconds
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--columns", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--hub", default=None, help="Remote hub URL, local chrome is used if not set")
+    args = parser.parse_args()
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless")
+    if args.hub:
+        driver = webdriver.Remote(command_executor=args.hub, options=options)
+    else:
+        driver = webdriver.Chrome(options=options)
+    try:
+        base = BasePageActions(driver)
+        base.navigate(table_page(args.rows, args.columns))
+        helper = TableHelper(base)
+        locators = dict(table_values_locator=Locators.css("tbody td"),
+                        table_header_locator=Locators.css("thead th"),
+                        table_total_locator=Locators.css("tfoot td"))
+
+        expected = helper.get_table_data_using_selenium(**locators)
+        assert expected.equals(helper.get_table_data_using_js(**locators)), "Dataframes are different"
+
+        per_element = measure(lambda: helper.get_table_data_using_selenium(**locators), args.repeat)
+        single_call = measure(lambda: helper.get_table_data_using_js(**locators), args.repeat)
+        cells = (args.rows + 2) * args.columns
+        print(f"cells: {cells}")
+        print(f"get_table_data_using_selenium: {per_element:.3f}s")
+        print(f"get_table_data_using_js:       {single_call:.3f}s ({per_element / single_call:.1f}x)")
+    finally:
+        driver.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Micro-benchmarks of building table Dataframe from flat cells list:
+dict per row (transform_values_to_column_rows + pd.DataFrame) against
+columnar reshape (transform_values_to_frame)
+
+python -m benchmarks.transform_values --cells 10000 100000 500000
+"""
+import argparse
+import timeit
+import pandas as pd
+from draftcoreatqc.helpers.ui_tabular_data import TableHelper
+
+
+def table_cells(cells: int, columns: int):
+    """
+    Columns names, values and totals lists of synthetic table
+    """
+    names = [f"Column {c}" for c in range(columns)]
+    values = [f"{i:,}" for i in range(cells - columns)]
+    totals = [f"Total {c}" for c in range(columns)]
+    return names, values, totals
+
+
+def dict_per_row(names, values, totals) -> pd.DataFrame:
+    return pd.DataFrame(TableHelper.transform_values_to_column_rows(columns=names, values=values, totals=totals))
+
+
+def columnar(names, values, totals) -> pd.DataFrame:
+    return TableHelper.transform_values_to_frame(columns=names, values=values, totals=totals)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cells", type=int, nargs="+", default=[1000, 10000, 100000, 500000])
+    parser.add_argument("--columns", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'cells':>10} {'dict per row':>14} {'columnar':>10} {'speedup':>8}")
+    for cells in args.cells:
+        names, values, totals = table_cells(cells, args.columns)
+        assert dict_per_row(names, values, totals).equals(columnar(names, values, totals)), \
+            "Dataframes are different"
+        number = max(1, 100000 // cells)
+        rows = min(timeit.repeat(lambda: dict_per_row(names, values, totals),
+                                 number=number, repeat=args.repeat)) / number
+        frame = min(timeit.repeat(lambda: columnar(names, values, totals),
+                                  number=number, repeat=args.repeat)) / number
+        print(f"{cells:>10} {rows * 1000:>12.2f}ms {frame * 1000:>8.2f}ms {rows / frame:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark of bulk JSON validation: serial validate_json loop against validate_many
+with growing number of worker processes
+
+python -m benchmarks.validate_many --responses 20000 --workers 1 2 4 8
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from draftcoreatqc.api.validators.validate_response import JsonSchemaValidator
+
+SCHEMA = {
+    "type": "object",
+    "required": ["id", "name", "items"],
+    "properties": {
+        "id": {"type": "integer"},
+        "name": {"type": "string", "minLength": 1},
+        "items": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["sku", "price", "tags"],
+                "properties": {
+                    "sku": {"type": "string", "pattern": "^[A-Z]{3}-[0-9]+$"},
+                    "price": {"type": "number", "minimum": 0},
+                    "tags": {"type": "array", "items": {"type": "string"}}
+                }
+            }
+        }
+    }
+}
+
+
+def responses(count: int, items: int, invalid_every: int):
+    """
+    Synthetic responses, every invalid_every-th of them is invalid
+    """
+    for i in range(count):
+        body = {"id": i, "name": f"order {i}",
+                "items": [{"sku": f"ABC-{j}", "price": j * 1.5, "tags": ["a", "b"]} for j in range(items)]}
+        if invalid_every and i % invalid_every == 0:
+            body["items"][0]["price"] = "free"
+        yield json.dumps(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--responses", type=int, default=20000)
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--invalid-every", type=int, default=100)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, os.cpu_count()])
+    parser.add_argument("--chunksize", type=int, default=64)
+    args = parser.parse_args()
+
+    schema_dir = tempfile.mkdtemp()
+    schema_path = os.path.join(schema_dir, "order.json")
+    with open(schema_path, "w", encoding="utf-8") as schema_file:
+        json.dump(SCHEMA, schema_file)
+    bodies = list(responses(args.responses, args.items, args.invalid_every))
+    validator = JsonSchemaValidator()
+
+    start = time.perf_counter()
+    serial_failed = sum(not validator.validate_json(body, schema_path).status for body in bodies)
+    serial = time.perf_counter() - start
+    print(f"{'workers':>8} {'time':>9} {'responses/s':>12} {'speedup':>8}")
+    print(f"{'serial':>8} {serial:>8.2f}s {len(bodies) / serial:>12.0f} {1:>7.1f}x")
+
+    for workers in sorted(set(args.workers)):
+        start = time.perf_counter()
+        failed = sum(not validation.status for _, validation in
+                     validator.validate_many(((body, schema_path) for body in bodies),
+                                             processes=workers, ordered=False, chunksize=args.chunksize))
+        elapsed = time.perf_counter() - start
+        assert failed == serial_failed, "Results are different"
+        print(f"{workers:>8} {elapsed:>8.2f}s {len(bodies) / elapsed:>12.0f} {serial / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,6 @@
-from draftcoreatqc.api.base_requests import Requests
+from draftcoreatqc.helpers.lazy_import import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    "Requests": "draftcoreatqc.api.base_requests:Requests",
+    "RequestSpec": "draftcoreatqc.api.base_requests:RequestSpec",
+})
@@ -0,0 +1,102 @@
+"""
+Asynchronous requests module (requires aiohttp)
+"""
+import asyncio
+from typing import Iterable, List, Union
+import aiohttp
+from draftcoreatqc.api.base_requests import Response, RequestSpec, to_request_spec
+
+
+class AsyncRequests:
+
+    def __init__(self, rest, concurrency: int = 1000):
+        """
+        Initializing AsyncRequests object
+        :param rest: aiohttp client session (see AsyncRest)
+        :param concurrency: Maximum number of requests in flight
+        """
+        self.rest = rest
+        self.concurrency = concurrency
+        self._semaphore = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        """
+        Semaphore limiting requests in flight, created in the running event loop
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    async def send_request(self,
+                           method: str,
+                           url: str,
+                           **kwargs) -> Response:
+        """
+        Basic method for sending request
+        :param method: HTTP method
+        :param url: URL where request is to be sent
+        :param kwargs: Additional arguments (body, payload etc), timeout may be given in seconds
+        :return: Response object with status_code and body
+        """
+        timeout = kwargs.pop("timeout", None)
+        if timeout is not None and not isinstance(timeout, aiohttp.ClientTimeout):
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+        async with self.semaphore:
+            async with self.rest.request(method=method, url=url, **kwargs) as response:
+                content = await response.read()
+                return Response(status_code=response.status,
+                                content=content,
+                                encoding=response.charset,
+                                headers=dict(response.headers))
+
+    async def get(self,
+                  url: str,
+                  params: dict = None,
+                  **kwargs) -> Response:
+        """
+        GET request
+        :param url: URL where request is to be sent
+        :param params: request query parameters
+        :param kwargs: Additional arguments (body, payload etc)
+        :return: Response object with status_code and body
+        """
+        return await self.send_request(method="GET",
+                                       url=url,
+                                       params=params,
+                                       **kwargs)
+
+    async def post(self,
+                   url: str,
+                   body: dict = None,
+                   **kwargs) -> Response:
+        """
+        POST request
+        :param url: URL where request is to be sent
+        :param body: Request body
+        :param kwargs: Additional arguments (body, payload etc)
+        :return: Response object with status_code and body
+        """
+        return await self.send_request(method="POST",
+                                       url=url,
+                                       json=body,
+                                       **kwargs)
+
+    async def send_many(self,
+                        requests: Iterable[Union[RequestSpec, tuple, dict]],
+                        timeout: float = None) -> List[Response]:
+        """
+        Send independent requests concurrently, at most `concurrency` of them in flight
+        :param requests: Request specs: RequestSpec, (method, url[, kwargs]) tuples
+                         or dicts with method, url and other send_request arguments
+        :param timeout: Default timeout for requests which do not set their own one
+        :return: List of Response objects in the same order as requests
+        """
+        coroutines = []
+        for request in requests:
+            spec = to_request_spec(request)
+            kwargs = dict(spec.kwargs or {})
+            if timeout is not None:
+                kwargs.setdefault("timeout", timeout)
+            coroutines.append(self.send_request(method=spec.method, url=spec.url, **kwargs))
+        return list(await asyncio.gather(*coroutines))
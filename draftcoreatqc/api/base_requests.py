@@ -1,6 +1,200 @@
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable, Iterator, List, Union
+from urllib.parse import urlsplit
+from requests.compat import chardet
+from draftcoreatqc.wrappers.rest import ensure_pool_size
+from draftcoreatqc.helpers.instrumentation import instrumentation
+from draftcoreatqc.helpers.json_codec import fast_loads
 
-Response = namedtuple('Response', ['status_code', 'body'])
+RequestSpec = namedtuple('RequestSpec', ['method', 'url', 'kwargs'], defaults=(None,))
+
+
+class Response(namedtuple('Response', ['status_code', 'body'])):
+    """
+    Class of API response, (status_code, body) named tuple \n
+    Keeps raw bytes of the body: text is decoded and JSON is parsed only on the first access.
+    In stream mode the body is not downloaded until it is read, so large downloads
+    can be iterated or saved to disk chunk by chunk (and are not kept, so content and body raise RuntimeError). \n
+    Body is not stored in the tuple until it is decoded: iteration, indexing, comparison and _replace
+    go through the body property
+    """
+
+    def __new__(cls,
+                status_code: int,
+                body: str = None,
+                content: bytes = None,
+                encoding: str = None,
+                headers: dict = None,
+                raw=None):
+        """
+        :param status_code: HTTP status code
+        :param body: Decoded body, if content is not available
+        :param content: Raw body bytes
+        :param encoding: Body encoding declared by the server (detected on decoding if not set)
+        :param headers: Response headers
+        :param raw: Streamed requests response, whose body is not downloaded yet
+        """
+        self = super().__new__(cls, status_code, body)
+        self.encoding = encoding
+        self.headers = headers if headers is not None else {}
+        self._text = body
+        self._content = content
+        self._raw = raw
+        self._json = None
+        self._json_parsed = False
+        # why streamed body is gone, once it is iterated or closed without being read
+        self._discarded = None
+        return self
+
+    @property
+    def content(self) -> bytes:
+        """
+        Raw body bytes (downloads streamed body)
+        """
+        if self._content is None:
+            if self._discarded:
+                raise RuntimeError(f"Response body was {self._discarded} and is not kept")
+            if self._raw is not None:
+                self._content = self._raw.content
+                self._raw = None
+            else:
+                self._content = (self._text or "").encode(self.encoding or "utf-8")
+        return self._content
+
+    @property
+    def body(self) -> str:
+        """
+        Body decoded with declared encoding, UTF-8 or detected encoding
+        """
+        if self._text is None:
+            self._text = self._decode(self.content)
+        return self._text
+
+    text = body
+
+    def json(self) -> Any:
+        """
+        Body parsed from JSON, parsed once
+        """
+        if not self._json_parsed:
+            if self._text is None and (self.encoding or "utf-8").lower().replace("_", "-") in ("utf-8", "utf8"):
+                # JSON is parsed right from bytes, skipping text decoding
+                self._json = fast_loads(self.content)
+            else:
+                self._json = fast_loads(self.body)
+            self._json_parsed = True
+        return self._json
+
+    @property
+    def streamed(self) -> bool:
+        """
+        Whether body is still not downloaded
+        """
+        return self._raw is not None
+
+    def iter_content(self, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """
+        Iterate body in chunks, streamed body is downloaded chunk by chunk and is not kept in memory
+        """
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._discarded = "streamed with iter_content() or save()"
+            try:
+                yield from raw.iter_content(chunk_size=chunk_size)
+            finally:
+                raw.close()
+            return
+        content = self.content
+        for start in range(0, len(content), chunk_size):
+            yield content[start:start + chunk_size]
+
+    def save(self, path: str, chunk_size: int = 64 * 1024) -> int:
+        """
+        Write body to the file chunk by chunk
+        :return: Number of written bytes
+        """
+        size = 0
+        with open(path, "wb") as file:
+            for chunk in self.iter_content(chunk_size=chunk_size):
+                file.write(chunk)
+                size += len(chunk)
+        return size
+
+    def close(self):
+        """
+        Release connection of not downloaded streamed body
+        """
+        if self._raw is not None:
+            self._raw.close()
+            self._raw = None
+            self._discarded = "closed before it was read"
+
+    def _decode(self, content: bytes) -> str:
+        if self.encoding:
+            try:
+                return content.decode(self.encoding, errors="replace")
+            except LookupError:
+                pass
+        try:
+            return content.decode("utf-8")
+        except UnicodeDecodeError:
+            detected = chardet.detect(content)["encoding"] or "utf-8"
+            return content.decode(detected, errors="replace")
+
+    @classmethod
+    def _make(cls, iterable: Iterable) -> "Response":
+        return cls(*iterable)
+
+    def _replace(self, **kwargs) -> "Response":
+        unexpected = set(kwargs) - set(self._fields)
+        if unexpected:
+            raise ValueError(f"Got unexpected field names: {sorted(unexpected)!r}")
+        status_code = kwargs.get("status_code", self.status_code)
+        if "body" in kwargs:
+            return Response(status_code, body=kwargs["body"], encoding=self.encoding, headers=self.headers)
+        return Response(status_code, body=self._text, content=self.content, encoding=self.encoding,
+                        headers=self.headers)
+
+    def __iter__(self):
+        return iter((self.status_code, self.body))
+
+    def __getitem__(self, index):
+        return tuple(self)[index]
+
+    def __contains__(self, value):
+        return value in tuple(self)
+
+    def __eq__(self, other):
+        if isinstance(other, tuple):
+            return tuple(self) == tuple(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        if isinstance(other, tuple):
+            return tuple(self) != tuple(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        if self.streamed or self._discarded and self._content is None:
+            return f"Response(status_code={self.status_code!r}, body=<streamed>)"
+        return f"Response(status_code={self.status_code!r}, body={self.body!r})"
+
+
+def to_request_spec(request: Union[RequestSpec, tuple, dict]) -> RequestSpec:
+    """
+    Normalize request spec given as RequestSpec, (method, url[, kwargs]) tuple
+    or dict with method, url and other send_request arguments
+    """
+    if isinstance(request, RequestSpec):
+        return request
+    if isinstance(request, dict):
+        kwargs = dict(request)
+        return RequestSpec(kwargs.pop("method"), kwargs.pop("url"), kwargs)
+    return RequestSpec(*request)
 
 
 class Requests:
@@ -15,19 +209,33 @@ class Requests:
     def send_request(self,
                      method: str,
                      url: str,
+                     stream: bool = False,
                      **kwargs) -> Response:
         """
         Basic method for sending request
         :param method: HTTP method
         :param url: URL where request is to be sent
+        :param stream: Whether body is downloaded only when it is read (see Response.iter_content)
         :param kwargs: Additional arguments (body, payload etc)
         :return: Response object with status_code and body
         """
-        response = self.rest.request(method=method,
-                                     url=url,
-                                     **kwargs)
-        resp = Response(status_code=response.status_code,
-                        body=response.text)
+        with instrumentation.measure("http", f"{method} {urlsplit(url).path}") as call:
+            response = self.rest.request(method=method,
+                                         url=url,
+                                         stream=stream,
+                                         **kwargs)
+            if stream:
+                resp = Response(status_code=response.status_code,
+                                encoding=response.encoding,
+                                headers=response.headers,
+                                raw=response)
+            else:
+                resp = Response(status_code=response.status_code,
+                                content=response.content,
+                                encoding=response.encoding,
+                                headers=response.headers)
+                call["size"] = len(response.content)
+            call["outcome"] = str(response.status_code)
         return resp
 
     def get(self,
@@ -61,3 +269,47 @@ class Requests:
                                  url=url,
                                  json=body,
                                  **kwargs)
+
+    def send_many(self,
+                  requests: Iterable[Union[RequestSpec, tuple, dict]],
+                  max_workers: int = 10,
+                  timeout: float = None) -> List[Response]:
+        """
+        Send independent requests concurrently on a bounded thread pool.
+        Session adapters keeping less than max_workers connections per host are replaced by bigger ones
+        (see ensure_pool_size), so connections are kept alive and reused between requests
+        :param requests: Request specs: RequestSpec, (method, url[, kwargs]) tuples
+                         or dicts with method, url and other send_request arguments
+        :param max_workers: Maximum number of requests in flight
+        :param timeout: Default timeout for requests which do not set their own one
+        :return: List of Response objects in the same order as requests
+        """
+        specs = [to_request_spec(request) for request in requests]
+        ensure_pool_size(self.rest, max_workers)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda spec: self._send_spec(spec, timeout), specs))
+
+    def map(self,
+            method: str,
+            urls: Iterable[str],
+            max_workers: int = 10,
+            timeout: float = None,
+            **kwargs) -> List[Response]:
+        """
+        Send the same kind of request to every URL concurrently
+        :param method: HTTP method
+        :param urls: URLs where requests are to be sent
+        :param max_workers: Maximum number of requests in flight
+        :param timeout: Timeout of every request
+        :param kwargs: Additional arguments shared by all requests
+        :return: List of Response objects in the same order as urls
+        """
+        return self.send_many([RequestSpec(method, url, kwargs) for url in urls],
+                              max_workers=max_workers,
+                              timeout=timeout)
+
+    def _send_spec(self, spec: RequestSpec, timeout: float) -> Response:
+        kwargs = dict(spec.kwargs or {})
+        if timeout is not None:
+            kwargs.setdefault("timeout", timeout)
+        return self.send_request(method=spec.method, url=spec.url, **kwargs)
@@ -0,0 +1,8 @@
+from draftcoreatqc.helpers.lazy_import import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    "JsonSchemaValidator": "draftcoreatqc.api.validators.validate_response:JsonSchemaValidator",
+    "AuthorizationValidate": "draftcoreatqc.api.validators.validate_response:AuthorizationValidate",
+    "Validation": "draftcoreatqc.api.validators.validate_response:Validation",
+    "schema_cache": "draftcoreatqc.api.validators.validate_response:schema_cache",
+})
@@ -3,13 +3,208 @@ Response validator wrapper
 """
 from json import loads as json_loads, dumps as json_dumps
 import os
-from collections import namedtuple
-import jsonschema
-from bs4 import BeautifulSoup
-import allure
+import glob
+import multiprocessing
+import threading
+from collections import namedtuple, OrderedDict
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Tuple
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+from draftcoreatqc.helpers.instrumentation import instrumentation
+from draftcoreatqc.helpers.json_codec import fast_loads, dumps_truncated
+from draftcoreatqc.helpers.lazy_import import lazy_module
+try:
+    import ijson
+except ImportError:  # streaming validation is optional
+    ijson = None
 
+# jsonschema, BeautifulSoup and allure are imported on the first validation
+jsonschema = lazy_module("jsonschema")
+bs4 = lazy_module("bs4")
+allure = lazy_module("allure")
 
 Validation = namedtuple('Validation', ['status', 'errors'])
+ErrorExample = namedtuple('ErrorExample', ['schema_path', 'error_message', 'response_path', 'validator', 'path'])
+# files: modification times of the schema file and of the files its references were resolved from
+CompiledSchema = namedtuple('CompiledSchema', ['files', 'schema', 'validator'])
+CacheStats = namedtuple('CacheStats', ['hits', 'misses', 'evictions', 'size'])
+
+
+class ValidationErrors(list):
+    """
+    List of validation errors (ErrorExample), one per unique schema path \n
+    Keeps path to the schema, total number of errors and details of the validation,
+    is printed as JSON report: schema path followed by errors
+    """
+
+    def __init__(self, examples=(), schema_path=None, total: int = 0, **details):
+        super().__init__(examples)
+        self.schema_path = schema_path
+        self.total = total
+        self.details = details
+
+    def to_list(self) -> list:
+        """
+        Errors as JSON serializable list, preceded by schema path and details if there are any errors
+        """
+        if not self:
+            return []
+        return [{"abspath": self.schema_path, "errors": self.total, **self.details}] + [
+            {"schema_path": e.schema_path, "error_message": e.error_message, "response_path": e.response_path}
+            for e in self]
+
+    def __str__(self):
+        return json_dumps(self.to_list(), indent=3)
+
+
+class SchemaCache:
+    """
+    Process-wide LRU cache of compiled schema validators \n
+    Schema file is read, parsed and compiled (with $ref resolving) only once,
+    and again only when modification time of the file or of any referenced file changes
+    """
+
+    def __init__(self, validator=None, maxsize: int = 256):
+        """
+        :param validator: Validator class to compile schemas with (jsonschema.Draft7Validator by default)
+        :param maxsize: Maximum number of compiled schemas kept in cache
+        """
+        self._validator = validator
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._compiled = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def validator(self):
+        """
+        Validator class to compile schemas with
+        """
+        if self._validator is None:
+            self._validator = jsonschema.Draft7Validator
+        return self._validator
+
+    def get(self, schema_path, encoding=None) -> CompiledSchema:
+        """
+        Returns compiled schema, compiling it if the file is not cached or it or its referenced files were changed
+        :param schema_path: Path to the schema file
+        :param encoding: Encoding of the schema file (None by default)
+        :return: Compiled schema with parsed schema and validator instance
+        """
+        abspath = os.path.abspath(schema_path)
+        key = (abspath, encoding)
+        with self._lock:
+            compiled = self._compiled.get(key)
+            if compiled is not None and not _files_changed(compiled.files):
+                self._compiled.move_to_end(key)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+        compiled = self._compile(abspath, encoding)
+        with self._lock:
+            self._compiled[key] = compiled
+            self._compiled.move_to_end(key)
+            while len(self._compiled) > self.maxsize:
+                self._compiled.popitem(last=False)
+                self.evictions += 1
+        return compiled
+
+    def preload(self, schema_dir, pattern: str = "**/*.json", encoding=None) -> int:
+        """
+        Compiles all schemas from the directory in advance, e.g. at session start
+        :param schema_dir: Directory with schema files
+        :param pattern: Glob pattern of schema files relative to the directory
+        :param encoding: Encoding of the schema files (None by default)
+        :return: Number of preloaded schemas
+        """
+        paths = glob.glob(os.path.join(schema_dir, pattern), recursive=True)
+        for path in paths:
+            self.get(path, encoding=encoding)
+        return len(paths)
+
+    def stats(self) -> CacheStats:
+        """
+        Cache hit/miss counters
+        """
+        with self._lock:
+            return CacheStats(self.hits, self.misses, self.evictions, len(self._compiled))
+
+    def clear(self):
+        """
+        Drop all compiled schemas and reset counters
+        """
+        with self._lock:
+            self._compiled.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def _compile(self, abspath, encoding) -> CompiledSchema:
+        # references are resolved lazily, on validation, so files get their modification times as they are read
+        files = {abspath: os.stat(abspath).st_mtime_ns}
+        with open(abspath, encoding=encoding) as schema_file:
+            schema = json_loads(schema_file.read())
+        base_uri = Path(abspath).as_uri()
+
+        def read_ref(uri):
+            # only file: URIs are passed here, relative references are resolved against the file URI of the schema
+            path = os.path.abspath(url2pathname(urlparse(uri).path))
+            mtime = os.stat(path).st_mtime_ns
+            with open(path, encoding=encoding) as ref_file:
+                contents = json_loads(ref_file.read())
+            with self._lock:
+                files[path] = mtime
+            return contents
+
+        try:
+            from referencing import Registry, Resource
+            from referencing.exceptions import NoSuchResource
+            from referencing.jsonschema import DRAFT7
+        except ImportError:  # jsonschema < 4.18 resolves references with RefResolver, remote ones are fetched by it
+            resolver = jsonschema.RefResolver(base_uri=base_uri, referrer=schema, handlers={"file": read_ref})
+            return CompiledSchema(files, schema, self.validator(schema, resolver=resolver))
+
+        retrieved = {}
+
+        def retrieve(uri):
+            # referenced files are read once per compiled schema
+            if uri not in retrieved:
+                scheme = urlparse(uri).scheme
+                if scheme in ("", "file"):
+                    contents = read_ref(uri)
+                elif scheme in ("http", "https"):
+                    contents = _read_remote_ref(uri)
+                else:
+                    raise NoSuchResource(ref=uri)
+                retrieved[uri] = Resource.from_contents(contents, default_specification=DRAFT7)
+            return retrieved[uri]
+
+        registry = Registry(retrieve=retrieve)
+        if "$id" not in schema:
+            schema = dict(schema, **{"$id": base_uri})
+        return CompiledSchema(files, schema, self.validator(schema, registry=registry))
+
+
+def _read_remote_ref(uri: str) -> Any:
+    # remote references are fetched like RefResolver did, they are not checked for changes
+    import requests
+    response = requests.get(uri, timeout=30)
+    response.raise_for_status()
+    return json_loads(response.content)
+
+
+def _files_changed(files) -> bool:
+    for path, mtime in files.items():
+        try:
+            if os.stat(path).st_mtime_ns != mtime:
+                return True
+        except OSError:
+            return True
+    return False
+
+
+schema_cache = SchemaCache()
 
 
 class JsonSchemaValidator:
@@ -17,41 +212,336 @@ class JsonSchemaValidator:
     Class of JSON schema validator
     """
 
-    def __init__(self):
-        self.validator = jsonschema.Draft7Validator
+    def __init__(self, cache: SchemaCache = None, decoder=fast_loads, attachment_size: int = 100000):
+        """
+        :param cache: Cache of compiled schemas (process-wide schema_cache by default)
+        :param decoder: Function decoding JSON str or bytes (orjson if installed, json module otherwise),
+                        has to be a module level function to be used by validate_many
+        :param attachment_size: Maximum size of response attached to the report on failure
+        """
+        self.cache = cache if cache is not None else schema_cache
+        self.validator = self.cache.validator
+        self.decoder = decoder
+        self.attachment_size = attachment_size
 
     def validate_json(self, json_response, schema_path, encoding=None):
         """
         Method to validate JSON according to the schema
-        :param json_response: Response received from API in JSON format
+        :param json_response: Response received from API in JSON format (str, bytes or Response object)
         :param schema_path:
         :param encoding: Encoding (None by default)
-        :return: Validation result with status (True or False) and errors (if any)
+        :return: Validation result with status (True or False) and errors (ValidationErrors)
+        """
+        with instrumentation.measure("validation", os.path.basename(schema_path)) as call:
+            payload = _response_payload(json_response)
+            call["size"] = len(payload)
+            try:
+                resp = self.decoder(payload)
+            except Exception:
+                raise TypeError("Response is not in JSON format")
+
+            validator = self.cache.get(schema_path, encoding=encoding).validator
+            errors = _collect_errors(validator, resp, schema_path)
+            if errors:
+                allure.attach(body=dumps_truncated(resp, self.attachment_size), name="Response JSON")
+            call["outcome"] = "valid" if not errors else "invalid"
+        return Validation(True if not errors else False, errors)
+
+    def validate_many(self,
+                      responses: Iterable[Tuple[Any, str]],
+                      processes: int = None,
+                      ordered: bool = True,
+                      chunksize: int = 16,
+                      encoding=None) -> Iterator[Tuple[int, Validation]]:
         """
+        Method to validate many JSON responses in parallel, across a pool of worker processes.
+        Every worker compiles each schema once (see SchemaCache), only failed responses are attached
+        to the report, and it is done in the calling process
+        :param responses: Iterable of (response, schema_path) pairs, response is JSON str, bytes or Response object
+        :param processes: Number of worker processes (number of CPUs by default), 1 validates in this process
+        :param ordered: Whether results are returned in the order of responses or as soon as they are ready
+        :param chunksize: Number of responses sent to a worker at once
+        :param encoding: Encoding of the schema files (None by default)
+        :return: Generator of (index of the response, Validation result) pairs
+        """
+        tasks = ((index, _response_payload(response), schema_path, encoding)
+                 for index, (response, schema_path) in enumerate(responses))
+        if processes == 1:
+            _init_validation_worker(self.cache, self.decoder)
+            yield from self._report_results(map(_validate_task, tasks))
+            return
+        with multiprocessing.Pool(processes=processes,
+                                  initializer=_init_validation_worker,
+                                  initargs=(self.cache.validator, self.decoder)) as pool:
+            imap = pool.imap if ordered else pool.imap_unordered
+            yield from self._report_results(imap(_validate_task, tasks, chunksize=chunksize))
+
+    def _report_results(self, results) -> Iterator[Tuple[int, Validation]]:
+        for index, errors, payload in results:
+            if errors:
+                allure.attach(body=dumps_truncated(self.decoder(payload), self.attachment_size),
+                              name=f"Response JSON [{index}]")
+            yield index, Validation(True if not errors else False, errors)
+
+    def validate_json_stream(self,
+                             json_stream,
+                             schema_path,
+                             encoding=None,
+                             items_prefix: str = "item",
+                             max_errors: int = 100,
+                             excerpt_size: int = 2000):
+        """
+        Method to validate large JSON array incrementally, item by item, against the items subschema.
+        Response is never loaded into memory as a whole, so it can be used for huge responses
+        (requires ijson package) \n
+        The rest of the response is validated against the rest of the schema, response without the array
+        at items_prefix fails, array keywords needing the whole array (e.g. uniqueItems) raise ValueError
+        :param json_stream: File-like object returning bytes (e.g. raw response), iterable of bytes chunks
+                            or Response object (sent with stream=True to not download it as a whole)
+        :param schema_path: Path to the schema of the whole response
+        :param encoding: Encoding of the schema file (None by default)
+        :param items_prefix: Path to the array items in the response, "item" for top level array,
+                             "data.item" for array under "data" key of the top level object
+        :param max_errors: Maximum number of collected errors, errors past it are only counted
+        :param excerpt_size: Maximum size of failed items excerpt attached to the report
+        :return: Validation result with status (True or False) and errors (ValidationErrors)
+        """
+        if ijson is None:
+            raise ImportError("Streaming validation requires ijson package")
+        compiled = self.cache.get(schema_path, encoding=encoding)
+        path = items_prefix.split(".")[:-1]
+        array_schema, rest_schema = _split_array_schema(compiled.schema, path, items_prefix)
+        item_validator = _subschema_validator(compiled.validator, array_schema.get("items", {}))
+        rest_validator = _subschema_validator(compiled.validator, rest_schema)
+
+        # base_requests imports requests, so it is imported on use
+        from draftcoreatqc.api.base_requests import Response
+        if isinstance(json_stream, Response):
+            json_stream = json_stream.iter_content()
+        if not hasattr(json_stream, "read"):
+            json_stream = _ChunksReader(json_stream)
+        stream = _StreamSplitter(ijson.parse(json_stream, use_float=True), ".".join(path), items_prefix)
+        errors_examples = []
+        signatures = set()
+        failed_excerpt = []
+        items = failed_items = total = 0
         try:
-            resp = json_loads(json_response)
-        except Exception:
+            for index, item in enumerate(stream.items()):
+                items += 1
+                item_errors = list(item_validator.iter_errors(item))
+                if not item_errors:
+                    continue
+                failed_items += 1
+                total += len(item_errors)
+                if len(errors_examples) >= max_errors:
+                    continue
+                if sum(map(len, failed_excerpt)) < excerpt_size:
+                    failed_excerpt.append(f"[{index}]: " + dumps_truncated(item, excerpt_size))
+                for e in item_errors[:max_errors - len(errors_examples)]:
+                    signature = frozenset(e.relative_schema_path)
+                    if signature not in signatures:
+                        signatures.add(signature)
+                        errors_examples.append(_error_example(e, schema_prefix=["items"], path_prefix=path + [index]))
+        except ijson.JSONError:
             raise TypeError("Response is not in JSON format")
+        # the rest of the response, with the array left empty, is validated against the rest of the schema
+        rest_errors = list(rest_validator.iter_errors(stream.rest()))
+        # missing array is already reported when the rest of the schema requires its key
+        missing_required = stream.container is None and path and any(
+            e.validator == "required" and list(e.absolute_path) == path[:-1] and path[-1] in e.validator_value
+            for e in rest_errors)
+        if stream.container != "start_array":
+            if not missing_required:
+                total += 1
+                message = f"Response has no {_response_path(path)} array" if stream.container is None \
+                    else f"{_response_path(path) if path else 'Response'} is not of type 'array'"
+                errors_examples.append(ErrorExample(["type"], message, _response_path(path), "type", list(path)))
+        elif "minItems" in array_schema and items < array_schema["minItems"] \
+                or "maxItems" in array_schema and items > array_schema["maxItems"]:
+            keyword = "minItems" if items < array_schema.get("minItems", 0) else "maxItems"
+            total += 1
+            errors_examples.append(ErrorExample([keyword], f"Array has {items} items", _response_path(path),
+                                                keyword, list(path)))
+        for e in rest_errors:
+            total += 1
+            signature = frozenset(e.relative_schema_path)
+            if signature not in signatures and len(errors_examples) < max_errors:
+                signatures.add(signature)
+                errors_examples.append(_error_example(e))
+        errors = ValidationErrors(errors_examples, schema_path, total, items=items, failed_items=failed_items)
+        if errors:
+            allure.attach(body="\n".join(failed_excerpt)[:excerpt_size], name="Failed items excerpt")
+        return Validation(True if not errors else False, errors)
 
-        with open(schema_path, encoding=encoding) as schema_file:
-            schema = json_loads(schema_file.read())
-        validator = self.validator(schema)
-        errors = validator.iter_errors(resp)
-        errors_examples = []
-        unique_schema_path = []
-        for e in errors:
-            if set(e.relative_schema_path) not in unique_schema_path:
-                unique_schema_path.append(set(e.relative_schema_path))
-                errors_examples.append({
-                    "schema_path": list(e.relative_schema_path),
-                    "error_message": e.message,
-                    "response_path": "[\'" + "\'][\'".join(
-                        str(i) for i in list(e.relative_path)) + "\']"
-                })
-        if errors_examples:
-            errors_examples.insert(0, {"abspath": schema_path})
-            allure.attach(body=json_dumps(resp, indent=2), name="Response JSON")
-        return Validation(True if not errors_examples else False, json_dumps(errors, indent=3))
+
+def _collect_errors(validator, resp, schema_path) -> ValidationErrors:
+    """
+    Validation errors of the response, one per unique schema path
+    """
+    examples = []
+    signatures = set()
+    total = 0
+    for e in validator.iter_errors(resp):
+        total += 1
+        signature = frozenset(e.relative_schema_path)
+        if signature not in signatures:
+            signatures.add(signature)
+            examples.append(_error_example(e))
+    return ValidationErrors(examples, schema_path, total)
+
+
+def _error_example(error, schema_prefix=(), path_prefix=()) -> ErrorExample:
+    path = list(path_prefix) + list(error.relative_path)
+    return ErrorExample(list(schema_prefix) + list(error.relative_schema_path),
+                        error.message,
+                        _response_path(path),
+                        error.validator,
+                        path)
+
+
+def _response_path(path) -> str:
+    return "[\'" + "\'][\'".join(str(i) for i in path) + "\']"
+
+
+def _response_payload(response):
+    """
+    Raw JSON of the response sent to the worker process
+    """
+    if isinstance(response, (str, bytes, bytearray)):
+        return response
+    from draftcoreatqc.api.base_requests import Response
+    if isinstance(response, Response):
+        return response.content
+    return response
+
+
+_worker_cache = None
+_worker_decoder = fast_loads
+
+
+def _init_validation_worker(validator, decoder=fast_loads):
+    """
+    Initializer of validation worker process: compiled schemas are cached for the worker lifetime
+    """
+    global _worker_cache, _worker_decoder
+    _worker_decoder = decoder
+    if isinstance(validator, SchemaCache):
+        _worker_cache = validator
+    elif schema_cache.validator is validator:
+        _worker_cache = schema_cache
+    else:
+        _worker_cache = SchemaCache(validator=validator)
+
+
+def _validate_task(task):
+    index, payload, schema_path, encoding = task
+    try:
+        resp = _worker_decoder(payload)
+    except Exception:
+        raise TypeError(f"Response [{index}] is not in JSON format")
+    validator = _worker_cache.get(schema_path, encoding=encoding).validator
+    errors = _collect_errors(validator, resp, schema_path)
+    # only failed responses are sent back to the parent, to be attached to the report
+    return index, errors, payload if errors else None
+
+
+def _subschema_validator(validator, subschema):
+    """
+    Validator of the subschema, resolving references against the whole schema
+    """
+    if hasattr(validator, "evolve"):
+        return validator.evolve(schema=subschema)
+    return type(validator)(subschema, resolver=validator.resolver)
+
+
+# keywords of the streamed array subschema which are checked item by item or do not constrain the value
+STREAMED_ARRAY_KEYWORDS = {"type", "items", "minItems", "maxItems", "title", "description", "$comment", "$id",
+                           "$schema", "default", "examples", "definitions", "readOnly", "writeOnly"}
+
+
+def _split_array_schema(schema, path, items_prefix) -> Tuple[dict, dict]:
+    """
+    Subschema of the streamed array and the schema of the rest of the response (array constraints removed) \n
+    Array keywords which need the whole array (e.g. uniqueItems, contains, $ref) can not be validated in streaming
+    mode, schemas with them are rejected rather than partially validated
+    """
+    parents = [schema]
+    for key in path:
+        subschema = parents[-1].get("properties", {}).get(key)
+        if not isinstance(subschema, dict):
+            raise ValueError(f"Schema has no subschema for {items_prefix}")
+        parents.append(subschema)
+    array_schema = parents[-1]
+    unsupported = set(array_schema) - STREAMED_ARRAY_KEYWORDS
+    if not isinstance(array_schema.get("items", {}), (dict, bool)):
+        unsupported.add("items")
+    if unsupported:
+        raise ValueError(f"Schema keywords {', '.join(sorted(unsupported))} of {items_prefix} "
+                         f"can not be validated in streaming mode")
+    rest_schema = {key: value for key, value in array_schema.items()
+                   if key not in ("type", "items", "minItems", "maxItems")}
+    for key, parent in zip(reversed(path), reversed(parents[:-1])):
+        rest_schema = dict(parent, properties=dict(parent["properties"], **{key: rest_schema}))
+    return array_schema, rest_schema
+
+
+class _StreamSplitter:
+    """
+    Splits ijson parse events into items of the streamed array and the rest of the response \n
+    Items are built and returned one by one, the rest is built with the array left empty
+    """
+
+    def __init__(self, events, array_prefix: str, items_prefix: str):
+        self._events = events
+        self._array_prefix = array_prefix
+        self._items_prefix = items_prefix
+        self._rest = ijson.ObjectBuilder()
+        # first event of the value at the array prefix: start_array, start_map, string, ... or None if not reached
+        self.container = None
+
+    def items(self) -> Iterator[Any]:
+        item, depth = None, 0
+        nested_prefix = self._items_prefix + "."
+        for prefix, event, value in self._events:
+            if self.container == "start_array" and (prefix == self._items_prefix or prefix.startswith(nested_prefix)):
+                if item is None:
+                    item = ijson.ObjectBuilder()
+                item.event(event, value)
+                if event in ("start_map", "start_array"):
+                    depth += 1
+                elif event in ("end_map", "end_array"):
+                    depth -= 1
+                if depth == 0 and event != "map_key":
+                    yield item.value
+                    item = None
+                continue
+            if self.container is None and prefix == self._array_prefix and event != "map_key":
+                self.container = event
+            self._rest.event(event, value)
+
+    def rest(self):
+        return getattr(self._rest, "value", None)
+
+
+class _ChunksReader:
+    """
+    File-like reader over iterable of bytes chunks (e.g. response.iter_content())
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def read(self, size=-1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
 
 
 class AuthorizationValidate:
@@ -59,7 +549,7 @@ class AuthorizationValidate:
     Class of validator for HTML response
     """
     def __init__(self):
-        self.beautiful_soup = BeautifulSoup
+        self.beautiful_soup = bs4.BeautifulSoup
 
     def is_response_unauthorized(self, response):
         soup = self.beautiful_soup(response, "html.parser")
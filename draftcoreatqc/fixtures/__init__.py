@@ -1,2 +1,11 @@
-from draftcoreatqc.fixtures.fixtures import rest_fixture
-from draftcoreatqc.fixtures.fixtures import browser_fixture
+from draftcoreatqc.helpers.lazy_import import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    "rest_fixture": "draftcoreatqc.fixtures.fixtures:rest_fixture",
+    "browser_fixture": "draftcoreatqc.fixtures.fixtures:browser_fixture",
+    "schema_cache_fixture": "draftcoreatqc.fixtures.fixtures:schema_cache_fixture",
+    "async_rest_fixture": "draftcoreatqc.fixtures.fixtures:async_rest_fixture",
+    "pooled_browser_fixture": "draftcoreatqc.fixtures.fixtures:pooled_browser_fixture",
+    "wait_stats_fixture": "draftcoreatqc.fixtures.fixtures:wait_stats_fixture",
+    "auth_rest_fixture": "draftcoreatqc.fixtures.fixtures:auth_rest_fixture",
+})
@@ -1,12 +1,32 @@
-from draftcoreatqc.wrappers.rest import Rest
-from draftcoreatqc.wrappers.browser import Browser
+"""
+Fixtures bodies, dependencies are imported inside fixtures,
+so API test workers do not import selenium and UI test workers do not import requests
+"""
+from draftcoreatqc.helpers.instrumentation import instrument_driver
 
 
 def rest_fixture():
-    return Rest().rest
+    from draftcoreatqc.wrappers.rest import Rest
+    from draftcoreatqc.wrappers.cassette import get_session_cassette
+    # cassette is opened by the plugin with --cassette-mode option
+    return Rest(cassette=get_session_cassette()).rest
+
+
+def auth_rest_fixture(auth_manager):
+    # session and connections pool are shared by tests, token is refreshed only when it expires
+    return auth_manager.session()
+
+
+async def async_rest_fixture(concurrency: int = 1000):
+    # aiohttp is an optional dependency, so it is imported only when async client is used
+    from draftcoreatqc.wrappers.async_rest import AsyncRest
+    rest = AsyncRest(limit=concurrency)
+    yield rest.rest
+    await rest.close()
 
 
 def browser_fixture(request):
+    from draftcoreatqc.wrappers.browser import Browser
     browser_name = request.config.getoption('--browser')
     is_selenoid = request.config.getoption('--selenoid')
     is_video = request.config.getoption('--video')
@@ -16,4 +36,31 @@ def browser_fixture(request):
                                                     video_name=f"{request.module.__name__}-{request.node.name}")
     else:
         browser_driver = Browser().browser_driver(browser_name=browser_name)
-    return browser_driver
+    return instrument_driver(browser_driver)
+
+
+def pooled_browser_fixture(request, pool_size: int = 1, max_uses: int = 50):
+    from draftcoreatqc.wrappers.browser_pool import get_browser_pool
+    browser_name = request.config.getoption('--browser')
+    is_selenoid = request.config.getoption('--selenoid')
+    pool = get_browser_pool(browser_name, selenoid=is_selenoid, size=pool_size, max_uses=max_uses)
+    failed_before = request.session.testsfailed
+    browser_driver = instrument_driver(pool.acquire())
+    yield browser_driver
+    # call phase report is already logged when fixture teardown starts
+    pool.release(browser_driver, failed=request.session.testsfailed > failed_before)
+
+
+def schema_cache_fixture(schema_dir=None):
+    from draftcoreatqc.api.validators.validate_response import schema_cache
+    if schema_dir:
+        schema_cache.preload(schema_dir)
+    return schema_cache
+
+
+def wait_stats_fixture(request):
+    from draftcoreatqc.ui.waits import default_wait_engine
+    default_wait_engine.reset()
+    yield default_wait_engine
+    # total waiting time of the test is reported in junit xml properties
+    request.node.user_properties.append(("wait_time", round(default_wait_engine.waited, 3)))
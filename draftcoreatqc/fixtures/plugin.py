@@ -0,0 +1,106 @@
+"""
+Pytest plugin reporting instrumentation of hot paths, recording/replaying HTTP cassettes
+and writing pending captures at the session end
+Enable it in the root conftest.py: pytest_plugins = ["draftcoreatqc.fixtures.plugin"], or with -p draftcoreatqc.fixtures.plugin
+"""
+import os
+import pytest
+from draftcoreatqc.helpers.instrumentation import instrumentation
+from draftcoreatqc.ui.capture import capture_pipeline
+from draftcoreatqc.wrappers.cassette import MODES, get_session_cassette, use_session_cassette
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("draftcoreatqc")
+    group.addoption("--instrument", action="store_true", default=False,
+                    help="Record latency of WebDriver commands, HTTP requests and JSON validations")
+    group.addoption("--instrument-json", action="store", default=None,
+                    help="Path of JSON file to export latency histograms to")
+    group.addoption("--instrument-allure", action="store_true", default=False,
+                    help="Attach latency histograms of every test to allure report")
+    group.addoption("--instrument-slowest", action="store", type=int, default=10,
+                    help="Number of the slowest calls shown in terminal summary")
+    group.addoption("--cassette-mode", action="store", default="off", choices=MODES,
+                    help="Record and replay HTTP requests of Rest sessions: off, record, replay or auto")
+    group.addoption("--cassette-dir", action="store", default="cassettes",
+                    help="Directory of HTTP cassette")
+    group.addoption("--cassette-max-age", action="store", type=float, default=None,
+                    help="Age in days, after which replayed cassette entries are reported as stale")
+
+
+def pytest_configure(config):
+    if config.getoption("--instrument") or config.getoption("--instrument-json"):
+        instrumentation.slowest_size = config.getoption("--instrument-slowest")
+        instrumentation.enable()
+    mode = config.getoption("--cassette-mode")
+    if mode != "off":
+        if mode in ("record", "auto") and os.environ.get("PYTEST_XDIST_WORKER"):
+            raise pytest.UsageError("Cassette can be recorded by a single process only, run it without xdist")
+        max_age = config.getoption("--cassette-max-age")
+        use_session_cassette(config.getoption("--cassette-dir"),
+                             mode=mode,
+                             max_age=max_age * 24 * 3600 if max_age is not None else None)
+    # captures are written next to the allure results; option is defined by allure-pytest, if it is installed
+    alluredir = config.getoption("--alluredir", default=None)
+    if alluredir and capture_pipeline.results_dir is None:
+        capture_pipeline.results_dir = os.path.abspath(alluredir)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):
+    if not instrumentation.enabled:
+        yield
+        return
+    instrumentation.start_test(item.nodeid)
+    try:
+        yield
+    finally:
+        instrumentation.finish_test()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_teardown(item, nextitem):
+    yield
+    # fixture teardown is over, so the test calls are complete, while allure test case is still open
+    if instrumentation.enabled and item.config.getoption("--instrument-allure"):
+        instrumentation.attach_test(item.nodeid)
+
+
+def pytest_sessionfinish(session):
+    # captures are written by background workers, they have to be in the results directory before it is reported
+    capture_pipeline.flush()
+    cassette = get_session_cassette()
+    if cassette is not None:
+        cassette.close()
+    path = session.config.getoption("--instrument-json")
+    if not instrumentation.enabled or not path:
+        return
+    worker = os.environ.get("PYTEST_XDIST_WORKER")
+    if worker:
+        # every xdist worker exports its own file
+        root, ext = os.path.splitext(path)
+        path = f"{root}.{worker}{ext}"
+    instrumentation.export_json(path)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    cassette = get_session_cassette()
+    if cassette is not None:
+        report = cassette.report()
+        terminalreporter.section("cassette")
+        terminalreporter.write_line(f"{cassette.mode} {cassette.path}: replayed={report.hits} missed={report.misses} "
+                                    f"recorded={report.recorded} unused={report.unused} stale={len(report.stale)}")
+        for entry in report.stale:
+            terminalreporter.write_line(f"stale: {entry}")
+    if not instrumentation.enabled or not instrumentation.session:
+        return
+    terminalreporter.section("instrumentation")
+    for (kind, name), histogram in sorted(instrumentation.session.items()):
+        stats = histogram.to_dict()
+        terminalreporter.write_line(f"{kind:<10} {name:<60} count={stats['count']} errors={stats['errors']} "
+                                    f"mean={stats['mean']:.4f}s p95={stats['p95']:.4f}s max={stats['max']:.4f}s")
+    slowest = instrumentation.slowest(config.getoption("--instrument-slowest"))
+    if slowest:
+        terminalreporter.write_line(f"slowest {len(slowest)} calls:")
+        for call in slowest:
+            terminalreporter.write_line(f"{call.duration:.4f}s {call.kind:<10} {call.name} ({call.test})")
@@ -0,0 +1,8 @@
+from draftcoreatqc.helpers.lazy_import import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    "TableHelper": "draftcoreatqc.helpers.ui_tabular_data:TableHelper",
+    "read_html_tables": "draftcoreatqc.helpers.html_tables:read_html_tables",
+    "compare_tables": "draftcoreatqc.helpers.table_diff:compare_tables",
+    "coerce_frame": "draftcoreatqc.helpers.table_types:coerce_frame",
+})
@@ -0,0 +1,347 @@
+"""
+Lightweight HTML tables parser
+Reads tables from the page source in a single pass, without building the document tree,
+and returns the same Dataframes as pandas.read_html
+"""
+from __future__ import annotations
+import re
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+from draftcoreatqc.helpers.lazy_import import lazy_module
+
+pd = lazy_module("pandas")
+
+_RE_WHITESPACE = re.compile(r"[\r\n]+|\s{2,}")
+_RE_HIDDEN = re.compile(r"display:\s*none")
+_RE_COMPOUND = re.compile(r"(?P<tag>\*|[a-zA-Z][\w-]*)?(?P<simple>(?:[#.][\w-]+|\[[^\]]+\])*)")
+_RE_SIMPLE = re.compile(r"""\#(?P<id>[\w-]+)|\.(?P<cls>[\w-]+)|\[\s*(?P<attr>[\w-]+)\s*"""
+                        r"""(?:(?P<op>[~^$*|]?=)\s*(?P<value>"[^"]*"|'[^']*'|[^\]\s]+)\s*)?\]""")
+
+VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input",
+                 "link", "meta", "param", "source", "track", "wbr"}
+HIDDEN_ELEMENTS = {"script", "style", "template"}
+CELLS = ("td", "th")
+SECTIONS = ("thead", "tbody", "tfoot")
+
+
+class UnsupportedSelectorError(ValueError):
+    """
+    Css selector uses syntax which is not supported by the parser (pseudo-classes, sibling combinators)
+    """
+
+
+class _Compound:
+    """
+    Compound css selector: tag, ids, classes and attributes of a single element
+    """
+
+    def __init__(self, text: str):
+        match = _RE_COMPOUND.fullmatch(text)
+        if not match or not text:
+            raise UnsupportedSelectorError(f"Unsupported css selector: {text}")
+        self.tag = match.group("tag") if match.group("tag") != "*" else None
+        self.conditions = []
+        for simple in _RE_SIMPLE.finditer(match.group("simple")):
+            if simple.group("id"):
+                self.conditions.append(("id", "=", simple.group("id")))
+            elif simple.group("cls"):
+                self.conditions.append(("class", "~=", simple.group("cls")))
+            else:
+                value = simple.group("value")
+                if value and value[0] in "'\"":
+                    value = value[1:-1]
+                self.conditions.append((simple.group("attr"), simple.group("op"), value))
+
+    def matches(self, tag: str, attrs: Dict[str, str]) -> bool:
+        if self.tag and self.tag.lower() != tag:
+            return False
+        for name, op, value in self.conditions:
+            actual = attrs.get(name)
+            if actual is None:
+                return False
+            if op is None:
+                continue
+            if op == "=" and actual != value \
+                    or op == "~=" and value not in actual.split() \
+                    or op == "^=" and not actual.startswith(value) \
+                    or op == "$=" and not actual.endswith(value) \
+                    or op == "*=" and value not in actual \
+                    or op == "|=" and actual != value and not actual.startswith(value + "-"):
+                return False
+        return True
+
+
+def compile_selector(selector: str) -> List[list]:
+    """
+    Compile css selector into the list of groups, each group is a list of (combinator, compound)
+    Supports tag, #id, .class, [attr], [attr=value] (and ~=, ^=, $=, *=, |=),
+    descendant and child combinators, and selector groups separated by comma
+    """
+    groups = []
+    for group_text in selector.split(","):
+        group, combinator, position = [], None, 0
+        text = group_text.strip()
+        if not text:
+            raise UnsupportedSelectorError(f"Unsupported css selector: {selector}")
+        while position < len(text):
+            if text[position].isspace():
+                combinator = combinator or " "
+                position += 1
+            elif text[position] == ">":
+                combinator = ">"
+                position += 1
+            else:
+                match = _RE_COMPOUND.match(text, position)
+                if not match or match.end() == position:
+                    raise UnsupportedSelectorError(f"Unsupported css selector: {selector}")
+                group.append((combinator if group else None, _Compound(match.group(0))))
+                combinator, position = None, match.end()
+        groups.append(group)
+    return groups
+
+
+class _Node:
+    __slots__ = ("tag", "attrs", "matched", "hidden", "role", "table")
+
+    def __init__(self, tag, attrs):
+        self.tag = tag
+        self.attrs = attrs
+        self.matched = False
+        self.hidden = False
+        self.role = None
+        self.table = None
+
+
+class _Table:
+    __slots__ = ("head_rows", "body_rows", "root_rows", "foot_rows", "section", "row", "cell", "has_text")
+
+    def __init__(self):
+        self.head_rows = []
+        self.body_rows = []
+        self.root_rows = []
+        self.foot_rows = []
+        self.section = None
+        self.row = None
+        self.cell = None
+        self.has_text = False
+
+
+class HtmlTablesParser(HTMLParser):
+    """
+    Single pass parser of tables matched with css selector \n
+    Every table which is matched itself or is inside matched element is collected.
+    Rows and cells are collected the same way as pandas.read_html does with displayed_only=True:
+    thead/tbody/tfoot sections, colspan/rowspan, hidden elements are skipped.
+    Nested tables are collected as separate tables.
+    """
+
+    def __init__(self, selector: str):
+        super().__init__(convert_charrefs=True)
+        self.selector = compile_selector(selector)
+        self.tables: List[_Table] = []
+        self._stack: List[_Node] = []
+        self._tables_stack: List[_Table] = []
+        self._open_cells = []
+        self._matched_depth = 0
+        self._hidden_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in CELLS:
+            self._close_implied(CELLS, stop=("tr", "table"))
+        elif tag == "tr":
+            self._close_implied(("tr",), stop=("table",))
+        elif tag in SECTIONS:
+            self._close_implied(SECTIONS, stop=("table",))
+        node = _Node(tag, {name: value or "" for name, value in attrs})
+        if tag not in VOID_ELEMENTS:
+            self._stack.append(node)
+            if self._matches():
+                node.matched = True
+                self._matched_depth += 1
+        if (tag == "table" or self._tables_stack) \
+                and (tag in HIDDEN_ELEMENTS or _RE_HIDDEN.search(node.attrs.get("style", ""))):
+            node.hidden = tag not in VOID_ELEMENTS
+            self._hidden_depth += node.hidden
+            return
+        if self._hidden_depth:
+            return
+        if tag == "br":
+            self.handle_data("\n")  # line breaks separate words, as pandas.read_html does
+        elif tag == "table" and self._matched_depth:
+            table = _Table()
+            self.tables.append(table)
+            self._tables_stack.append(table)
+            node.role, node.table = "table", table
+        elif self._tables_stack:
+            table = self._tables_stack[-1]
+            if tag in SECTIONS:
+                table.section = tag
+                node.role, node.table = "section", table
+            elif tag == "tr":
+                table.row = []
+                node.role, node.table = table.section or "root", table
+            elif tag in CELLS and table.row is not None:
+                table.cell = [tag == "th", [], _span(node.attrs.get("rowspan")), _span(node.attrs.get("colspan"))]
+                self._open_cells.append(table.cell)
+                node.role, node.table = "cell", table
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index].tag == tag:
+                while len(self._stack) > index:
+                    self._end_node(self._stack.pop())
+                return
+
+    def handle_data(self, data):
+        if self._hidden_depth or not self._tables_stack:
+            return
+        if not self._tables_stack[-1].has_text and data.strip("\n"):
+            for table in self._tables_stack:
+                table.has_text = True
+        for cell in self._open_cells:
+            cell[1].append(data)
+
+    def close(self):
+        super().close()
+        while self._stack:
+            self._end_node(self._stack.pop())
+
+    def frames(self) -> List[pd.DataFrame]:
+        """
+        Dataframes of all collected tables, which contain any text
+        """
+        frames = [_table_to_frame(table) for table in self.tables if table.has_text]
+        if not frames:
+            raise ValueError("No tables found")
+        return frames
+
+    def _matches(self) -> bool:
+        return any(self._match_at(group, len(group) - 1, len(self._stack) - 1) for group in self.selector)
+
+    def _match_at(self, group, part, position) -> bool:
+        combinator, compound = group[part]
+        node = self._stack[position]
+        if not compound.matches(node.tag, node.attrs):
+            return False
+        if part == 0:
+            return True
+        if combinator == ">":
+            return position > 0 and self._match_at(group, part - 1, position - 1)
+        return any(self._match_at(group, part - 1, ancestor) for ancestor in range(position - 1, -1, -1))
+
+    def _close_implied(self, tags, stop):
+        for index in range(len(self._stack) - 1, -1, -1):
+            tag = self._stack[index].tag
+            if tag in tags:
+                while len(self._stack) > index:
+                    self._end_node(self._stack.pop())
+                return
+            if tag in stop:
+                return
+
+    def _end_node(self, node: _Node):
+        self._matched_depth -= node.matched
+        self._hidden_depth -= node.hidden
+        table = node.table
+        if node.role == "cell":
+            is_th, parts, rowspan, colspan = table.cell
+            table.row.append((is_th, _RE_WHITESPACE.sub(" ", "".join(parts).strip()), rowspan, colspan))
+            self._open_cells.remove(table.cell)
+            table.cell = None
+        elif node.role in ("thead", "tbody", "tfoot", "root"):
+            rows = {"thead": table.head_rows, "tbody": table.body_rows,
+                    "tfoot": table.foot_rows, "root": table.root_rows}[node.role]
+            rows.append(table.row)
+            table.row = None
+        elif node.role == "section":
+            table.section = None
+        elif node.role == "table":
+            self._tables_stack.pop()
+
+
+def _span(value: Optional[str]) -> int:
+    try:
+        return max(int(value), 1) if value else 1
+    except ValueError:
+        return 1
+
+
+def _expand_colspan_rowspan(rows, remainder=None, overflow=True):
+    """
+    Expand cells with colspan/rowspan into text rows, same as pandas.read_html
+    """
+    all_texts = []
+    remainder = remainder if remainder is not None else []
+    for row in rows:
+        texts = []
+        next_remainder = []
+        index = 0
+        for _, text, rowspan, colspan in row:
+            while remainder and remainder[0][0] <= index:
+                prev_index, prev_text, prev_rowspan = remainder.pop(0)
+                texts.append(prev_text)
+                if prev_rowspan > 1:
+                    next_remainder.append((prev_index, prev_text, prev_rowspan - 1))
+                index += 1
+            for _ in range(colspan):
+                texts.append(text)
+                if rowspan > 1:
+                    next_remainder.append((index, text, rowspan - 1))
+                index += 1
+        for prev_index, prev_text, prev_rowspan in remainder:
+            texts.append(prev_text)
+            if prev_rowspan > 1:
+                next_remainder.append((prev_index, prev_text, prev_rowspan - 1))
+        all_texts.append(texts)
+        remainder = next_remainder
+    if not overflow:
+        while remainder:
+            next_remainder = []
+            texts = []
+            for prev_index, prev_text, prev_rowspan in remainder:
+                texts.append(prev_text)
+                if prev_rowspan > 1:
+                    next_remainder.append((prev_index, prev_text, prev_rowspan - 1))
+            all_texts.append(texts)
+            remainder = next_remainder
+    return all_texts, remainder
+
+
+def _table_to_frame(table: _Table) -> pd.DataFrame:
+    header_rows = list(table.head_rows)
+    body_rows = table.body_rows + table.root_rows
+    if not header_rows:
+        # the table has no <thead>, top rows with <th> cells only are the header
+        while body_rows and all(cell[0] for cell in body_rows[0]):
+            header_rows.append(body_rows.pop(0))
+    head, remainder = _expand_colspan_rowspan(header_rows)
+    body, remainder = _expand_colspan_rowspan(body_rows, remainder, overflow=len(table.foot_rows) > 0)
+    foot, _ = _expand_colspan_rowspan(table.foot_rows, remainder, overflow=False)
+
+    header = None
+    if head:
+        body = head + body
+        header = 0 if len(head) == 1 else [i for i, row in enumerate(head) if any(text for text in row)]
+    body += foot
+    width = max((len(row) for row in body), default=0)
+    body = [row + [""] * (width - len(row)) for row in body]
+    with pd.io.parsers.TextParser(body, header=header, thousands=",", decimal=".") as parser:
+        return parser.read()
+
+
+def read_html_tables(page_source: str, selector: str) -> List[pd.DataFrame]:
+    """
+    Read all tables matched with css selector (or placed inside matched elements)
+    :param page_source: Stringified HTML page source
+    :param selector: Css selector
+    :return: List of Dataframes, in the order of tables in the page source
+    """
+    parser = HtmlTablesParser(selector)
+    parser.feed(page_source)
+    parser.close()
+    return parser.frames()
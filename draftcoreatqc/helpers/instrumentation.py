@@ -0,0 +1,226 @@
+"""
+Instrumentation of hot paths: WebDriver commands, HTTP requests and JSON validation
+Calls are aggregated into latency histograms per test and per session
+"""
+import heapq
+import json
+import threading
+import time
+from bisect import bisect_left
+from collections import namedtuple
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+from draftcoreatqc.helpers.lazy_import import lazy_module
+
+# allure is imported only when test histograms are attached
+allure = lazy_module("allure")
+
+Call = namedtuple('Call', ['duration', 'kind', 'name', 'size', 'outcome', 'test'])
+
+# upper bounds of histogram buckets, in seconds (the last bucket is unbounded)
+BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    Latency histogram of calls of one kind and name
+    """
+    __slots__ = ("count", "errors", "total", "min", "max", "size", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.size = 0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def add(self, duration: float, size: int, outcome: str):
+        self.count += 1
+        self.errors += outcome == "error"
+        self.total += duration
+        self.min = min(self.min, duration)
+        self.max = max(self.max, duration)
+        self.size += size
+        self.buckets[bisect_left(BUCKETS, duration)] += 1
+
+    def percentile(self, percent: float) -> float:
+        """
+        Upper bound of the bucket where the percentile falls, in seconds
+        """
+        rank = self.count * percent / 100
+        seen = 0
+        for bound, count in zip(BUCKETS + (self.max,), self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "total": round(self.total, 6),
+            "mean": round(self.total / self.count, 6) if self.count else 0.0,
+            "min": round(self.min, 6) if self.count else 0.0,
+            "max": round(self.max, 6),
+            "p50": round(self.percentile(50), 6),
+            "p95": round(self.percentile(95), 6),
+            "size": self.size,
+            "buckets": dict(zip([str(bound) for bound in BUCKETS] + ["inf"], self.buckets))
+        }
+
+
+class Instrumentation:
+    """
+    Class of calls recorder \n
+    Disabled by default: instrumented code checks `enabled` flag before taking any measurement,
+    so the overhead of disabled instrumentation is a single attribute lookup.
+    """
+
+    def __init__(self, slowest: int = 10):
+        """
+        :param slowest: Number of the slowest calls kept for the report
+        """
+        self.enabled = False
+        self.slowest_size = slowest
+        self.test = None
+        self.session: Dict[Tuple[str, str], Histogram] = {}
+        self.tests: Dict[str, Dict[Tuple[str, str], Histogram]] = {}
+        self._slowest: List[Tuple[float, int, Call]] = []
+        self._recorded = 0
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def start_test(self, test: str):
+        """
+        Calls recorded from now on are attributed to the test
+        """
+        self.test = test
+
+    def finish_test(self):
+        self.test = None
+
+    def record(self, kind: str, name: str, duration: float, size: int = 0, outcome: str = "ok"):
+        """
+        Record a single call
+        :param kind: Kind of the call: webdriver, http, validation
+        :param name: Name of the call: command, method and path, schema
+        :param duration: Call duration, in seconds
+        :param size: Payload size, in bytes or characters
+        :param outcome: Outcome of the call, "error" if it raised
+        """
+        key = (kind, name)
+        test = self.test
+        with self._lock:
+            if key not in self.session:
+                self.session[key] = Histogram()
+            self.session[key].add(duration, size, outcome)
+            if test is not None:
+                histograms = self.tests.setdefault(test, {})
+                if key not in histograms:
+                    histograms[key] = Histogram()
+                histograms[key].add(duration, size, outcome)
+            self._recorded += 1
+            entry = (duration, self._recorded, Call(duration, kind, name, size, outcome, test))
+            if len(self._slowest) < self.slowest_size:
+                heapq.heappush(self._slowest, entry)
+            elif duration > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    @contextmanager
+    def measure(self, kind: str, name: str):
+        """
+        Context manager measuring the block as a call
+        Yields dict, where block can set "size" and "outcome" of the call
+        """
+        if not self.enabled:
+            yield {}
+            return
+        call = {"size": 0, "outcome": "ok"}
+        start = time.perf_counter()
+        try:
+            yield call
+        except Exception:
+            call["outcome"] = "error"
+            raise
+        finally:
+            self.record(kind, name, time.perf_counter() - start, call["size"], call["outcome"])
+
+    def slowest(self, count: int = None) -> List[Call]:
+        """
+        The slowest recorded calls, the slowest first
+        """
+        return [call for _, _, call in sorted(self._slowest, reverse=True)[:count]]
+
+    def to_dict(self) -> dict:
+        return {
+            "session": _histograms_to_dict(self.session),
+            "tests": {test: _histograms_to_dict(histograms) for test, histograms in self.tests.items()},
+            "slowest": [call._asdict() for call in self.slowest()]
+        }
+
+    def export_json(self, path: str):
+        """
+        Export session and per test histograms and the slowest calls to JSON file
+        """
+        with open(path, "w", encoding="utf-8") as report_file:
+            json.dump(self.to_dict(), report_file, indent=2)
+
+    def attach_test(self, test: str):
+        """
+        Attach histograms of the test to allure report
+        """
+        if test in self.tests:
+            allure.attach(body=json.dumps(_histograms_to_dict(self.tests[test]), indent=2),
+                          name="Instrumentation",
+                          attachment_type=allure.attachment_type.JSON)
+
+    def clear(self):
+        with self._lock:
+            self.session.clear()
+            self.tests.clear()
+            self._slowest.clear()
+
+
+def _histograms_to_dict(histograms: Dict[Tuple[str, str], Histogram]) -> dict:
+    result = {}
+    for (kind, name), histogram in sorted(histograms.items()):
+        result.setdefault(kind, {})[name] = histogram.to_dict()
+    return result
+
+
+instrumentation = Instrumentation()
+
+
+def instrument_driver(driver):
+    """
+    Record every WebDriver command of the driver (command name, latency, size of text result)
+    Can be called more than once for the same driver
+    """
+    if getattr(driver, "_draftcoreatqc_instrumented", False):
+        return driver
+    execute = driver.execute
+
+    def timed_execute(driver_command, params=None):
+        if not instrumentation.enabled:
+            return execute(driver_command, params)
+        start = time.perf_counter()
+        outcome, size = "error", 0
+        try:
+            response = execute(driver_command, params)
+            value = response.get("value") if isinstance(response, dict) else None
+            outcome, size = "ok", len(value) if isinstance(value, str) else 0
+            return response
+        finally:
+            instrumentation.record("webdriver", driver_command, time.perf_counter() - start, size, outcome)
+
+    driver.execute = timed_execute
+    driver._draftcoreatqc_instrumented = True
+    return driver
@@ -0,0 +1,37 @@
+"""
+JSON decoding with the fastest available parser
+"""
+from json import JSONEncoder, loads as json_loads
+try:
+    import orjson
+except ImportError:  # orjson is optional, json module is used without it
+    orjson = None
+
+
+def fast_loads(payload):
+    """
+    Decode JSON str or bytes with orjson if it is installed, otherwise with json module.
+    Documents orjson rejects (NaN, integers above 64 bits) are decoded with json module
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(payload)
+        except orjson.JSONDecodeError:
+            pass
+    return json_loads(payload)
+
+
+_indented_encoder = JSONEncoder(indent=2)
+
+
+def dumps_truncated(obj, max_size: int = 100000) -> str:
+    """
+    Indented JSON of the object, encoded only up to max_size characters
+    """
+    chunks, size = [], 0
+    for chunk in _indented_encoder.iterencode(obj):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > max_size:
+            return "".join(chunks)[:max_size] + f"\n... truncated to {max_size} characters"
+    return "".join(chunks)
@@ -0,0 +1,86 @@
+"""
+Lazy imports of heavy modules and package exports
+"""
+import functools
+import importlib
+import sys
+from typing import Callable, Dict, List, Tuple
+
+
+class LazyModule:
+    """
+    Module proxy, the module is imported on the first attribute access \n
+    Used for heavy dependencies (pandas, numpy, BeautifulSoup), so importing draftcoreatqc modules
+    stays cheap for test workers that never use them
+    """
+
+    def __init__(self, name: str):
+        """
+        :param name: Absolute name of the module
+        """
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def __getattr__(self, attribute: str):
+        module = self.__dict__["_module"]
+        if module is None:
+            module = importlib.import_module(self.__dict__["_name"])
+            self.__dict__["_module"] = module
+        return getattr(module, attribute)
+
+    def __repr__(self):
+        state = "imported" if self.__dict__["_module"] is not None else "not imported"
+        return f"<lazy module {self.__dict__['_name']!r} ({state})>"
+
+
+def lazy_module(name: str):
+    """
+    Module if it is already imported, otherwise LazyModule proxy importing it on the first use
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
+
+
+def lazy_step(title: str) -> Callable[[Callable], Callable]:
+    """
+    allure.step decorator which imports allure on the first call of the decorated function, not on decoration
+    :param title: Title of the step
+    """
+
+    def decorator(function: Callable) -> Callable:
+        step = None
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            nonlocal step
+            if step is None:
+                step = importlib.import_module("allure").step(title)(function)
+            return step(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def lazy_exports(package: str, exports: Dict[str, str]) -> Tuple[Callable, Callable[[], List[str]]]:
+    """
+    Module __getattr__ and __dir__ (PEP 562) importing package exports on the first access
+    :param package: Name of the package (__name__)
+    :param exports: Exported names mapped to "module:attribute"
+    :return: __getattr__ and __dir__ functions for the package module
+    """
+
+    def __getattr__(name: str):
+        if name not in exports:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        module_name, _, attribute = exports[name].partition(":")
+        value = getattr(importlib.import_module(module_name), attribute)
+        # the next access finds the attribute in the module without calling __getattr__
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(sys.modules[package])) | set(exports))
+
+    return __getattr__, __dir__
@@ -0,0 +1,379 @@
+"""
+Key-based comparison of large tables (UI tables against API or DB data)
+"""
+from __future__ import annotations
+import itertools
+import os
+import tempfile
+from collections import namedtuple
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+import allure
+from draftcoreatqc.helpers.lazy_import import lazy_module
+from draftcoreatqc.helpers.table_types import KINDS, Kind, coerce_series, infer_kind, parse_kind, to_datetime, \
+    to_text
+
+# pandas and numpy are imported on the first use
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+
+Table = Union["pd.DataFrame", Iterable["pd.DataFrame"]]
+
+# categories of the compared tables differ and integers of different width hash differently,
+# so they are compared as text and numbers
+COMPARABLE_KINDS = {"category": "text", "integer": "number"}
+# rows of the larger table per hash bucket when the number of buckets is derived from tables size
+BUCKET_ROWS = 250000
+
+
+class DiffReport(namedtuple('DiffReport', ['expected_rows', 'actual_rows', 'compared', 'mismatched', 'missing',
+                                           'extra', 'duplicates', 'column_mismatches', 'mismatch_examples',
+                                           'missing_examples', 'extra_examples'])):
+    """
+    Compact result of table comparison \n
+    Counts are complete, while examples are limited to max_examples rows:
+    mismatch_examples has key columns, column, expected and actual values,
+    missing_examples and extra_examples have key columns of rows missing in actual and not expected
+    """
+    __slots__ = ()
+
+    @property
+    def equal(self) -> bool:
+        return not (self.mismatched or self.missing or self.extra or self.duplicates)
+
+    def summary(self) -> str:
+        lines = [f"Expected rows: {self.expected_rows}, actual rows: {self.actual_rows}",
+                 f"Compared rows: {self.compared}, mismatched rows: {self.mismatched}",
+                 f"Missing rows: {self.missing}, extra rows: {self.extra}, duplicated keys: {self.duplicates}"]
+        lines += [f"Column {column}: {count} mismatches" for column, count in self.column_mismatches.items() if count]
+        return "\n".join(lines)
+
+    def __str__(self):
+        return self.summary()
+
+
+def infer_shared_kind(*samples: pd.Series, threshold: float = 0.9) -> str:
+    """
+    Kind shared by the same column of compared tables, inferred from the first rows of every sample:
+    number or percent if all of them are numbers (percent if one of them is),
+    datetime if one of them is datetime and the others parse as datetimes, text otherwise
+    :param threshold: Share of not empty values that have to be parsed
+    """
+    kinds = {_comparable_kind(infer_kind(sample, threshold=threshold)) for sample in samples}
+    if kinds <= {"number", "percent"}:
+        return "percent" if "percent" in kinds else "number"
+    if "datetime" in kinds and all(to_datetime(to_text(sample.head(1000)).dropna()).notna().mean() >= threshold
+                                   for sample in samples):
+        return "datetime"
+    return "text"
+
+
+@allure.step("Compare tables")
+def compare_tables(expected: Table,
+                   actual: Table,
+                   keys: Union[str, List[str]],
+                   columns: List[str] = None,
+                   kinds: Dict[str, Kind] = None,
+                   atol: Union[float, Dict[str, float]] = 0.0,
+                   rtol: Union[float, Dict[str, float]] = 0.0,
+                   buckets: int = None,
+                   bucket_rows: int = BUCKET_ROWS,
+                   max_examples: int = 1000,
+                   attach: bool = True,
+                   attach_rows: int = 100) -> DiffReport:
+    """
+    Compare rows of two tables matched by key columns, column by column with vectorized operations. \n
+    Values are normalized before comparison, so "1,234.50" from UI equals 1234.5 from API.
+    Tables can be given as Dataframes or as iterables of Dataframe chunks (e.g. iter_paginated_table_data pages).
+    Tables larger than bucket_rows are spilled to disk partitioned by key hash and compared bucket by bucket,
+    so only one bucket of both tables is kept in memory.
+
+    :param expected: Expected table or its chunks
+    :param actual: Actual table or its chunks
+    :param keys: Key column or columns
+    :param columns: Compared columns (all columns of expected table but keys by default)
+    :param kinds: Kinds of columns (keys included): auto or table_types kind (text, category, number, integer,
+                  percent, datetime, "datetime:<format>" or normalizing function Series -> Series).
+                  Auto kind is inferred from the first chunks of both tables
+    :param atol: Absolute tolerance of numbers (seconds for datetimes), common or per column
+    :param rtol: Relative tolerance of numbers, common or per column
+    :param buckets: Number of hash buckets rows are partitioned into, 1 compares tables in memory
+                    (derived from the number of rows of the larger table and bucket_rows by default)
+    :param bucket_rows: Rows of the larger table per bucket when buckets are derived from tables size
+    :param max_examples: Maximum number of rows in each examples Dataframe of the report
+    :param attach: Whether a truncated diff is attached to allure when tables differ
+    :param attach_rows: Maximum number of rows in attached diff
+    :return: Diff report
+    """
+    keys = [keys] if isinstance(keys, str) else list(keys)
+    expected_chunks, actual_chunks = _chunks(expected), _chunks(actual)
+    first_expected, first_actual = next(expected_chunks, None), next(actual_chunks, None)
+    if first_expected is None or first_actual is None:
+        raise ValueError("Tables to compare have no chunks")
+    columns = list(columns) if columns is not None else [column for column in first_expected.columns
+                                                         if column not in keys]
+    for table, first in (("expected", first_expected), ("actual", first_actual)):
+        absent = [column for column in keys + columns if column not in first.columns]
+        if absent:
+            raise ValueError(f"Columns {absent} are not found in {table} table")
+    # integer keys are compared as numbers, report restores them as integers
+    integer_keys = [key for key in keys if (kinds or {}).get(key) == "integer"
+                    or pd.api.types.is_integer_dtype(first_expected[key])
+                    or pd.api.types.is_integer_dtype(first_actual[key])]
+    kinds = _resolve_kinds(first_expected, first_actual, keys + columns, kinds or {})
+    expected_chunks = _normalized(_chain(first_expected, expected_chunks), keys, columns, kinds)
+    actual_chunks = _normalized(_chain(first_actual, actual_chunks), keys, columns, kinds)
+    diff = _Diff(keys, columns, kinds, atol, rtol, max_examples, integer_keys)
+    with tempfile.TemporaryDirectory(prefix="table-diff-") as spill_dir:
+        if buckets is None:
+            expected_rows, expected_chunks = _counted(expected_chunks, bucket_rows,
+                                                      os.path.join(spill_dir, "expected-chunk"))
+            actual_rows, actual_chunks = _counted(actual_chunks, bucket_rows, os.path.join(spill_dir, "actual-chunk"))
+            buckets = -(-max(expected_rows, actual_rows) // bucket_rows)
+        if buckets <= 1:
+            diff.compare(pd.concat(list(expected_chunks), ignore_index=True),
+                         pd.concat(list(actual_chunks), ignore_index=True))
+        else:
+            expected_files, expected_empty = _spill(expected_chunks, keys, buckets,
+                                                    os.path.join(spill_dir, "expected"))
+            actual_files, actual_empty = _spill(actual_chunks, keys, buckets, os.path.join(spill_dir, "actual"))
+            for bucket in range(buckets):
+                diff.compare(_load(expected_files[bucket], expected_empty),
+                             _load(actual_files[bucket], actual_empty))
+    report = diff.report()
+    if attach and not report.equal:
+        attach_diff(report, rows=attach_rows)
+    return report
+
+
+def attach_diff(report: DiffReport, name: str = "Table diff", rows: int = 100):
+    """
+    Attach summary and the first rows of mismatches, missing and extra rows to allure
+    """
+    allure.attach(body=report.summary(), name=f"{name}: summary", attachment_type=allure.attachment_type.TEXT)
+    for title, examples in (("mismatches", report.mismatch_examples),
+                            ("missing rows", report.missing_examples),
+                            ("extra rows", report.extra_examples)):
+        if len(examples):
+            allure.attach(body=examples.head(rows).to_csv(index=False),
+                          name=f"{name}: {title}",
+                          attachment_type=allure.attachment_type.CSV)
+
+
+class _Diff:
+    """
+    Accumulator of bucket comparisons
+    """
+
+    def __init__(self, keys, columns, kinds, atol, rtol, max_examples, integer_keys=()):
+        self.keys = keys
+        self.integer_keys = list(integer_keys)
+        self.columns = columns
+        self.kinds = kinds
+        self.atol = atol
+        self.rtol = rtol
+        self.max_examples = max_examples
+        self.expected_rows = 0
+        self.actual_rows = 0
+        self.compared = 0
+        self.mismatched = 0
+        self.missing = 0
+        self.extra = 0
+        self.duplicates = 0
+        self.column_mismatches = dict.fromkeys(columns, 0)
+        self.mismatch_examples: List[pd.DataFrame] = []
+        self.missing_examples: List[pd.DataFrame] = []
+        self.extra_examples: List[pd.DataFrame] = []
+        self._examples = {"mismatch": 0, "missing": 0, "extra": 0}
+
+    def compare(self, expected: pd.DataFrame, actual: pd.DataFrame):
+        self.expected_rows += len(expected)
+        self.actual_rows += len(actual)
+        if not len(expected) and not len(actual):
+            return
+        expected, actual = self._deduplicated(expected), self._deduplicated(actual)
+        # positional names, so suffixes of merged columns never collide with table columns
+        key_names = [f"k{i}" for i in range(len(self.keys))]
+        merged = expected.set_axis(key_names + [f"e{i}" for i in range(len(self.columns))], axis=1).merge(
+            actual.set_axis(key_names + [f"a{i}" for i in range(len(self.columns))], axis=1),
+            on=key_names, how="outer", indicator=True, sort=False)
+        side = merged["_merge"].to_numpy()
+        both = side == "both"
+        self._keys_examples("missing", merged.loc[side == "left_only", key_names], self.missing_examples)
+        self._keys_examples("extra", merged.loc[side == "right_only", key_names], self.extra_examples)
+        self.missing += int((side == "left_only").sum())
+        self.extra += int((side == "right_only").sum())
+        merged = merged.loc[both]
+        self.compared += len(merged)
+        any_mismatch = np.zeros(len(merged), dtype=bool)
+        for i, column in enumerate(self.columns):
+            mismatch = self._mismatch(merged[f"e{i}"], merged[f"a{i}"], column)
+            count = int(mismatch.sum())
+            if not count:
+                continue
+            any_mismatch |= mismatch
+            self.column_mismatches[column] += count
+            room = self.max_examples - self._examples["mismatch"]
+            if room > 0:
+                rows = merged.loc[mismatch, key_names + [f"e{i}", f"a{i}"]].head(room)
+                examples = rows.set_axis(self.keys + ["expected", "actual"], axis=1).astype(
+                    {"expected": object, "actual": object})
+                examples.insert(len(self.keys), "column", column)
+                self.mismatch_examples.append(examples)
+                self._examples["mismatch"] += len(examples)
+        self.mismatched += int(any_mismatch.sum())
+
+    def report(self) -> DiffReport:
+        key_frame = pd.DataFrame(columns=self.keys)
+        return DiffReport(self.expected_rows, self.actual_rows, self.compared, self.mismatched, self.missing,
+                          self.extra, self.duplicates, dict(self.column_mismatches),
+                          self._integer_keys(_concat(self.mismatch_examples,
+                                                     pd.DataFrame(columns=self.keys + ["column", "expected",
+                                                                                       "actual"]))),
+                          self._integer_keys(_concat(self.missing_examples, key_frame)),
+                          self._integer_keys(_concat(self.extra_examples, key_frame)))
+
+    def _integer_keys(self, examples: pd.DataFrame) -> pd.DataFrame:
+        for key in self.integer_keys:
+            values = pd.to_numeric(examples[key], errors="coerce")
+            present = values.dropna()
+            if len(present) != examples[key].notna().sum() or (present % 1 != 0).any():
+                continue
+            examples[key] = values.astype("int64" if len(present) == len(values) else "Int64")
+        return examples
+
+    def _deduplicated(self, table: pd.DataFrame) -> pd.DataFrame:
+        duplicated = table.duplicated(self.keys).to_numpy()
+        count = int(duplicated.sum())
+        if not count:
+            return table
+        self.duplicates += count
+        return table.loc[~duplicated]
+
+    def _keys_examples(self, kind: str, rows: pd.DataFrame, examples: List[pd.DataFrame]):
+        room = self.max_examples - self._examples[kind]
+        if room > 0 and len(rows):
+            rows = rows.head(room).set_axis(self.keys, axis=1)
+            examples.append(rows)
+            self._examples[kind] += len(rows)
+
+    def _mismatch(self, expected: pd.Series, actual: pd.Series, column: str) -> np.ndarray:
+        kind = self.kinds[column]
+        expected_missing, actual_missing = expected.isna().to_numpy(), actual.isna().to_numpy()
+        if callable(kind):
+            kind = "datetime" if pd.api.types.is_datetime64_any_dtype(expected) else \
+                "number" if pd.api.types.is_numeric_dtype(expected) and pd.api.types.is_numeric_dtype(actual) \
+                else "text"
+        else:
+            kind = parse_kind(kind)[0]
+        if kind in ("number", "percent"):
+            atol, rtol = _tolerance(self.atol, column), _tolerance(self.rtol, column)
+            return ~np.isclose(expected.to_numpy(dtype="float64"), actual.to_numpy(dtype="float64"),
+                               rtol=rtol, atol=atol, equal_nan=True)
+        if kind == "datetime":
+            delta = (expected - actual).abs().dt.total_seconds().to_numpy()
+            differs = np.zeros(len(expected), dtype=bool)
+            both = ~(expected_missing | actual_missing)
+            differs[both] = delta[both] > _tolerance(self.atol, column)
+            return differs | (expected_missing != actual_missing)
+        differs = (expected != actual).fillna(True).to_numpy(dtype=bool)
+        return differs & ~(expected_missing & actual_missing)
+
+
+def _tolerance(tolerance: Union[float, Dict[str, float]], column: str) -> float:
+    if isinstance(tolerance, dict):
+        return float(tolerance.get(column, 0.0))
+    return float(tolerance)
+
+
+def _resolve_kinds(expected: pd.DataFrame,
+                   actual: pd.DataFrame,
+                   columns: List[str],
+                   kinds: Dict[str, Kind]) -> Dict[str, Kind]:
+    resolved = {}
+    for column in columns:
+        kind = kinds.get(column, "auto")
+        if kind == "auto":
+            resolved[column] = infer_shared_kind(expected[column], actual[column])
+            continue
+        if not callable(kind) and parse_kind(kind)[0] not in KINDS:
+            raise ValueError(f"Unknown kind of column {column}: {kind}, expected auto or one of {', '.join(KINDS)}")
+        resolved[column] = _comparable_kind(kind)
+    return resolved
+
+
+def _chunks(table: Table) -> Iterator[pd.DataFrame]:
+    if isinstance(table, pd.DataFrame):
+        return iter([table])
+    return iter(table)
+
+
+def _chain(first: pd.DataFrame, rest: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    yield first
+    yield from rest
+
+
+def _normalized(chunks: Iterator[pd.DataFrame],
+                keys: List[str],
+                columns: List[str],
+                kinds: Dict[str, Kind]) -> Iterator[pd.DataFrame]:
+    for chunk in chunks:
+        yield pd.DataFrame({column: coerce_series(chunk[column], kinds[column]).reset_index(drop=True)
+                            for column in keys + columns})
+
+
+def _comparable_kind(kind: Kind) -> Kind:
+    if callable(kind):
+        return kind
+    name, kind_format = parse_kind(kind)
+    return kind if kind_format else COMPARABLE_KINDS.get(name, name)
+
+
+def _spill(chunks: Iterator[pd.DataFrame],
+           keys: List[str],
+           buckets: int,
+           prefix: str) -> Tuple[Dict[int, List[str]], pd.DataFrame]:
+    """
+    Write rows of every chunk to pickle files per key hash bucket
+    :return: Files per bucket and empty table with columns types of the chunks
+    """
+    files: Dict[int, List[str]] = {bucket: [] for bucket in range(buckets)}
+    empty = None
+    for number, chunk in enumerate(chunks):
+        if empty is None:
+            empty = chunk.iloc[:0]
+        bucket_of_row = pd.util.hash_pandas_object(chunk[keys], index=False).to_numpy() % buckets
+        for bucket, rows in chunk.groupby(bucket_of_row, sort=False):
+            path = f"{prefix}-{bucket}-{number}.pkl"
+            rows.to_pickle(path)
+            files[int(bucket)].append(path)
+    return files, empty
+
+
+def _counted(chunks: Iterator[pd.DataFrame],
+             rows_limit: int,
+             prefix: str) -> Tuple[int, Iterator[pd.DataFrame]]:
+    """
+    Count rows of the chunks, keeping them in memory up to rows_limit rows, then writing them to pickle files
+    :return: Number of rows and the chunks to iterate again, in the original order
+    """
+    kept, paths, rows = [], [], 0
+    for chunk in chunks:
+        rows += len(chunk)
+        kept.append(chunk)
+        if rows > rows_limit:
+            for frame in kept:
+                path = f"{prefix}-{len(paths)}.pkl"
+                frame.to_pickle(path)
+                paths.append(path)
+            kept = []
+    return rows, itertools.chain((pd.read_pickle(path) for path in paths), kept)
+
+
+def _load(paths: List[str], empty: pd.DataFrame) -> pd.DataFrame:
+    if not paths:
+        return empty
+    return pd.concat([pd.read_pickle(path) for path in paths], ignore_index=True)
+
+
+def _concat(frames: List[pd.DataFrame], empty: pd.DataFrame) -> pd.DataFrame:
+    return pd.concat(frames, ignore_index=True) if frames else empty
@@ -0,0 +1,208 @@
+"""
+Typed columns coercion of scraped tables
+"""
+from __future__ import annotations
+import warnings
+from collections import namedtuple
+from typing import Callable, Dict, Tuple, Union
+from draftcoreatqc.helpers.lazy_import import lazy_module
+
+# pandas and numpy are imported on the first use
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+
+KINDS = ("text", "category", "number", "integer", "percent", "datetime")
+
+Kind = Union[str, Callable[["pd.Series"], "pd.Series"]]
+
+CoercionResult = namedtuple('CoercionResult', ['frame', 'kinds', 'unparsed'])
+
+# characters dropped from formatted numbers: thousands separators, currency signs, percent sign
+NUMBER_NOISE = r"[\s\u00a0\u202f',$\u20ac\u00a3%]"
+# dates like 2024-01-31, 31.01.2024, 1/31/24 (optionally followed by time)
+DATE_LIKE = r"^\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}"
+
+
+def to_text(series: pd.Series) -> pd.Series:
+    """
+    Strings with collapsed whitespaces, empty strings and missing values are NA
+    """
+    text = series.astype("string").str.strip().str.replace(r"\s+", " ", regex=True)
+    return text.mask((text == "").fillna(False))
+
+
+def to_category(series: pd.Series) -> pd.Series:
+    """
+    Categorical of normalized strings, for columns with repeated values (statuses, countries, names)
+    """
+    return to_text(series).astype("category")
+
+
+def to_number(series: pd.Series) -> pd.Series:
+    """
+    Float numbers parsed from formatted strings: "1,234.5", "$ 1 234", "(1,234)", "\u221212", "12.5%" (as 12.5).
+    Not parsed values are NaN
+    """
+    if _is_number(series):
+        return series.astype("float64")
+    text = series.astype("string").str.strip()
+    negative = text.str.startswith("(") & text.str.endswith(")")
+    text = text.str.replace(NUMBER_NOISE, "", regex=True).str.strip("()").str.replace("\u2212", "-", regex=False)
+    numbers = pd.to_numeric(text.astype(object).where(text.notna(), None), errors="coerce").astype("float64")
+    return numbers.mask(negative.fillna(False).to_numpy(dtype=bool), -numbers)
+
+
+def to_integer(series: pd.Series) -> pd.Series:
+    """
+    Integers of the smallest type fitting the values, nullable Int64 if some values are missing.
+    Numbers with fractional part are not parsed
+    """
+    numbers = to_number(series)
+    numbers = numbers.mask(numbers % 1 != 0)
+    if numbers.isna().any():
+        return numbers.astype("Int64")
+    return pd.to_numeric(numbers, downcast="integer")
+
+
+def to_percent(series: pd.Series) -> pd.Series:
+    """
+    Fractions parsed from percent strings ("12.5%" is 0.125), numbers are taken as fractions already
+    """
+    if _is_number(series):
+        return series.astype("float64")
+    percents = series.astype("string").str.strip().str.endswith("%").fillna(False).to_numpy(dtype=bool)
+    numbers = to_number(series)
+    return numbers.mask(percents, numbers / 100)
+
+
+def to_datetime(series: pd.Series, format: str = None, dayfirst: bool = False) -> pd.Series:
+    """
+    Datetimes parsed from strings (with the format, if given), not parsed values are NaT
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    with warnings.catch_warnings():
+        # values not matching the format inferred from the first value are parsed one by one
+        warnings.simplefilter("ignore", UserWarning)
+        return pd.to_datetime(to_text(series).astype(object), errors="coerce", format=format, dayfirst=dayfirst)
+
+
+COERCERS: Dict[str, Callable[[pd.Series], pd.Series]] = {
+    "text": to_text,
+    "category": to_category,
+    "number": to_number,
+    "integer": to_integer,
+    "percent": to_percent,
+    "datetime": to_datetime,
+}
+
+
+def infer_kind(series: pd.Series,
+               threshold: float = 0.9,
+               sample_rows: int = 1000,
+               category_ratio: float = 0.5) -> str:
+    """
+    Kind of the column inferred from its first rows: integer, number, percent, datetime, category or text
+    :param threshold: Share of not empty values that have to be parsed
+    :param sample_rows: Number of the first rows that are checked
+    :param category_ratio: Maximum share of unique values of category column
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "datetime"
+    if _is_number(series):
+        return "integer" if pd.api.types.is_integer_dtype(series) else "number"
+    if pd.api.types.is_bool_dtype(series):
+        return "text"
+    sample = to_text(series.head(sample_rows)).dropna()
+    if not len(sample):
+        return "text"
+    numbers = to_number(sample)
+    if numbers.notna().mean() >= threshold:
+        if sample.str.endswith("%").mean() >= threshold:
+            return "percent"
+        return "integer" if (numbers.dropna() % 1 == 0).all() else "number"
+    if sample.str.match(DATE_LIKE).mean() >= threshold and to_datetime(sample).notna().mean() >= threshold:
+        return "datetime"
+    if sample.nunique() <= len(sample) * category_ratio:
+        return "category"
+    return "text"
+
+
+def coerce_series(series: pd.Series, kind: Kind) -> pd.Series:
+    """
+    Coerce column to the kind (one of KINDS, "datetime:<format>" or function Series -> Series).
+    Columns of repeated strings (dates, percents, statuses) are parsed by their unique values only
+    """
+    coercer = _coercer(kind)
+    if series.dtype != object and not pd.api.types.is_string_dtype(series):
+        return coercer(series).set_axis(series.index)
+    codes, uniques = pd.factorize(series)
+    if len(uniques) > len(series) // 2:
+        return coercer(series).set_axis(series.index)
+    coerced = coercer(pd.Series(uniques, dtype=object))
+    # missing values have code -1, taken as missing value of the coerced type
+    return pd.Series(coerced.array.take(codes, allow_fill=True), index=series.index, name=series.name)
+
+
+def coerce_frame(frame: pd.DataFrame,
+                 types: Union[str, Dict[str, Kind]] = "infer",
+                 threshold: float = 0.9) -> CoercionResult:
+    """
+    Convert string columns of the table into compact typed columns with vectorized string operations
+
+    :param frame: Table Dataframe
+    :param types: "infer" to infer kinds of all columns, or kinds of columns
+                  (one of KINDS, "infer", "datetime:<format>" or function Series -> Series),
+                  columns not listed are left as is
+    :param threshold: Share of not empty values that have to be parsed to infer the kind
+    :return: Coerced Dataframe, kinds of coerced columns and unparsed cells
+             (row index, column and original value of not empty cells that could not be parsed)
+    """
+    if isinstance(types, str):
+        if types != "infer":
+            raise ValueError(f"Unknown types: {types}, expected \"infer\" or kinds of columns")
+        types = dict.fromkeys(frame.columns, "infer")
+    kinds, unparsed = {}, []
+    coerced = frame.copy(deep=False)
+    for column, kind in types.items():
+        if column not in frame.columns:
+            raise ValueError(f"Column {column} is not found in the table")
+        series = frame[column]
+        kind = infer_kind(series, threshold=threshold) if kind == "infer" else kind
+        coerced[column] = coerce_series(series, kind)
+        kinds[column] = kind
+        missing = coerced[column].isna().to_numpy()
+        if missing.any():
+            # only cells that were not empty before coercion are reported
+            failed = missing & to_text(series).notna().to_numpy()
+            if failed.any():
+                unparsed.append(pd.DataFrame({"row": frame.index[failed], "column": column,
+                                              "value": series[failed].to_numpy(dtype=object)}))
+    unparsed = pd.concat(unparsed, ignore_index=True) if unparsed else pd.DataFrame(columns=["row", "column",
+                                                                                             "value"])
+    return CoercionResult(coerced, kinds, unparsed)
+
+
+def parse_kind(kind: str) -> Tuple[str, str]:
+    """
+    Kind name and format of "datetime:<format>" kind
+    """
+    name, _, kind_format = kind.partition(":")
+    return name, kind_format
+
+
+def _is_number(series: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+def _coercer(kind: Kind) -> Callable[[pd.Series], pd.Series]:
+    if callable(kind):
+        return kind
+    kind, datetime_format = parse_kind(kind)
+    if kind not in COERCERS:
+        raise ValueError(f"Unknown column kind: {kind}, expected one of {', '.join(KINDS)}")
+    if datetime_format:
+        if kind != "datetime":
+            raise ValueError(f"Format can be set for datetime kind only, got {kind}")
+        return lambda series: to_datetime(series, format=datetime_format)
+    return COERCERS[kind]
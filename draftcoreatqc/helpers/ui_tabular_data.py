@@ -1,12 +1,24 @@
 """
 Helpers for all UI Tabular data
 """
-from typing import List, Union
-from bs4 import BeautifulSoup
-from selenium.webdriver.remote.webelement import WebElement
-import pandas as pd
-import allure
-from draftcoreatqc.ui.locator import Locators
+from __future__ import annotations
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import StringIO
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Union
+from draftcoreatqc.helpers.html_tables import read_html_tables, UnsupportedSelectorError
+from draftcoreatqc.helpers.lazy_import import lazy_module, lazy_step
+from draftcoreatqc.helpers.table_types import CoercionResult, Kind, coerce_frame
+
+if TYPE_CHECKING:
+    from selenium.webdriver.remote.webelement import WebElement
+    from draftcoreatqc.ui.locator import Locators
+
+# pandas, numpy, BeautifulSoup and allure are imported on the first use, selenium only when the browser is paginated
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+bs4 = lazy_module("bs4")
+allure = lazy_module("allure")
 
 
 class TableHelper:
@@ -16,23 +28,27 @@ class TableHelper:
 
     def __init__(self, base):
         self.base = base
+        self.last_coercion: Optional[CoercionResult] = None
 
-    @allure.step("Get table data using selenium")
+    @lazy_step("Get table data using selenium")
     def get_table_data_using_selenium(self,
                                       table_values_locator: Locators.Locator,
                                       table_header_locator: Locators.Locator,
                                       table_total_locator: Locators.Locator = None,
-                                      columns_strings: List = None) -> pd.DataFrame:
+                                      columns_strings: List = None,
+                                      types: Union[str, Dict[str, Kind]] = None) -> pd.DataFrame:
 
         """
         Generic Method for receiving data from all standard tables using selenium
         Is slower than get_table_data_using_soup, but is more flexible with table elements
+        Reads every cell separately, see get_table_data_using_js for the single round trip version
 
         :param table_values_locator: Locator for all cells in the table
         :param table_header_locator: Locator for all columns headers in the table
         :param table_total_locator: Locator for total cells in the table (if any)
         :param columns_strings: Names of the columns in case it has to be customized
                                 or cannot be received from the table header elements
+        :param types: Kinds of columns the cells are coerced to, see coerce_columns (strings are kept if not set)
         :return: Dataframe with table cells values
         """
 
@@ -48,20 +64,60 @@ class TableHelper:
             )
         else:
             table_total = None
-        columns_per_values = self.transform_values_to_column_rows(
-            # transform values and columns to rows [{C1: V1, C2: V2}, {C1: V3, C2: V4}, ... {Cn: Vn, Cn: Vn}]
+        frame = self.transform_values_to_frame(
+            # reshape values to rows [[V1, V2], [V3, V4], ... [Vn-1, Vn]] under columns [C1, C2]
             columns=columns_txt,
             values=values_txt,
             totals=table_total,
             columns_strings=columns_strings
         )
-        return pd.DataFrame(columns_per_values)
+        return frame if types is None else self.coerce_columns(frame, types).frame
+
+    @lazy_step("Get table data using javascript")
+    def get_table_data_using_js(self,
+                                table_values_locator: Locators.Locator,
+                                table_header_locator: Locators.Locator,
+                                table_total_locator: Locators.Locator = None,
+                                columns_strings: List = None,
+                                timeout=10,
+                                types: Union[str, Dict[str, Kind]] = None) -> pd.DataFrame:
 
-    @allure.step("Get Table Data Frame using Beautiful Soup library")
+        """
+        Generic Method for receiving data from all standard tables using a single script call. \n
+        Returns the same dataframe as get_table_data_using_selenium, but texts of all headers,
+        values and totals are read in the browser at once instead of one request per cell.
+
+        :param table_values_locator: Locator for all cells in the table
+        :param table_header_locator: Locator for all columns headers in the table
+        :param table_total_locator: Locator for total cells in the table (if any)
+        :param columns_strings: Names of the columns in case it has to be customized
+                                or cannot be received from the table header elements
+        :param timeout: Time to wait for the table cells to be present
+        :param types: Kinds of columns the cells are coerced to, see coerce_columns (strings are kept if not set)
+        :return: Dataframe with table cells values
+        """
+
+        self.base.find_present_element(table_values_locator, timeout=timeout)
+        locators = [table_values_locator, table_header_locator]
+        if table_total_locator:
+            locators.append(table_total_locator)
+        texts = self.base.get_all_elements_texts(locators)
+        values_txt, columns_txt = texts[0], texts[1]
+        table_total = texts[2] if table_total_locator else None
+        frame = self.transform_values_to_frame(
+            columns=columns_txt,
+            values=values_txt,
+            totals=table_total,
+            columns_strings=columns_strings
+        )
+        return frame if types is None else self.coerce_columns(frame, types).frame
+
+    @lazy_step("Get Table Data Frame using Beautiful Soup library")
     def get_table_data_using_soup(self,
                                   table_locator_css: Locators.Locator,
                                   page_source: str,
-                                  return_all_df: bool = False):
+                                  return_all_df: bool = False,
+                                  types: Union[str, Dict[str, Kind]] = None):
 
         """
         Generic Method for receiving data from all standard tables using beautiful soup. \n
@@ -74,21 +130,175 @@ class TableHelper:
         :param page_source: Stringified HTML page source where table can be found
         :param return_all_df: Boolean value whether all tables, found with the locator,
                               should be combined into resulting dataframe
+        :param types: Kinds of columns the cells are coerced to, see coerce_columns (pandas types are kept if not set)
         :return: Dataframe with table cells values
         """
 
         if table_locator_css.by != 'css selector':
             raise ValueError("You can use css selector only !")
-        soup = BeautifulSoup(page_source, "html.parser")
+        soup = bs4.BeautifulSoup(page_source, "html.parser")
 
         ts = soup.select(selector=table_locator_css.value)  # tables source
-        df_list = pd.read_html(str(ts))  # the list of all Data Frames
+        df_list = pd.read_html(StringIO(str(ts)))  # the list of all Data Frames
+        return self._typed_frames(df_list, return_all_df, types)
+
+    @lazy_step("Get Table Data Frame using HTML tables parser")
+    def get_table_data_using_parser(self,
+                                    table_locator_css: Locators.Locator,
+                                    page_source: str,
+                                    return_all_df: bool = False,
+                                    types: Union[str, Dict[str, Kind]] = None):
+
+        """
+        Generic Method for receiving data from all standard tables with single pass HTML parser. \n
+        Returns the same dataframes as get_table_data_using_soup, but page source is parsed only once
+        and without building the whole document tree. \n
+        Supports css selectors by tag, id, class and attributes with descendant and child combinators,
+        falls back to get_table_data_using_soup for other selectors.
+
+        :param table_locator_css: Locator (by css selector) to find the table
+        :param page_source: Stringified HTML page source where table can be found
+        :param return_all_df: Boolean value whether all tables, found with the locator,
+                              should be returned
+        :param types: Kinds of columns the cells are coerced to, see coerce_columns (pandas types are kept if not set)
+        :return: Dataframe with table cells values
+        """
+
+        if table_locator_css.by != 'css selector':
+            raise ValueError("You can use css selector only !")
+        try:
+            df_list = read_html_tables(page_source, table_locator_css.value)
+        except UnsupportedSelectorError:
+            return self.get_table_data_using_soup(table_locator_css, page_source, return_all_df, types)
+        return self._typed_frames(df_list, return_all_df, types)
+
+    def _typed_frames(self,
+                      df_list: List[pd.DataFrame],
+                      return_all_df: bool,
+                      types: Union[str, Dict[str, Kind]]) -> Union[pd.DataFrame, List[pd.DataFrame]]:
         if not return_all_df:
-            return df_list[0]
-        else:
-            return df_list
+            df_list = df_list[:1]
+        if types is not None:
+            df_list = [self.coerce_columns(frame, types).frame for frame in df_list]
+        return df_list if return_all_df else df_list[0]
+
+    def iter_paginated_table_data(self,
+                                  table_locator_css: Locators.Locator,
+                                  next_page_locator: Locators.Locator = None,
+                                  url_template: str = None,
+                                  pages: Iterable = None,
+                                  max_pages: int = None,
+                                  max_workers: int = 4,
+                                  max_pending: int = None,
+                                  processes: bool = False,
+                                  all_tables: bool = False,
+                                  timeout=10) -> Iterator[pd.DataFrame]:
+
+        """
+        Generator of table Dataframes of paginated report, one per page, in pages order. \n
+        Pages are parsed in a worker pool while the browser opens and renders the next page,
+        so parsing of page N overlaps with loading of page N+1. At most max_pending page sources
+        are kept in memory: the generator waits for the oldest page to be parsed before opening the next one. \n
+        Pages are opened either by clicking next page element, until it is missing, hidden or disabled,
+        or by navigating to url_template formatted with every page of pages.
+        :param table_locator_css: Locator (by css selector) to find the table
+        :param next_page_locator: Locator of next page button
+        :param url_template: URL of a page with {page} placeholder, e.g. "https://host/report?page={page}"
+        :param pages: Pages substituted into url_template, e.g. range(1, 501)
+        :param max_pages: Maximum number of pages to read
+        :param max_workers: Number of parsing workers
+        :param max_pending: Maximum number of page sources waiting for parsing (twice max_workers by default)
+        :param processes: Whether pages are parsed in worker processes instead of threads (for CPU bound parsing
+                          of huge pages, at the cost of sending page sources to the processes)
+        :param all_tables: Whether all tables found on the page are concatenated, otherwise the first one is used
+        :param timeout: Time to wait for the table of every page
+        :return: Generator of Dataframes with table cells values per page
+        """
+
+        if table_locator_css.by != 'css selector':
+            raise ValueError("You can use css selector only !")
+        if (next_page_locator is None) == (url_template is None):
+            raise ValueError("Either next_page_locator or url_template has to be set")
+        if url_template is not None and pages is None:
+            raise ValueError("Pages have to be set for url_template")
+        max_pending = max_pending or max_workers * 2
+        pool = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        pending = deque()
+        with pool(max_workers=max_workers) as executor:
+            for page_source in self._iter_page_sources(table_locator_css, next_page_locator,
+                                                       url_template, pages, max_pages, timeout):
+                pending.append(executor.submit(parse_page_tables, page_source, table_locator_css.value, all_tables))
+                while len(pending) >= max_pending:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    @lazy_step("Get paginated table data")
+    def get_paginated_table_data(self,
+                                 table_locator_css: Locators.Locator,
+                                 next_page_locator: Locators.Locator = None,
+                                 url_template: str = None,
+                                 pages: Iterable = None,
+                                 concat: bool = True,
+                                 **kwargs) -> Union[pd.DataFrame, List[pd.DataFrame]]:
+
+        """
+        Read all pages of paginated report, see iter_paginated_table_data for the arguments
+
+        :param concat: Whether pages Dataframes are concatenated into one Dataframe
+        :return: Dataframe with table cells values of all pages, or list of Dataframes per page
+        """
 
-    @allure.step("Get Table Elements")
+        frames = self.iter_paginated_table_data(table_locator_css,
+                                                next_page_locator=next_page_locator,
+                                                url_template=url_template,
+                                                pages=pages,
+                                                **kwargs)
+        frames = list(frames)
+        if not concat:
+            return frames
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def _iter_page_sources(self,
+                           table_locator_css: Locators.Locator,
+                           next_page_locator: Locators.Locator,
+                           url_template: str,
+                           pages: Iterable,
+                           max_pages: int,
+                           timeout) -> Iterator[str]:
+        """
+        Open pages one by one and return their sources once the table is rendered
+        """
+        from selenium.common.exceptions import NoSuchElementException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as ec
+        driver = self.base.driver
+        if url_template is not None:
+            for number, page in enumerate(pages):
+                if max_pages is not None and number >= max_pages:
+                    return
+                self.base.navigate(url_template.format(page=page))
+                self.base.find_present_element(table_locator_css, timeout=timeout)
+                yield driver.page_source
+            return
+        number = 0
+        while max_pages is None or number < max_pages:
+            table = self.base.find_present_element(table_locator_css, timeout=timeout)
+            yield driver.page_source
+            number += 1
+            next_buttons = driver.find_elements(next_page_locator.by, next_page_locator.value)
+            if not next_buttons or not _is_clickable(next_buttons[0]):
+                return
+            # the first cell is replaced both when the whole table and when only its rows are re-rendered
+            try:
+                watched = table.find_element(By.TAG_NAME, "td")
+            except NoSuchElementException:
+                watched = table
+            self.base.click_element(element=next_buttons[0])
+            self.base.wait_engine.until(driver, ec.staleness_of(watched), timeout=timeout,
+                                        message="Table was not updated after switching to the next page")
+
+    @lazy_step("Get Table Elements")
     def get_table_elements(self,
                            table_values_locator: Locators.Locator = None,
                            table_values_elements: List[WebElement] = None,
@@ -127,16 +337,14 @@ class TableHelper:
         else:
             table_total_elements = None
 
-        columns_per_values_els = self.transform_values_to_column_rows(
-            # transform values and columns to rows [{C1: V1, C2: V2}, {C1: V3, C2: V4}, ... {C1: Vn, C2: Vn}]
+        return self.transform_values_to_frame(
+            # reshape values to rows [[V1, V2], [V3, V4], ... [Vn-1, Vn]] under columns [C1, C2]
             columns=columns_txt,
             values=values,
             totals=table_total_elements,
             columns_strings=columns_strings
         )
 
-        return pd.DataFrame(columns_per_values_els)
-
     @staticmethod
     def transform_values_to_column_rows(columns: List[str],
                                         values: List[Union[WebElement, str]],
@@ -156,8 +364,8 @@ class TableHelper:
         if columns_strings:
             columns = columns_strings
         if totals:
-            values.extend(totals)
-            # add totals to values list
+            values = values + totals
+            # add totals to values list (without changing the caller's list)
         if len(values) % len(columns) != 0:
             # the error appears if the number of columns does not match the number of rows
             raise ValueError("The number of values does not match the number of columns"
@@ -179,6 +387,72 @@ class TableHelper:
             res.append(di)
         return res
 
+    @staticmethod
+    def transform_values_to_frame(columns: List[str],
+                                  values: List[Union[WebElement, str]],
+                                  totals: List[Union[WebElement, str]] = None,
+                                  columns_strings=None) -> pd.DataFrame:
+        """
+        Columnar version of transform_values_to_column_rows, returns Dataframe directly. \n
+        Values and totals are placed into (rows, columns) array of objects and the Dataframe
+        is built from it, without dict per row. Input lists are neither changed nor copied.
+
+        :param columns: List of columns names
+        :param values: List of values (either elements or text values)
+        :param totals: List of total cells (either elements or text values)
+        :param columns_strings: Names of the columns in case it has to be customized
+                                or cannot be received from the table header elements
+        the number of columns should match to the number of values
+        """
+        if columns_strings:
+            columns = columns_strings
+        totals = totals or []
+        size = len(values) + len(totals)
+        if size % len(columns) != 0:
+            # the error appears if the number of columns does not match the number of rows
+            raise ValueError("The number of values does not match the number of columns"
+                             f"Values: {values + totals}"
+                             f"Colummns: {columns}")
+        if len(set(columns)) != len(columns):
+            # the names of columns will be renamed if all names are not unique
+            columns = [f"column_{x}" for x in range(len(columns))]
+        if not size:
+            return pd.DataFrame()
+        cells = np.empty(size, dtype=object)
+        cells[:len(values)] = values
+        cells[len(values):] = totals
+        return pd.DataFrame(cells.reshape(-1, len(columns)), columns=columns)
+
+    @lazy_step("Coerce table columns types")
+    def coerce_columns(self,
+                       frame: pd.DataFrame,
+                       types: Union[str, Dict[str, Kind]] = "infer",
+                       threshold: float = 0.9,
+                       attach_rows: int = 100) -> CoercionResult:
+
+        """
+        Convert string cells of the table into compact numeric, categorical and datetime columns
+        with vectorized string operations, e.g. "1,234.50" into float, "12.3%" into 0.123. \n
+        Cells that could not be parsed become missing values and are reported in the result
+        (and attached to allure), the result is also kept in last_coercion.
+
+        :param frame: Dataframe with table cells values
+        :param types: "infer" to infer kinds of all columns, or kinds of columns: text, category, number, integer,
+                      percent, datetime, "datetime:<format>", "infer" or function Series -> Series.
+                      Columns not listed are left as is
+        :param threshold: Share of not empty cells that have to be parsed to infer the kind
+        :param attach_rows: Maximum number of unparsed cells attached to allure
+        :return: Coerced Dataframe, kinds of the columns and unparsed cells (row, column, value)
+        """
+
+        result = coerce_frame(frame, types, threshold=threshold)
+        self.last_coercion = result
+        if len(result.unparsed):
+            allure.attach(body=result.unparsed.head(attach_rows).to_csv(index=False),
+                          name=f"Unparsed cells: {len(result.unparsed)}",
+                          attachment_type=allure.attachment_type.CSV)
+        return result
+
     def get_table_txt(self, locator: Locators.Locator) -> List[str]:
         """
         Generic function to return list of values elements texts found per locator
@@ -188,3 +462,24 @@ class TableHelper:
         """
         els = self.base.find_elements(locator=locator)
         return list(map(lambda x: x.text, els))
+
+
+def parse_page_tables(page_source: str, selector: str, all_tables: bool = False) -> pd.DataFrame:
+    """
+    Dataframe of the first (or all concatenated) tables found in page source by css selector,
+    can be run in worker processes
+    """
+    try:
+        frames = read_html_tables(page_source, selector)
+    except UnsupportedSelectorError:
+        soup = bs4.BeautifulSoup(page_source, "html.parser")
+        frames = pd.read_html(StringIO(str(soup.select(selector=selector))))
+    if not all_tables:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
+
+
+def _is_clickable(element: WebElement) -> bool:
+    return element.is_displayed() and element.is_enabled() \
+        and element.get_attribute("aria-disabled") != "true" \
+        and "disabled" not in (element.get_attribute("class") or "").split()
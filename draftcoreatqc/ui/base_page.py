@@ -1,26 +1,48 @@
 """
 Base Page Object module
 """
-from typing import List, Any
+from collections import namedtuple
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Tuple, Union
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
 from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as ec
 from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.common.keys import Keys
 from draftcoreatqc.ui.locator import Locators
+from draftcoreatqc.ui import scripts
+from draftcoreatqc.ui.waits import WaitEngine, default_wait_engine
+from draftcoreatqc.ui.capture import CapturePipeline, capture_pipeline
 import allure
 
+FieldResult = namedtuple('FieldResult', ['locator', 'status', 'value'])
+ElementCacheStats = namedtuple('ElementCacheStats', ['hits', 'misses', 'stale', 'size'])
+ElementState = namedtuple('ElementState', ['locator', 'present', 'displayed', 'text', 'value', 'selected', 'count'])
+PageSnapshot = namedtuple('PageSnapshot', ['title', 'url', 'elements'])
+
 
 class BasePageActions:
     """
     Class for working with pages
     """
 
-    def __init__(self, driver):
+    def __init__(self, driver, wait_engine: WaitEngine = None, cache_elements: bool = False):
+        """
+        :param driver: Browser driver instance
+        :param wait_engine: Wait engine (default_wait_engine by default)
+        :param cache_elements: Whether elements found by locators are cached until navigation, refresh
+                               or frame switch, so the same locator is waited for and found only once
+        """
         self.driver = driver
+        self.wait_engine = wait_engine or default_wait_engine
         self.locator_css = Locators.css
         self.locator_xpath = Locators.xpath
         self.keys = Keys
+        self.cache_elements = cache_elements
+        self._element_cache: Dict[Locators.Locator, WebElement] = {}
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._cache_stale = 0
 
     def element(self,
                 locator: Locators.Locator,
@@ -32,10 +54,48 @@ class BasePageActions:
         if element:
             return element
         elif locator:
-            return self.find_visible_element(locator, timeout=timeout)
+            if not self.cache_elements:
+                return self.find_visible_element(locator, timeout=timeout)
+            cached = self._element_cache.get(locator)
+            if cached is not None:
+                self._cache_hits += 1
+                return cached
+            self._cache_misses += 1
+            element = self.find_visible_element(locator, timeout=timeout)
+            self._element_cache[locator] = element
+            return element
         else:
             raise Exception("Unknown way to define an element")
 
+    def element_cache_stats(self) -> ElementCacheStats:
+        """
+        Number of lookups served from the elements cache (saved round trips), lookups sent to the browser,
+        cached elements found stale and size of the cache
+        """
+        return ElementCacheStats(self._cache_hits, self._cache_misses, self._cache_stale, len(self._element_cache))
+
+    def invalidate_element_cache(self):
+        """
+        Forget cached elements, e.g. after the page is re-rendered by an action
+        """
+        self._element_cache.clear()
+
+    def _retry_stale(self, action: Callable[[], Any], *locators: Locators.Locator) -> Any:
+        """
+        Run action, which resolves elements by locators, once again with fresh elements
+        if a cached element turned out to be stale
+        """
+        try:
+            return action()
+        except StaleElementReferenceException:
+            cached = [locator for locator in locators if locator in self._element_cache]
+            if not cached:
+                raise
+            self._cache_stale += 1
+            for locator in cached:
+                del self._element_cache[locator]
+            return action()
+
     @allure.step("Browser: Finding element (visible)")
     def find_visible_element(self,
                              locator: Locators.Locator,
@@ -43,8 +103,7 @@ class BasePageActions:
         """
         Find an element
         """
-        element = WebDriverWait(self.driver, timeout=timeout) \
-            .until(ec.visibility_of_element_located(locator=locator))
+        element = self.wait_engine.element(self.driver, locator, timeout=timeout, visible=True)
         return element
 
     @allure.step("Browser: Finding element (visible)")
@@ -54,8 +113,7 @@ class BasePageActions:
         """
         Find an element
         """
-        element = WebDriverWait(self.driver, timeout=timeout) \
-            .until(ec.presence_of_element_located(locator=locator))
+        element = self.wait_engine.element(self.driver, locator, timeout=timeout)
         return element
 
     @allure.step("Browser: Finding multiple elements (visible)")
@@ -65,8 +123,9 @@ class BasePageActions:
         """
         Find list of elements
         """
-        element = WebDriverWait(self.driver, timeout=timeout) \
-            .until(ec.visibility_of_all_elements_located(locator=locator))
+        element = self.wait_engine.until(self.driver,
+                                         ec.visibility_of_all_elements_located(locator=locator),
+                                         timeout=timeout)
         return element
 
     @allure.step("Browser: Finding multiple elements (present)")
@@ -76,15 +135,25 @@ class BasePageActions:
         """
         Find list of elements
         """
-        element = WebDriverWait(self.driver, timeout=timeout) \
-            .until(ec.presence_of_all_elements_located(locator=locator))
+        element = self.wait_engine.until(self.driver,
+                                         ec.presence_of_all_elements_located(locator=locator),
+                                         timeout=timeout)
         return element
 
+    def find_elements(self,
+                      locator,
+                      timeout=10) -> List[WebElement]:
+        """
+        Find list of elements (present), used by table helpers
+        """
+        return self.find_present_elements(locator, timeout=timeout)
+
     def navigate(self, url: str):
         """
         Navigate to url
         """
         with allure.step(f"Browser: Opening URL {url}"):
+            self.invalidate_element_cache()
             self.driver.get(url)
 
     @property
@@ -99,6 +168,7 @@ class BasePageActions:
         """
         Refresh current browser screen
         """
+        self.invalidate_element_cache()
         self.driver.refresh()
 
     @allure.step("Browser: Switching to iframe")
@@ -109,13 +179,16 @@ class BasePageActions:
         Switch to iframe
         Accepts either element's locator or element itself
         """
-        self.driver.switch_to.frame(self.element(locator, element))
+        frame = self._retry_stale(lambda: self.element(locator, element), locator)
+        self.invalidate_element_cache()
+        self.driver.switch_to.frame(frame)
 
     @allure.step("Browser: Switching to default content")
     def switch_to_default_content(self):
         """
         Switch to default content
         """
+        self.invalidate_element_cache()
         self.driver.switch_to.default_content()
 
     @allure.step("Browser: Executing script: {script}")
@@ -132,12 +205,173 @@ class BasePageActions:
         Find list of elements
         """
         with allure.step("Browser: invisibility multiple elements"):
-            WebDriverWait(self.driver, timeout=timeout) \
-                .until(ec.invisibility_of_element_located(locator=locator))
+            self.wait_engine.until(self.driver,
+                                   ec.invisibility_of_element_located(locator=locator),
+                                   timeout=timeout)
 
     def get_elements_list(self, locator):
         return self.driver.find_elements(locator.by, locator.value)
 
+    @allure.step("Browser: Getting texts of all elements per locators")
+    def get_all_elements_texts(self,
+                               locators: List[Locators.Locator]) -> List[List[str]]:
+        """
+        Get texts of all elements found per each locator with a single script call
+        Returns one list of texts per locator, in the same order as locators
+        """
+        return self.driver.execute_script(scripts.ALL_ELEMENTS_TEXTS,
+                                          [[locator.by, locator.value] for locator in locators])
+
+    @allure.step("Browser: Making input to multiple elements")
+    def input_to_elements(self,
+                          fields: Union[Dict[Locators.Locator, str], Iterable[Tuple[Locators.Locator, str]]],
+                          clear: bool = False,
+                          native: Iterable[Locators.Locator] = (),
+                          timeout=10) -> List[FieldResult]:
+        """
+        Input texts to elements with a single script call: value is set with the native setter
+        and input/change events are dispatched, so one round trip fills the whole form.
+        Fields which need real key events (file, checkbox and other special inputs, contenteditable elements,
+        texts with special keys, locators listed in native) and elements not found yet
+        are filled afterwards one by one with send_keys
+        :param fields: Dict or pairs of element locator and text to input
+        :param clear: Whether current value is replaced, otherwise text is appended like send_keys does
+        :param native: Locators of fields which are always filled with send_keys
+        :param timeout: Timeout of waiting for each field filled with send_keys
+        :return: Result per field: locator, status ("ok", "native" or "missing") and resulting value
+        """
+        fields = list(fields.items() if isinstance(fields, dict) else fields)
+        native = set(native)
+        # results are kept by position of the field, the same locator may be filled more than once
+        batch = [(position, locator, str(text)) for position, (locator, text) in enumerate(fields)
+                 if locator not in native and not _has_special_keys(str(text))]
+        results = dict(zip((position for position, _, _ in batch),
+                           self._run_batch(scripts.SET_ELEMENTS_VALUES,
+                                           [[locator.by, locator.value, text, clear] for _, locator, text in batch],
+                                           [locator for _, locator, _ in batch])))
+
+        def input_natively(locator, text):
+            el = self.find_visible_element(locator, timeout=timeout)
+            if clear:
+                el.clear()
+            el.send_keys(text)
+            return el.get_attribute("value")
+
+        return [self._native_fallback(results.get(position), locator, lambda: input_natively(locator, text))
+                for position, (locator, text) in enumerate(fields)]
+
+    @allure.step("Browser: Clearing multiple elements\' input values")
+    def clear_elements(self,
+                       locators: Iterable[Locators.Locator],
+                       timeout=10) -> List[FieldResult]:
+        """
+        Clear input values of elements with a single script call (see input_to_elements)
+        :return: Result per element: locator, status ("ok", "native" or "missing") and resulting value
+        """
+        return self.input_to_elements([(locator, "") for locator in locators], clear=True, timeout=timeout)
+
+    @allure.step("Browser: Clicking multiple elements")
+    def click_elements(self,
+                       locators: Iterable[Locators.Locator],
+                       timeout=10) -> List[FieldResult]:
+        """
+        Click elements in order with script calls.
+        Script stops at the first element not displayed, disabled, covered or not found yet,
+        which is awaited and clicked natively before the script resumes with the next elements
+        :return: Result per element: locator, status ("ok", "native" or "missing") and None value
+        """
+        locators = list(locators)
+        results = []
+        while len(results) < len(locators):
+            pending = locators[len(results):]
+            batch = self._run_batch(scripts.CLICK_ELEMENTS,
+                                    [[locator.by, locator.value] for locator in pending],
+                                    pending)
+            results.extend(result for result in batch if result.status == "ok")
+            if len(results) < len(locators):
+                locator = locators[len(results)]
+                results.append(self._native_fallback(
+                    None, locator, lambda: self.find_visible_element(locator, timeout=timeout).click()))
+        return results
+
+    @allure.step("Browser: Getting multiple elements texts")
+    def get_elements_text(self,
+                          locators: Iterable[Locators.Locator],
+                          timeout=10) -> List[FieldResult]:
+        """
+        Get texts of the first element per each locator with a single script call.
+        Elements not found or not displayed yet are awaited afterwards one by one, like get_element_text does
+        :return: Result per element: locator, status ("ok", "native" or "missing") and text
+        """
+        locators = list(locators)
+        results = self._run_batch(scripts.ELEMENTS_TEXT,
+                                  [[locator.by, locator.value] for locator in locators],
+                                  locators)
+        return [self._native_fallback(result, result.locator,
+                                      lambda: self.find_visible_element(result.locator, timeout=timeout).text)
+                for result in results]
+
+    @allure.step("Browser: Getting multiple elements\' input values")
+    def get_inputs_value(self,
+                         locators: Iterable[Locators.Locator],
+                         timeout=10) -> List[FieldResult]:
+        """
+        Get input values of the first element per each locator with a single script call.
+        Elements not found or not displayed yet are awaited afterwards one by one, like get_input_value does
+        :return: Result per element: locator, status ("ok", "native" or "missing") and value
+        """
+        locators = list(locators)
+        results = self._run_batch(scripts.ELEMENTS_VALUES,
+                                  [[locator.by, locator.value] for locator in locators],
+                                  locators)
+        return [self._native_fallback(result, result.locator,
+                                      lambda: self.find_visible_element(result.locator,
+                                                                        timeout=timeout).get_attribute("value"))
+                for result in results]
+
+    @allure.step("Browser: Taking page snapshot")
+    def snapshot(self,
+                 locators: Mapping[str, Locators.Locator],
+                 wait_for: Iterable[str] = (),
+                 timeout=10) -> PageSnapshot:
+        """
+        Take state of the page and of the first element per each named locator with a single script call,
+        so multiple assertions are checked locally instead of waiting and querying the browser one by one
+        :param locators: Locators by names
+        :param wait_for: Names of elements awaited to be present before the snapshot is taken
+        :param timeout: Timeout of waiting for wait_for elements
+        :return: Page title, URL and read-only mapping of names to ElementState
+                 (present, displayed, text, value, selected, number of matched elements)
+        """
+        for name in wait_for:
+            self.wait_engine.element(self.driver, locators[name], timeout=timeout)
+        names = list(locators)
+        page = self.driver.execute_script(scripts.PAGE_SNAPSHOT,
+                                          [[locators[name].by, locators[name].value] for name in names])
+        elements = {name: ElementState(locators[name], count > 0, displayed, text, value, selected, count)
+                    for name, (count, displayed, text, value, selected) in zip(names, page["elements"])}
+        return PageSnapshot(page["title"], page["url"], MappingProxyType(elements))
+
+    def _run_batch(self,
+                   script: str,
+                   arguments: list,
+                   locators: List[Locators.Locator]) -> List[FieldResult]:
+        if not arguments:
+            return []
+        return [FieldResult(locator, status, value)
+                for locator, (status, value) in zip(locators, self.driver.execute_script(script, arguments))]
+
+    @staticmethod
+    def _native_fallback(result: FieldResult,
+                         locator: Locators.Locator,
+                         action: Callable[[], Any]) -> FieldResult:
+        if result is not None and result.status == "ok":
+            return result
+        try:
+            return FieldResult(locator, "native", action())
+        except TimeoutException:
+            return FieldResult(locator, "missing", None)
+
     @allure.step("Browser: making input to element")
     def input_to_element(self,
                          locator: Locators.Locator = None,
@@ -147,8 +381,7 @@ class BasePageActions:
         Input some text to element
         Accepts either element's locator or element itself
         """
-        el = self.element(locator, element)
-        el.send_keys(input_text)
+        self._retry_stale(lambda: self.element(locator, element).send_keys(input_text), locator)
 
     @allure.step("Browser: Clicking element")
     def click_element(self,
@@ -158,8 +391,7 @@ class BasePageActions:
         Click an element
         Accepts either element's locator or element itself
         """
-        el = self.element(locator, element)
-        el.click()
+        self._retry_stale(lambda: self.element(locator, element).click(), locator)
 
     @allure.step("Click outside")
     def click_outside(self):
@@ -178,12 +410,12 @@ class BasePageActions:
         Click an element
         Accepts either element's locator or element itself
         """
-        element_to_move = self.element(locator=locator_to_move,
-                                       element=element_to_move)
-        element_to_click = self.element(locator=locator_to_click,
-                                        element=element_to_click)
-        builder = ActionChains(self.driver)
-        builder.move_to_element(element_to_move).click(element_to_click).perform()
+        def move_and_click():
+            builder = ActionChains(self.driver)
+            builder.move_to_element(self.element(locator=locator_to_move, element=element_to_move)) \
+                .click(self.element(locator=locator_to_click, element=element_to_click)).perform()
+
+        self._retry_stale(move_and_click, locator_to_move, locator_to_click)
 
     @allure.step("Browser: Move and Clicking element")
     def moveto_element(self,
@@ -193,10 +425,11 @@ class BasePageActions:
         Click an element
         Accepts either element's locator or element itself
         """
-        element_to_move = self.element(locator=locator_to_move,
-                                       element=element_to_move)
-        builder = ActionChains(self.driver)
-        builder.move_to_element(element_to_move).perform()
+        def move():
+            builder = ActionChains(self.driver)
+            builder.move_to_element(self.element(locator=locator_to_move, element=element_to_move)).perform()
+
+        self._retry_stale(move, locator_to_move)
 
     @allure.step("Browser: Checking that element is displayed")
     def element_is_displayed(self,
@@ -206,7 +439,7 @@ class BasePageActions:
         Check that element is displayed
         Accepts either element's locator or element itself2
         """
-        return bool(self.element(locator, element).is_displayed())
+        return bool(self._retry_stale(lambda: self.element(locator, element).is_displayed(), locator))
 
     @allure.step("Browser: Checking that element is present in DOM")
     def element_is_present(self,
@@ -225,8 +458,7 @@ class BasePageActions:
         Get element's text
         Accepts either element's locator or element itself
         """
-        el = self.element(locator, element, timeout=timeout)
-        return el.text
+        return self._retry_stale(lambda: self.element(locator, element, timeout=timeout).text, locator)
 
     @allure.step("Browser: Clearing element\'s input value")
     def clear_element(self,
@@ -236,8 +468,7 @@ class BasePageActions:
         Clear element's input value
         Accepts either element's locator or element itself
         """
-        el = self.element(locator, element)
-        el.clear()
+        self._retry_stale(lambda: self.element(locator, element).clear(), locator)
 
     @allure.step("Browser: Getting element\'s input value")
     def get_input_value(self,
@@ -247,8 +478,7 @@ class BasePageActions:
         Get element's input value
         Accepts either element's locator or element itself
         """
-        el = self.element(locator, element)
-        return el.get_attribute('value')
+        return self._retry_stale(lambda: self.element(locator, element).get_attribute('value'), locator)
 
     @allure.step("Browser: Opening URL in new tab: {url}")
     def navigate_in_new_tab(self, url: str):
@@ -267,6 +497,25 @@ class BasePageActions:
     def get_page_source(self):
         return self.driver.page_source
 
+    def capture_page(self,
+                     name: str = "Failure",
+                     screenshot: bool = True,
+                     page_source: bool = True,
+                     pipeline: CapturePipeline = None) -> List[str]:
+        """
+        Attach screenshot and page source to the current allure test, e.g. on failure.
+        Only raw bytes are taken here: compression and writing to the results directory
+        run in the background (see CapturePipeline)
+        :return: Attachments file names
+        """
+        pipeline = pipeline or capture_pipeline
+        file_names = []
+        if screenshot:
+            file_names.append(pipeline.capture_screenshot(self.driver, name=f"{name} screenshot"))
+        if page_source:
+            file_names.append(pipeline.capture_page_source(self.driver, name=f"{name} page source"))
+        return [file_name for file_name in file_names if file_name]
+
     @allure.step("Browser: Accepting alert")
     def accept_alert(self):
         """
@@ -286,6 +535,11 @@ class BasePageActions:
     def scroll_into_element_center(self,
                                    locator: Locators.Locator = None,
                                    element: WebElement = None):
-        element = self.element(locator=locator, element=element)
         script = "arguments[0].scrollIntoView({block: 'center'});"
-        self.execute_script(script, element)
+        self._retry_stale(lambda: self.execute_script(script, self.element(locator=locator, element=element)),
+                          locator)
+
+
+def _has_special_keys(text: str) -> bool:
+    # Selenium special keys (Keys.ENTER etc) are characters of Unicode private use area
+    return any("\ue000" <= char <= "\uf8ff" for char in text)
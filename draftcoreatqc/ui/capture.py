@@ -0,0 +1,245 @@
+"""
+Screenshots and page sources capture module
+"""
+import atexit
+import gzip
+import os
+import queue
+import struct
+import threading
+import zlib
+from collections import namedtuple
+from hashlib import blake2b
+from typing import List, Optional
+
+CaptureStats = namedtuple('CaptureStats', ['captured', 'deduplicated', 'written', 'raw_size', 'written_size',
+                                           'errors'])
+Capture = namedtuple('Capture', ['digest', 'kind', 'data', 'file_name'])
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_CHUNK = struct.Struct(">I4s")
+
+
+def optimize_png(data: bytes, level: int = 9) -> bytes:
+    """
+    Recompress image data of PNG with the given zlib level, keeping the image and the other chunks as is.
+    Returns original data if it is not PNG or if recompression does not make it smaller
+    """
+    if not data.startswith(PNG_SIGNATURE):
+        return data
+    chunks, idat, position = [], [], len(PNG_SIGNATURE)
+    while position + PNG_CHUNK.size <= len(data):
+        length, chunk_type = PNG_CHUNK.unpack_from(data, position)
+        body = data[position + PNG_CHUNK.size:position + PNG_CHUNK.size + length]
+        position += PNG_CHUNK.size + length + 4
+        if chunk_type == b"IDAT":
+            if not idat:
+                chunks.append(None)  # place of the single recompressed IDAT chunk
+            idat.append(body)
+        else:
+            chunks.append((chunk_type, body))
+    if not idat:
+        return data
+    compressed = zlib.compress(zlib.decompress(b"".join(idat)), level)
+    result = [PNG_SIGNATURE]
+    for chunk in chunks:
+        chunk_type, body = chunk if chunk is not None else (b"IDAT", compressed)
+        result.append(PNG_CHUNK.pack(len(body), chunk_type) + body +
+                      struct.pack(">I", zlib.crc32(chunk_type + body) & 0xffffffff))
+    optimized = b"".join(result)
+    return optimized if len(optimized) < len(data) else data
+
+
+class CapturePipeline:
+    """
+    Class of asynchronous capture pipeline \n
+    Test thread only takes raw bytes of the screenshot or page source, hashes them and links
+    the attachment to the current allure test or step. Compression (PNG optimization, gzip of HTML)
+    and writing to the allure results directory run on background workers. Identical captures
+    are written once and linked to every test. The queue is bounded, so when workers lag behind,
+    the test thread waits instead of holding unlimited captures in memory. \n
+    Pending captures are written by flush(), e.g. at the session end. A capture which failed to be written
+    is written again when it is captured next time.
+    """
+
+    def __init__(self,
+                 results_dir: str = None,
+                 workers: int = 2,
+                 queue_size: int = 32,
+                 png_level: int = 9,
+                 gzip_html: bool = False):
+        """
+        :param results_dir: Allure results directory
+                            (--alluredir of the pytest run, set by draftcoreatqc.fixtures.plugin, by default)
+        :param workers: Number of background workers
+        :param queue_size: Maximum number of captures waiting for workers
+        :param png_level: Zlib level of PNG recompression, None to keep screenshots as is
+        :param gzip_html: Whether page sources are written gzipped, allure does not show them inline then,
+                          they have to be downloaded from the report
+        """
+        self.results_dir = results_dir
+        self.workers = workers
+        self.png_level = png_level
+        self.gzip_html = gzip_html
+        self.captured = 0
+        self.deduplicated = 0
+        self.written = 0
+        self.raw_size = 0
+        self.written_size = 0
+        self.errors: List[str] = []
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._digests = set()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def capture_screenshot(self, driver, name: str = "Screenshot") -> Optional[str]:
+        """
+        Take screenshot of the browser and attach it to the current test
+        :return: Attachment file name, None if allure is not running
+        """
+        return self.attach(driver.get_screenshot_as_png(), name=name, kind="png")
+
+    def capture_page_source(self, driver, name: str = "Page source") -> Optional[str]:
+        """
+        Take page source of the browser and attach it to the current test
+        :return: Attachment file name, None if allure is not running
+        """
+        return self.attach(driver.page_source.encode("utf-8"), name=name, kind="html")
+
+    def attach(self, data: bytes, name: str, kind: str) -> Optional[str]:
+        """
+        Link attachment to the current allure test or step and queue it for writing
+        :param data: Raw content
+        :param name: Attachment name
+        :param kind: "png" or "html"
+        :return: Attachment file name, None if allure is not running
+        """
+        reporter, results_dir = _allure_reporter(), self.results_dir
+        if reporter is None or results_dir is None:
+            return None
+        digest = blake2b(data, digest_size=16).hexdigest()
+        if kind == "png":
+            file_name, mime_type = f"{digest}-attachment.png", "image/png"
+        elif self.gzip_html:
+            file_name, mime_type = f"{digest}-attachment.html.gz", "application/gzip"
+        else:
+            file_name, mime_type = f"{digest}-attachment.html", "text/html"
+        _link_attachment(reporter, name, file_name, mime_type)
+        with self._lock:
+            self.captured += 1
+            self.raw_size += len(data)
+            if digest in self._digests:
+                self.deduplicated += 1
+                return file_name
+            self._digests.add(digest)
+        self._start_workers()
+        self._queue.put(Capture(digest, kind, data, os.path.join(results_dir, file_name)))
+        return file_name
+
+    def flush(self):
+        """
+        Wait until all queued captures are written
+        """
+        if self._threads:
+            self._queue.join()
+
+    def close(self):
+        """
+        Write queued captures and stop workers
+        """
+        if not self._threads:
+            return
+        self.flush()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def stats(self) -> CaptureStats:
+        """
+        Numbers of captures, deduplicated captures and written files, raw and written sizes, write errors
+        """
+        return CaptureStats(self.captured, self.deduplicated, self.written, self.raw_size, self.written_size,
+                            len(self.errors))
+
+    def _start_workers(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            self._threads = [threading.Thread(target=self._work, name=f"capture-{i}", daemon=True)
+                             for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def _work(self):
+        while True:
+            capture = self._queue.get()
+            try:
+                if capture is None:
+                    return
+                self._write(capture)
+            except Exception as error:
+                with self._lock:
+                    self.errors.append(f"{capture.file_name}: {error}")
+                    # the next identical capture writes the file again instead of linking the missing one
+                    self._digests.discard(capture.digest)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, capture: Capture):
+        if capture.kind == "png":
+            data = optimize_png(capture.data, self.png_level) if self.png_level is not None else capture.data
+        elif self.gzip_html:
+            data = gzip.compress(capture.data, compresslevel=6, mtime=0)
+        else:
+            data = capture.data
+        temp_name = f"{capture.file_name}.{threading.get_ident()}.tmp"
+        with open(temp_name, "wb") as capture_file:
+            capture_file.write(data)
+        os.replace(temp_name, capture.file_name)
+        with self._lock:
+            self.written += 1
+            self.written_size += len(data)
+
+
+def _allure_plugins():
+    try:
+        from allure_commons import plugin_manager
+    except ImportError:  # allure is not installed
+        return []
+    return plugin_manager.get_plugins()
+
+
+def _allure_reporter():
+    """
+    Reporter of the running allure pytest plugin
+    """
+    for plugin in _allure_plugins():
+        reporter = getattr(plugin, "allure_logger", None)
+        if reporter is not None:
+            return reporter
+    return None
+
+
+def _link_attachment(reporter, name: str, file_name: str, mime_type: str):
+    """
+    Add attachment to the current test or step, the file itself is written later
+    """
+    from allure_commons.model2 import Attachment, ExecutableItem
+    item = reporter.get_last_item(ExecutableItem)
+    if item is not None:
+        item.attachments.append(Attachment(name=name, source=file_name, type=mime_type))
+
+
+capture_pipeline = CapturePipeline()
+
+
+@atexit.register
+def close_capture_pipeline():
+    """
+    Write pending captures on interpreter exit
+    """
+    capture_pipeline.close()
@@ -0,0 +1,194 @@
+"""
+JavaScript snippets executed in browser
+"""
+
+# Resolves all elements for Selenium's (by, value) locator pair, the same way driver.find_elements does
+RESOLVE_LOCATOR = """
+var resolveLocator = function (by, value) {
+    var root = document;
+    if (by === 'xpath') {
+        var snapshot = document.evaluate(value, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        var nodes = [];
+        for (var i = 0; i < snapshot.snapshotLength; i++) {
+            nodes.push(snapshot.snapshotItem(i));
+        }
+        return nodes;
+    }
+    if (by === 'css selector') {
+        return Array.prototype.slice.call(root.querySelectorAll(value));
+    }
+    if (by === 'id') {
+        return Array.prototype.slice.call(root.querySelectorAll('[id="' + value + '"]'));
+    }
+    if (by === 'name') {
+        return Array.prototype.slice.call(root.querySelectorAll('[name="' + value + '"]'));
+    }
+    if (by === 'class name') {
+        return Array.prototype.slice.call(root.getElementsByClassName(value));
+    }
+    if (by === 'tag name') {
+        return Array.prototype.slice.call(root.getElementsByTagName(value));
+    }
+    throw new Error('Unsupported locator strategy: ' + by);
+};
+"""
+
+# Visible text of an element, close to what WebElement.text returns
+ELEMENT_TEXT = """
+var elementText = function (el) {
+    if (!el.getClientRects().length) {
+        return '';
+    }
+    return (el.innerText || el.textContent || '').replace(/\\u00a0/g, ' ').trim();
+};
+"""
+
+# Whether an element is displayed: rendered and not hidden with visibility or opacity
+ELEMENT_DISPLAYED = """
+var isDisplayed = function (el) {
+    if (!el.getClientRects().length) {
+        return false;
+    }
+    var style = window.getComputedStyle(el);
+    return style.visibility !== 'hidden' && style.visibility !== 'collapse' && style.opacity !== '0';
+};
+"""
+
+# Texts of all elements per each locator passed as arguments[0]: [[by, value], ...]
+ALL_ELEMENTS_TEXTS = RESOLVE_LOCATOR + ELEMENT_TEXT + """
+return arguments[0].map(function (locator) {
+    return resolveLocator(locator[0], locator[1]).map(elementText);
+});
+"""
+
+# Async script: resolves with the first element per locator [by, value] as soon as it appears in DOM
+# (checked immediately and then on every DOM mutation), or with null after timeout in milliseconds
+WAIT_FOR_ELEMENT = RESOLVE_LOCATOR + """
+var by = arguments[0], value = arguments[1], timeout = arguments[2];
+var done = arguments[arguments.length - 1];
+var find = function () {
+    var found = resolveLocator(by, value);
+    return found.length ? found[0] : null;
+};
+var element = find();
+if (element) {
+    done(element);
+    return;
+}
+var timer = null;
+var observer = new MutationObserver(function () {
+    var el = find();
+    if (el) {
+        observer.disconnect();
+        clearTimeout(timer);
+        done(el);
+    }
+});
+observer.observe(document, {childList: true, subtree: true, attributes: true});
+timer = setTimeout(function () {
+    observer.disconnect();
+    done(null);
+}, timeout);
+"""
+
+# Sets value of the first element per field passed as arguments[0]: [[by, value, text, clear], ...]
+# with the native value setter (so frameworks tracking the property see it) and input/change events.
+# Returns [status, value] per field: "ok", "missing", or "native" for elements that need real key events
+SET_ELEMENTS_VALUES = RESOLVE_LOCATOR + """
+var setters = {
+    INPUT: Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set,
+    TEXTAREA: Object.getOwnPropertyDescriptor(HTMLTextAreaElement.prototype, 'value').set
+};
+var nativeTypes = ['file', 'checkbox', 'radio', 'range', 'color', 'date', 'datetime-local', 'month', 'time', 'week'];
+return arguments[0].map(function (field) {
+    var el = resolveLocator(field[0], field[1])[0];
+    if (!el) {
+        return ['missing', null];
+    }
+    var setter = setters[el.tagName];
+    if (!setter || el.disabled || el.readOnly || nativeTypes.indexOf((el.type || '').toLowerCase()) !== -1) {
+        return ['native', null];
+    }
+    el.focus();
+    setter.call(el, field[3] ? field[2] : el.value + field[2]);
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+    el.blur();
+    return ['ok', el.value];
+});
+"""
+
+# Clicks the first element per locator passed as arguments[0]: [[by, value], ...] in order.
+# Returns [status, null] per clicked locator: "ok", and stops at the first locator which has to be clicked natively:
+# "missing", or "native" for not displayed, disabled and covered elements
+CLICK_ELEMENTS = RESOLVE_LOCATOR + """
+var results = [];
+for (var i = 0; i < arguments[0].length; i++) {
+    var el = resolveLocator(arguments[0][i][0], arguments[0][i][1])[0];
+    if (!el) {
+        results.push(['missing', null]);
+        break;
+    }
+    if (!el.getClientRects().length || el.disabled) {
+        results.push(['native', null]);
+        break;
+    }
+    el.scrollIntoView({block: 'center'});
+    var rect = el.getBoundingClientRect();
+    var target = document.elementFromPoint(rect.left + rect.width / 2, rect.top + rect.height / 2);
+    if (!target || !el.contains(target)) {
+        results.push(['native', null]);
+        break;
+    }
+    el.click();
+    results.push(['ok', null]);
+}
+return results;
+"""
+
+# Text of the first element per locator passed as arguments[0]: [[by, value], ...]
+# Returns [status, text] per locator: "ok", "missing", or "native" for not displayed elements
+ELEMENTS_TEXT = RESOLVE_LOCATOR + ELEMENT_TEXT + ELEMENT_DISPLAYED + """
+return arguments[0].map(function (locator) {
+    var el = resolveLocator(locator[0], locator[1])[0];
+    if (!el) {
+        return ['missing', null];
+    }
+    return isDisplayed(el) ? ['ok', elementText(el)] : ['native', null];
+});
+"""
+
+# Value property of the first element per locator passed as arguments[0]: [[by, value], ...]
+# Returns [status, value] per locator: "ok", "missing", or "native" for not displayed elements
+ELEMENTS_VALUES = RESOLVE_LOCATOR + ELEMENT_DISPLAYED + """
+return arguments[0].map(function (locator) {
+    var el = resolveLocator(locator[0], locator[1])[0];
+    if (!el) {
+        return ['missing', null];
+    }
+    if (!isDisplayed(el)) {
+        return ['native', null];
+    }
+    var value = el.value === undefined ? el.getAttribute('value') : el.value;
+    return ['ok', value === undefined || value === null ? null : String(value)];
+});
+"""
+
+# State of the first element per locator passed as arguments[0]: [[by, value], ...], title and URL of the page.
+# Returns {title, url, elements: [[count, displayed, text, value, selected], ...]}
+PAGE_SNAPSHOT = RESOLVE_LOCATOR + ELEMENT_TEXT + ELEMENT_DISPLAYED + """
+return {
+    title: document.title,
+    url: document.location.href,
+    elements: arguments[0].map(function (locator) {
+        var found = resolveLocator(locator[0], locator[1]);
+        var el = found[0];
+        if (!el) {
+            return [0, false, null, null, false];
+        }
+        var value = el.value === undefined ? el.getAttribute('value') : el.value;
+        return [found.length, isDisplayed(el), elementText(el),
+                value === undefined || value === null ? null : String(value), !!(el.checked || el.selected)];
+    })
+};
+"""
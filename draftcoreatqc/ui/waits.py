@@ -0,0 +1,165 @@
+"""
+Wait engine module
+"""
+import time
+from collections import namedtuple
+from typing import Any, Callable
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
+from selenium.webdriver.remote.webelement import WebElement
+from selenium.webdriver.support import expected_conditions as ec
+from draftcoreatqc.ui.locator import Locators
+from draftcoreatqc.ui import scripts
+
+IGNORED_EXCEPTIONS = (NoSuchElementException, StaleElementReferenceException)
+
+WaitStats = namedtuple('WaitStats', ['waits', 'timeouts', 'waited'])
+# script timeout last set on the driver, kept on the driver itself as ids of collected drivers are reused
+SCRIPT_TIMEOUT = "_draftcoreatqc_script_timeout"
+
+
+class WaitEngine:
+    """
+    Class of polling wait engine \n
+    Condition is checked immediately, then with exponentially growing poll interval
+    up to max_interval, so present elements are returned without delay
+    and slow ones do not flood the driver with requests. \n
+    With mutation_observer enabled, elements are awaited inside the browser
+    with a single async script call, which returns as soon as the element appears in DOM.
+    """
+
+    def __init__(self,
+                 initial_interval: float = 0.05,
+                 backoff: float = 1.5,
+                 max_interval: float = 1.0,
+                 mutation_observer: bool = False,
+                 ignored_exceptions: tuple = IGNORED_EXCEPTIONS):
+        """
+        :param initial_interval: Poll interval after the first check, in seconds
+        :param backoff: Multiplier of poll interval after every check
+        :param max_interval: Poll interval ceiling, in seconds
+        :param mutation_observer: Whether elements are awaited with MutationObserver in the browser
+        :param ignored_exceptions: Exceptions raised by condition which mean "not yet"
+        """
+        self.initial_interval = initial_interval
+        self.backoff = backoff
+        self.max_interval = max_interval
+        self.mutation_observer = mutation_observer
+        self.ignored_exceptions = ignored_exceptions
+        self.waits = 0
+        self.timeouts = 0
+        self.waited = 0.0
+
+    def until(self,
+              driver,
+              condition: Callable[[Any], Any],
+              timeout: float = 10,
+              message: str = "") -> Any:
+        """
+        Wait until condition returns a truthy value
+        :param driver: Browser driver instance
+        :param condition: Callable accepting driver, e.g. expected condition
+        :param timeout: Maximum time to wait, in seconds
+        :param message: Message of TimeoutException
+        :return: The last value returned by condition
+        """
+        start = time.monotonic()
+        try:
+            return self._poll(driver, condition, timeout, message)
+        finally:
+            self._record(start)
+
+    def element(self,
+                driver,
+                locator: Locators.Locator,
+                timeout: float = 10,
+                visible: bool = False) -> WebElement:
+        """
+        Wait for element to be present (or visible) with the configured strategy
+        :param driver: Browser driver instance
+        :param locator: Locator of the element
+        :param timeout: Maximum time to wait, in seconds
+        :param visible: Whether element has to be visible
+        :return: Web element
+        """
+        if not self.mutation_observer:
+            condition = ec.visibility_of_element_located(locator) if visible \
+                else ec.presence_of_element_located(locator)
+            return self.until(driver, condition, timeout)
+        # element is awaited in DOM, then until visible, as a single wait
+        start = time.monotonic()
+        try:
+            element = self._observe(driver, locator, timeout)
+            if not visible:
+                return element
+            return self._poll(driver, ec.visibility_of(element), max(timeout - (time.monotonic() - start), 0))
+        finally:
+            self._record(start)
+
+    def wait_for_element(self,
+                         driver,
+                         locator: Locators.Locator,
+                         timeout: float = 10) -> WebElement:
+        """
+        Wait for element to appear in DOM with MutationObserver, in a single async script call
+        :param driver: Browser driver instance
+        :param locator: Locator of the element
+        :param timeout: Maximum time to wait, in seconds
+        :return: Web element
+        """
+        start = time.monotonic()
+        try:
+            return self._observe(driver, locator, timeout)
+        finally:
+            self._record(start)
+
+    def _poll(self, driver, condition: Callable[[Any], Any], timeout: float, message: str = "") -> Any:
+        deadline = time.monotonic() + timeout
+        interval = self.initial_interval
+        last_error = None
+        while True:
+            try:
+                value = condition(driver)
+                if value:
+                    return value
+            except self.ignored_exceptions as error:
+                last_error = error
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.timeouts += 1
+                raise TimeoutException(message,
+                                       getattr(last_error, "screen", None),
+                                       getattr(last_error, "stacktrace", None))
+            time.sleep(min(interval, remaining))
+            interval = min(interval * self.backoff, self.max_interval)
+
+    def _observe(self, driver, locator: Locators.Locator, timeout: float) -> WebElement:
+        if getattr(driver, SCRIPT_TIMEOUT, 0) < timeout + 1:
+            driver.set_script_timeout(timeout + 1)
+            setattr(driver, SCRIPT_TIMEOUT, timeout + 1)
+        element = driver.execute_async_script(scripts.WAIT_FOR_ELEMENT,
+                                              locator.by, locator.value, int(timeout * 1000))
+        if element is None:
+            self.timeouts += 1
+            raise TimeoutException(f"Element {locator.value} did not appear in {timeout} seconds")
+        return element
+
+    def stats(self) -> WaitStats:
+        """
+        Number of waits, number of timed out waits and total time spent waiting, in seconds
+        """
+        return WaitStats(self.waits, self.timeouts, self.waited)
+
+    def reset(self):
+        """
+        Reset waits statistics, e.g. at the start of the test
+        """
+        self.waits = 0
+        self.timeouts = 0
+        self.waited = 0.0
+
+    def _record(self, start: float):
+        self.waits += 1
+        self.waited += time.monotonic() - start
+
+
+default_wait_engine = WaitEngine()
@@ -1,2 +1,9 @@
-from .rest import Rest as RestClient
-from .browser import Browser as BrowserDriver
+from draftcoreatqc.helpers.lazy_import import lazy_exports
+
+# REST client does not import selenium and browser driver does not import requests
+__getattr__, __dir__ = lazy_exports(__name__, {
+    "RestClient": "draftcoreatqc.wrappers.rest:Rest",
+    "BrowserDriver": "draftcoreatqc.wrappers.browser:Browser",
+    "AuthManager": "draftcoreatqc.wrappers.auth:AuthManager",
+    "get_auth_manager": "draftcoreatqc.wrappers.auth:get_auth_manager",
+})
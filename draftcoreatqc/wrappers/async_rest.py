@@ -0,0 +1,35 @@
+"""
+Asynchronous REST API client wrapper module (requires aiohttp)
+"""
+import aiohttp
+
+
+class AsyncRest:
+    """
+    Class of asynchronous REST API client wrapper
+    Has to be initiated inside running event loop, and closed after use
+    """
+    def __init__(self, limit: int = 1000, limit_per_host: int = 0, keepalive_timeout: float = 15):
+        """
+        :param limit: Maximum number of simultaneous connections (0 for unlimited)
+        :param limit_per_host: Maximum number of simultaneous connections per host (0 for unlimited)
+        :param keepalive_timeout: Time to keep idle connections alive in the pool
+        """
+        connector = aiohttp.TCPConnector(limit=limit,
+                                         limit_per_host=limit_per_host,
+                                         keepalive_timeout=keepalive_timeout,
+                                         ttl_dns_cache=300)
+        self.rest = aiohttp.ClientSession(connector=connector)
+        self.clear_cookies()
+
+    def clear_cookies(self):
+        """
+        Clear cookies
+        """
+        self.rest.cookie_jar.clear()
+
+    async def close(self):
+        """
+        Close session and all pooled connections
+        """
+        await self.rest.close()
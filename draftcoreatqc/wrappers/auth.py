@@ -0,0 +1,237 @@
+"""
+Session-scoped authorization module
+"""
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+from requests import Session
+from requests.structures import CaseInsensitiveDict
+from draftcoreatqc.wrappers.rest import Rest
+from draftcoreatqc.wrappers.cassette import get_session_cassette
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+AuthToken = namedtuple('AuthToken', ['headers', 'cookies', 'expires_at', 'domain'], defaults=({}, None, None))
+
+
+@contextmanager
+def file_lock(path: str):
+    """
+    Exclusive inter-process lock on the file (created if it does not exist)
+    """
+    with open(path, "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class AuthManager:
+    """
+    Class of authorization manager \n
+    Logs in once and caches token headers and cookies until they expire. With store_path the token
+    is kept in a file-locked JSON store, so pytest-xdist workers log in once for the whole run. \n
+    Tests get the same per-process Rest session, so keep-alive connections are reused across tests,
+    while headers and cookies other than authorization ones are reset for every test
+    """
+
+    def __init__(self,
+                 login: Callable[[Session], AuthToken],
+                 name: str = "default",
+                 store_path: str = None,
+                 ttl: float = 1800,
+                 refresh_margin: float = 60,
+                 rest: Rest = None,
+                 reauthorize: bool = False,
+                 domain: str = None):
+        """
+        :param login: Function logging in with the given session and returning AuthToken
+        :param name: Name of the credentials, key of the token in the store
+        :param store_path: Path to JSON store shared by processes (token is kept in memory only if not set)
+        :param ttl: Token lifetime in seconds, if login does not return expires_at
+        :param refresh_margin: Token is refreshed this number of seconds before it expires
+        :param rest: Rest session used by tests (Rest with connections pool by default)
+        :param reauthorize: Whether request carrying the token and answered with 401 is sent once again
+                            with refreshed token (requests without the token, e.g. negative tests, are not)
+        :param domain: Domain the authorization cookies are sent to (domain of the login cookies by default)
+        """
+        self.login = login
+        self.name = name
+        self.store_path = store_path
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.reauthorize = reauthorize
+        self.domain = domain
+        self.logins = 0
+        self._rest = rest
+        self._default_headers = None
+        self._token: Optional[AuthToken] = None
+        self._lock = threading.Lock()
+        self._retrying = threading.local()
+
+    @property
+    def rest(self) -> Rest:
+        """
+        Rest session shared by tests
+        """
+        if self._rest is None:
+            self._rest = Rest(pool_size=10, cassette=get_session_cassette())
+        if self._default_headers is None:
+            self._default_headers = self._rest.rest.headers.copy()
+            if self.reauthorize:
+                self._rest.rest.hooks["response"].append(self._reauthorize_hook)
+        return self._rest
+
+    def token(self) -> AuthToken:
+        """
+        Valid token: cached one, the one from the store or a new one
+        """
+        with self._lock:
+            if self._is_valid(self._token):
+                return self._token
+            if self.store_path is None:
+                self._token = self._login()
+                return self._token
+            with file_lock(self.store_path + ".lock"):
+                token = self._read_store().get(self.name)
+                if not self._is_valid(token):
+                    token = self._login()
+                    self._write_store(token)
+                self._token = token
+            return self._token
+
+    def session(self) -> Session:
+        """
+        Shared session authorized with valid token, with headers and cookies of the previous test reset
+        """
+        session = self.rest.rest
+        session.headers = CaseInsensitiveDict(self._default_headers)
+        self.rest.clear_cookies()
+        self.apply(session, self.token())
+        return session
+
+    def apply(self, session: Session, token: AuthToken):
+        """
+        Set token headers and cookies to the session, cookies are sent to the authorization domain only
+        """
+        session.headers.update(token.headers)
+        if not token.cookies:
+            return
+        domain = self.domain or token.domain
+        if domain is None:
+            raise ValueError(f"Domain of {self.name} authorization cookies is unknown, set AuthManager domain")
+        for name, value in token.cookies.items():
+            session.cookies.set(name, value, domain=domain)
+
+    def invalidate(self):
+        """
+        Forget the token (e.g. when it is revoked), the next token() logs in again
+        """
+        with self._lock:
+            expired = self._token
+            self._token = None
+            if self.store_path is None:
+                return
+            with file_lock(self.store_path + ".lock"):
+                tokens = self._read_store()
+                # another process may have already stored a new token
+                if expired is not None and tokens.get(self.name) == expired:
+                    del tokens[self.name]
+                    self._write_tokens(tokens)
+
+    def _login(self) -> AuthToken:
+        # login is done with a separate session, so its cookies do not leak into the tests session
+        with Session() as login_session:
+            token = self.login(login_session)
+        self.logins += 1
+        cookies = dict(token.cookies or {})
+        domain = token.domain or next((cookie.domain for cookie in login_session.cookies
+                                       if cookie.name in cookies and cookie.domain), None)
+        return AuthToken(dict(token.headers or {}), cookies,
+                         token.expires_at if token.expires_at is not None else time.time() + self.ttl,
+                         domain)
+
+    def _is_valid(self, token: Optional[AuthToken]) -> bool:
+        return token is not None and token.expires_at - self.refresh_margin > time.time()
+
+    def _read_store(self) -> Dict[str, AuthToken]:
+        try:
+            with open(self.store_path, encoding="utf-8") as store_file:
+                stored = json.load(store_file)
+        except (FileNotFoundError, ValueError):
+            return {}
+        return {name: AuthToken(**token) for name, token in stored.items()}
+
+    def _write_store(self, token: AuthToken):
+        tokens = self._read_store()
+        tokens[self.name] = token
+        self._write_tokens(tokens)
+
+    def _write_tokens(self, tokens: Dict[str, AuthToken]):
+        temp_path = f"{self.store_path}.{os.getpid()}.tmp"
+        # tokens are secrets, the store is readable by the owner only
+        with open(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w", encoding="utf-8") as store:
+            json.dump({name: token._asdict() for name, token in tokens.items()}, store)
+        os.replace(temp_path, self.store_path)
+
+    def _carries_token(self, request) -> bool:
+        token = self._token
+        if token is None or not token.headers and not token.cookies:
+            return False
+        cookies = request.headers.get("Cookie", "")
+        return all(request.headers.get(name) == value for name, value in token.headers.items()) \
+            and all(f"{name}={value}" in cookies for name, value in token.cookies.items())
+
+    def _reauthorize_hook(self, response, *args, **kwargs):
+        # only requests sent with the managed token are retried, and only once
+        if response.status_code != 401 or getattr(self._retrying, "active", False) \
+                or not self._carries_token(response.request):
+            return response
+        self.invalidate()
+        token = self.token()
+        session = self.rest.rest
+        self.apply(session, token)
+        request = response.request.copy()
+        request.headers.update(token.headers)
+        request.headers.pop("Cookie", None)
+        request.prepare_cookies(session.cookies)
+        response.close()
+        self._retrying.active = True
+        try:
+            # sent through the session, so cookies of the response are stored and redirects are followed
+            retried = session.send(request, **kwargs)
+        finally:
+            self._retrying.active = False
+        retried.history.insert(0, response)
+        return retried
+
+
+_managers: Dict[str, AuthManager] = {}
+
+
+def get_auth_manager(name: str = "default", **kwargs) -> AuthManager:
+    """
+    Process-wide authorization manager per credentials name
+    :param name: Name of the credentials
+    :param kwargs: AuthManager arguments used when the manager is created
+    :return: Authorization manager instance
+    """
+    if name not in _managers:
+        _managers[name] = AuthManager(name=name, **kwargs)
+    return _managers[name]
@@ -1,10 +1,31 @@
 """
 Module for Browser driver instance initiating
 """
+import inspect
 import os
+from copy import deepcopy
 from typing import Dict, Any
 from selenium import webdriver
 
+SELENOID_HUB = "http://localhost:4444/wd/hub"
+
+SELENOID_CAPABILITIES: Dict[str, Dict[str, Any]] = {
+    "chrome": {
+        "browserName": "chrome",
+        "browserVersion": "87.0",
+        "selenoid:options": {
+            "enableVNC": True
+        }
+    },
+    "firefox": {
+        "browserName": "firefox",
+        "browserVersion": "83.0",
+        "selenoid:options": {
+            "enableVNC": True
+        }
+    }
+}
+
 
 class Browser:
     """
@@ -14,41 +35,50 @@ class Browser:
     def __init__(self):
         self.driver = webdriver
 
-    def selenoid_browser(self, browser_name, enable_video: bool = False, video_name: str = ""):
-        """Running browser in selenoid (currently local only), chrome or firefox"""
+    def selenoid_browser(self,
+                         browser_name,
+                         enable_video: bool = None,
+                         video_name: str = "",
+                         command_executor: str = SELENOID_HUB,
+                         capabilities: Dict[str, Any] = None):
+        """
+        Running browser in selenoid, chrome or firefox
+        :param browser_name: Browser name in string format
+        :param enable_video: Whether session video is recorded (enableVideo of capabilities, off by default)
+        :param video_name: Name of the video file (without extension)
+        :param command_executor: Selenoid hub URL (local hub by default)
+        :param capabilities: Capabilities to use instead of the default ones for the browser
+        :return: Remote browser driver instance
+        """
         driver = self.driver
-        if browser_name == "chrome":
-            capabilities: Dict[str, Any] = {
-                "browserName": "chrome",
-                "browserVersion": "87.0",
-                "selenoid:options": {
-                    "enableVNC": True,
-                    "enableVideo": enable_video
-                }
-            }
+        if capabilities is None:
+            if browser_name not in SELENOID_CAPABILITIES:
+                raise Exception(f'Unsupported browser {browser_name}')
+            capabilities = SELENOID_CAPABILITIES[browser_name]
+        capabilities = deepcopy(capabilities)
+        selenoid_options = capabilities.setdefault("selenoid:options", {})
+        if enable_video is not None:
+            selenoid_options["enableVideo"] = enable_video
+        selenoid_options.setdefault("enableVideo", False)
+        if capabilities.get("browserName", browser_name) == "chrome":
             options = driver.ChromeOptions()
-            options.add_argument("--window-size=1920,1080")
-        elif browser_name == "firefox":
-            capabilities: Dict[str, Any] = {
-                "browserName": "firefox",
-                "browserVersion": "83.0",
-                "selenoid:options": {
-                    "enableVNC": True,
-                    "enableVideo": enable_video
-                }
-            }
+        elif capabilities.get("browserName", browser_name) == "firefox":
             options = driver.FirefoxOptions()
-            options.add_argument("--window-size=1920,1080")
         else:
             raise Exception(f'Unsupported browser {browser_name}')
+        options.add_argument("--window-size=1920,1080")
 
-        if enable_video and video_name:
-            capabilities["selenoid:options"].update({"videoName": f"{video_name}.mp4"})
-        driver = driver.Remote(
-            command_executor="http://localhost:4444/wd/hub",
-            desired_capabilities=capabilities,
-            options=options)
-        return driver
+        if selenoid_options["enableVideo"] and video_name:
+            selenoid_options.update({"videoName": f"{video_name}.mp4"})
+        if "desired_capabilities" in inspect.signature(driver.Remote.__init__).parameters:
+            return driver.Remote(
+                command_executor=command_executor,
+                desired_capabilities=capabilities,
+                options=options)
+        # Selenium 4.10+ takes capabilities with options only
+        for name, value in capabilities.items():
+            options.set_capability(name, value)
+        return driver.Remote(command_executor=command_executor, options=options)
 
     def browser_driver(self, browser_name: str):
         """
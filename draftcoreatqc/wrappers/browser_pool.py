@@ -0,0 +1,274 @@
+"""
+Module for pool of reusable browser driver instances
+"""
+import atexit
+import threading
+import time
+from collections import namedtuple
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.remote.command import Command
+from draftcoreatqc.wrappers.browser import Browser
+
+PoolStats = namedtuple('PoolStats', ['acquired', 'hits', 'created', 'recycled', 'wait_time', 'hit_rate'])
+
+CLEAR_STORAGE_SCRIPT = "window.localStorage.clear(); window.sessionStorage.clear();"
+# origins opened with driver.get since the last reset, kept on the driver
+VISITED_ORIGINS = "_draftcoreatqc_visited_origins"
+
+
+class BrowserPool:
+    """
+    Class of pool of warm browser sessions \n
+    Sessions are reset and reused between tests instead of being quit,
+    and are recycled after max_uses or after failed test. \n
+    Cookies and storage are cleared for every visited origin: with DevTools protocol commands
+    (local Chrome and Edge), or by opening every origin opened with driver.get or left open in a tab
+    and clearing it with WebDriver commands (Firefox, Remote/Selenoid). Session which fails to be reset is quit. \n
+    Pool lives in a single process, so every pytest-xdist worker has its own pool
+    of up to `size` sessions and no session is shared between workers.
+    """
+
+    def __init__(self,
+                 browser_name: str,
+                 size: int = 1,
+                 max_uses: int = 50,
+                 selenoid: bool = False,
+                 window_size: Tuple[int, int] = (1920, 1080),
+                 start_url: str = "about:blank"):
+        """
+        :param browser_name: Browser name (chrome or firefox)
+        :param size: Maximum number of sessions in the pool
+        :param max_uses: Number of tests after which session is quit and replaced by a new one
+        :param selenoid: Whether sessions are started in selenoid
+        :param window_size: Window size restored on release
+        :param start_url: URL opened on release
+        """
+        self.browser_name = browser_name
+        self.size = size
+        self.max_uses = max_uses
+        self.selenoid = selenoid
+        self.window_size = window_size
+        self.start_url = start_url
+        self.acquired = 0
+        self.hits = 0
+        self.created = 0
+        self.recycled = 0
+        self.wait_time = 0.0
+        self._idle = []
+        self._uses: Dict[int, int] = {}
+        self._drivers = {}
+        self._starting = 0
+        self._lock = threading.Lock()
+        # notified whenever session is released or place in the pool is freed
+        self._available = threading.Condition(self._lock)
+
+    def warm(self, count: int = None):
+        """
+        Start sessions in advance, up to the pool size
+        :param count: Number of sessions to start (pool size by default)
+        """
+        for _ in range(count or self.size):
+            driver = self._reserve_and_create()
+            if driver is None:
+                break
+            self._put_idle(driver)
+
+    def acquire(self, timeout: float = None):
+        """
+        Get browser session from the pool, starting new one if pool is not full yet
+        :param timeout: Time to wait for released session when pool is full (forever by default)
+        :return: Browser driver instance
+        """
+        start = time.perf_counter()
+        deadline = None if timeout is None else start + timeout
+        driver = None
+        with self._available:
+            while not self._idle and not self._reserve():
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"No browser session was released in {timeout} seconds")
+                self._available.wait(remaining)
+            if self._idle:
+                driver = self._idle.pop()
+            # wait time is the time until idle session or place in the pool is taken, start of a session is not
+            self.acquired += 1
+            self.hits += driver is not None
+            self.wait_time += time.perf_counter() - start
+        if driver is None:
+            driver = self._create_reserved()
+        return driver
+
+    def release(self, driver, failed: bool = False):
+        """
+        Return browser session to the pool \n
+        Session is reset for the next test, or quit if it failed, was used max_uses times or fails to be reset
+        :param driver: Browser driver instance received from acquire
+        :param failed: Whether the test which used session has failed
+        """
+        key = id(driver)
+        with self._lock:
+            uses = self._uses[key] = self._uses.get(key, 0) + 1
+        if failed or uses >= self.max_uses:
+            self._discard(driver)
+            return
+        try:
+            self.reset(driver)
+        except WebDriverException:
+            self._discard(driver)
+            return
+        except Exception:
+            # place of the session in the pool is freed before the error is reported
+            self._discard(driver)
+            raise
+        self._put_idle(driver)
+
+    def reset(self, driver):
+        """
+        Reset browser state: close extra tabs, clear cookies and storage of visited origins, restore window size
+        """
+        cdp = hasattr(driver, "execute_cdp_cmd")
+        origins = set(getattr(driver, VISITED_ORIGINS, ()))
+        handles = driver.window_handles
+        for handle in reversed(handles):
+            driver.switch_to.window(handle)
+            origins.add(_origin(driver.current_url))
+            if cdp:
+                history = driver.execute_cdp_cmd("Page.getNavigationHistory", {})
+                origins.update(_origin(entry.get("url", "")) for entry in history.get("entries", []))
+            if handle != handles[0]:
+                driver.close()
+        origins.discard(None)
+        if cdp:
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            for origin in origins:
+                driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+        else:
+            # WebDriver commands only reach cookies and storage of the current origin
+            for origin in sorted(origins):
+                driver.get(origin)
+                driver.delete_all_cookies()
+                driver.execute_script(CLEAR_STORAGE_SCRIPT)
+        driver.set_window_size(*self.window_size)
+        driver.get(self.start_url)
+        setattr(driver, VISITED_ORIGINS, set())
+
+    def stats(self) -> PoolStats:
+        """
+        Pool usage statistics: acquire calls, reused sessions, started sessions, recycled sessions,
+        total time waiting for idle session or place in the pool (without start of sessions) and hit rate
+        """
+        hit_rate = self.hits / self.acquired if self.acquired else 0.0
+        return PoolStats(self.acquired, self.hits, self.created, self.recycled, self.wait_time, hit_rate)
+
+    def close(self):
+        """
+        Quit all sessions of the pool
+        """
+        for driver in list(self._drivers.values()):
+            self._discard(driver, recycle=False)
+        with self._lock:
+            self._idle = []
+
+    def _reserve(self) -> bool:
+        # called with the lock held: reserves place in the pool while session is starting
+        if len(self._drivers) + self._starting >= self.size:
+            return False
+        self._starting += 1
+        return True
+
+    def _reserve_and_create(self):
+        with self._lock:
+            if not self._reserve():
+                return None
+        return self._create_reserved()
+
+    def _create_reserved(self):
+        try:
+            driver = self._create()
+        except BaseException:
+            with self._available:
+                self._starting -= 1
+                self._available.notify()
+            raise
+        _track_origins(driver)
+        with self._lock:
+            self._starting -= 1
+            self._drivers[id(driver)] = driver
+            self.created += 1
+        return driver
+
+    def _put_idle(self, driver):
+        with self._available:
+            self._idle.append(driver)
+            self._available.notify()
+
+    def _create(self):
+        browser = Browser()
+        if self.selenoid:
+            return browser.selenoid_browser(browser_name=self.browser_name)
+        return browser.browser_driver(browser_name=self.browser_name)
+
+    def _discard(self, driver, recycle: bool = True):
+        with self._available:
+            self._drivers.pop(id(driver), None)
+            self._uses.pop(id(driver), None)
+            self.recycled += recycle
+            # place in the pool is free, a waiting acquire starts a new session
+            self._available.notify()
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+
+def _origin(url: str) -> Optional[str]:
+    parts = urlsplit(url or "")
+    if parts.scheme not in ("http", "https"):
+        return None
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _track_origins(driver):
+    """
+    Record origins opened with driver.get, to be cleared when the session is reset
+    """
+    setattr(driver, VISITED_ORIGINS, set())
+    execute = driver.execute
+
+    def tracking_execute(driver_command, params=None):
+        if driver_command == Command.GET and params:
+            origin = _origin(params.get("url"))
+            if origin:
+                getattr(driver, VISITED_ORIGINS).add(origin)
+        return execute(driver_command, params)
+
+    driver.execute = tracking_execute
+
+
+_pools: Dict[tuple, BrowserPool] = {}
+
+
+def get_browser_pool(browser_name: str, selenoid: bool = False, **kwargs) -> BrowserPool:
+    """
+    Process-wide browser pool per browser name and selenoid flag
+    :param browser_name: Browser name (chrome or firefox)
+    :param selenoid: Whether sessions are started in selenoid
+    :param kwargs: BrowserPool arguments used when the pool is created
+    :return: Browser pool instance
+    """
+    key = (browser_name, selenoid)
+    if key not in _pools:
+        _pools[key] = BrowserPool(browser_name, selenoid=selenoid, **kwargs)
+    return _pools[key]
+
+
+@atexit.register
+def close_browser_pools():
+    """
+    Quit sessions of all pools
+    """
+    for pool in _pools.values():
+        pool.close()
+    _pools.clear()
@@ -0,0 +1,413 @@
+"""
+Record/replay HTTP cassette module
+"""
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from collections import namedtuple
+from hashlib import blake2b
+from http.client import HTTPMessage
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from requests import Session
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.models import PreparedRequest, Response
+from requests.cookies import extract_cookies_to_jar
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+MODES = ("off", "record", "replay", "auto")
+
+INDEX_FILE = "index.bin"
+DATA_FILE = "data.bin"
+INDEX_MAGIC = b"DCQCAS01"
+# index record: request key, offset and length of the entry in data file
+INDEX_RECORD = struct.Struct(">16sQI")
+# data entry: length of JSON header, JSON header, response body
+ENTRY_HEADER = struct.Struct(">I")
+MULTIPART_BOUNDARY = re.compile(r'boundary="?([^";]+)"?', re.IGNORECASE)
+
+CassetteReport = namedtuple('CassetteReport', ['hits', 'misses', 'recorded', 'stale', 'unused'])
+
+
+class CassetteMissError(LookupError):
+    """
+    Request is not recorded in cassette opened in replay mode
+    """
+
+
+def request_key(method: str, url: str, body=None, content_type: str = None) -> bytes:
+    """
+    Key of the request: method, URL with sorted query parameters and hash of the body \n
+    Random multipart boundary is removed from the body, so the same form data gets the same key
+    :param body: Request body: str, bytes or seekable file object (read and rewound)
+    :param content_type: Content-Type header of the request
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    normalized_url = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", query, ""))
+    body = _body_bytes(body)
+    boundary = MULTIPART_BOUNDARY.search(content_type) if content_type and "multipart/" in content_type else None
+    if boundary:
+        body = body.replace(boundary.group(1).encode("latin-1"), b"")
+    body_hash = blake2b(body, digest_size=16).hexdigest()
+    return blake2b(f"{method.upper()} {normalized_url} {body_hash}".encode("utf-8"), digest_size=16).digest()
+
+
+def _body_bytes(body) -> bytes:
+    if body is None:
+        return b""
+    if isinstance(body, str):
+        return body.encode("utf-8")
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        return bytes(body)
+    if hasattr(body, "read") and hasattr(body, "seek") and getattr(body, "seekable", lambda: True)():
+        position = body.tell()
+        data = body.read()
+        body.seek(position)
+        return data.encode("utf-8") if isinstance(data, str) else data
+    raise TypeError(f"Request body of type {type(body).__name__} can not be recorded in cassette, "
+                    f"send it as bytes, str or seekable file")
+
+
+class Cassette:
+    """
+    Class of on-disk store of recorded HTTP interactions \n
+    Responses are appended to the data file, while the index file keeps sorted fixed-width records
+    (request key, offset, length). Index and data are memory-mapped and looked up with binary search,
+    so opening a cassette does not read it and replay does not parse anything but the matched entry. \n
+    Modes:
+    off - requests are sent as is;
+    record - requests are sent and responses are recorded, overwriting recorded ones
+    (data file is compacted on close, dropping overwritten entries);
+    replay - responses are replayed, not recorded request raises CassetteMissError;
+    auto - recorded responses are replayed, the others are sent and recorded
+    """
+
+    def __init__(self, path: str, mode: str = "auto", max_age: float = None):
+        """
+        :param path: Directory of the cassette (created if it does not exist)
+        :param mode: One of off, record, replay, auto
+        :param max_age: Age in seconds, after which replayed entries are reported as stale
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode: {mode}, expected one of {', '.join(MODES)}")
+        self.path = path
+        self.mode = mode
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self.stale: List[str] = []
+        self._used = set()
+        self._pending: Dict[bytes, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._index = None
+        self._data = None
+        self._data_file = None
+        self._closed_report = None
+        if mode != "off":
+            os.makedirs(path, exist_ok=True)
+            self._open()
+
+    def adapter(self, delegate: BaseAdapter = None) -> "CassetteAdapter":
+        """
+        Transport adapter recording and replaying requests sent by delegate adapter
+        """
+        return CassetteAdapter(self, delegate or HTTPAdapter())
+
+    def mount(self, session: Session):
+        """
+        Mount cassette adapter to the session for both http and https, wrapping the current adapters
+        """
+        if self.mode == "off":
+            return
+        for prefix in ("http://", "https://"):
+            adapter = session.get_adapter(prefix)
+            if not isinstance(adapter, CassetteAdapter):
+                session.mount(prefix, self.adapter(adapter))
+
+    def lookup(self, key: bytes, request: PreparedRequest = None) -> Optional[Response]:
+        """
+        Recorded response of the request key, None if it is not recorded
+        :param request: Replayed request, set to the response and used to extract its cookies
+        """
+        with self._lock:
+            location = self._pending.get(key) or self._find(key)
+            if location is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._used.add(key)
+            header, body = self._read(*location)
+        if self.max_age is not None and time.time() - header["recorded_at"] > self.max_age:
+            with self._lock:
+                self.stale.append(f"{header['method']} {header['url']} (recorded {int(header['recorded_at'])})")
+        return _build_response(header, body, request)
+
+    def record(self, key: bytes, request: PreparedRequest, response: Response):
+        """
+        Record response of the request, reporting recorded entry as stale if the body has changed
+        """
+        body = response.content or b""
+        body_hash = blake2b(body, digest_size=16).hexdigest()
+        header = json.dumps({
+            "method": request.method,
+            "url": request.url,
+            "status_code": response.status_code,
+            "reason": response.reason,
+            "headers": dict(response.headers),
+            "set_cookies": _set_cookies(response),
+            "body_hash": body_hash,
+            "recorded_at": time.time()
+        }).encode("utf-8")
+        with self._lock:
+            previous = self._pending.get(key) or self._find(key)
+            if previous is not None:
+                recorded, _ = self._read(*previous)
+                if recorded["body_hash"] != body_hash or recorded["status_code"] != response.status_code:
+                    self.stale.append(f"{request.method} {request.url} (response changed)")
+            self._data_file.seek(0, os.SEEK_END)
+            offset = self._data_file.tell()
+            self._data_file.write(ENTRY_HEADER.pack(len(header)) + header + body)
+            self._data_file.flush()
+            self._pending[key] = (offset, ENTRY_HEADER.size + len(header) + len(body))
+            self._used.add(key)
+            self.recorded += 1
+
+    def report(self) -> CassetteReport:
+        """
+        Number of replayed, missed and recorded requests,
+        stale entries (changed on re-recording or older than max_age) and number of unused entries
+        """
+        if self._closed_report:
+            return self._closed_report
+        total = len(set(self._recorded_keys()) | set(self._pending))
+        return CassetteReport(self.hits, self.misses, self.recorded, list(self.stale), total - len(self._used))
+
+    def save(self):
+        """
+        Merge entries recorded in this session into the sorted index
+        """
+        if not self._pending:
+            return
+        with self._lock:
+            records = dict(self._index_records())
+            records.update(self._pending)
+            index_path = os.path.join(self.path, INDEX_FILE)
+            temp_path = index_path + ".tmp"
+            with open(temp_path, "wb") as index_file:
+                index_file.write(INDEX_MAGIC)
+                for key in sorted(records):
+                    index_file.write(INDEX_RECORD.pack(key, *records[key]))
+            self._close_maps()
+            os.replace(temp_path, index_path)
+            self._pending.clear()
+            self._map_files()
+
+    def compact(self):
+        """
+        Rewrite the data file with indexed entries only, dropping entries overwritten by re-recording
+        """
+        with self._lock:
+            records = list(self._index_records())
+            data_path = os.path.join(self.path, DATA_FILE)
+            index_path = os.path.join(self.path, INDEX_FILE)
+            if sum(length for _, (_, length) in records) == os.fstat(self._data_file.fileno()).st_size:
+                return
+            with open(data_path + ".tmp", "wb") as data_file, open(index_path + ".tmp", "wb") as index_file:
+                index_file.write(INDEX_MAGIC)
+                offset = 0
+                for key, (entry_offset, length) in records:
+                    data_file.write(self._data[entry_offset:entry_offset + length])
+                    index_file.write(INDEX_RECORD.pack(key, offset, length))
+                    offset += length
+            self._close_maps()
+            self._data_file.close()
+            os.replace(data_path + ".tmp", data_path)
+            os.replace(index_path + ".tmp", index_path)
+            self._data_file = open(data_path, "a+b")
+            self._map_files()
+
+    def close(self):
+        """
+        Save recorded entries, compact the data file if entries were recorded and release the cassette files
+        """
+        if self.mode == "off":
+            return
+        recorded = self.recorded
+        self.save()
+        if recorded:
+            self.compact()
+        self._closed_report = self.report()
+        with self._lock:
+            self._close_maps()
+            if self._data_file:
+                self._data_file.close()
+                self._data_file = None
+
+    def _open(self):
+        index_path = os.path.join(self.path, INDEX_FILE)
+        if not os.path.exists(index_path):
+            with open(index_path, "wb") as index_file:
+                index_file.write(INDEX_MAGIC)
+        self._data_file = open(os.path.join(self.path, DATA_FILE), "a+b")
+        self._map_files()
+
+    def _map_files(self):
+        with open(os.path.join(self.path, INDEX_FILE), "rb") as index_file:
+            if index_file.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                raise ValueError(f"{self.path} is not a cassette")
+            if os.fstat(index_file.fileno()).st_size > len(INDEX_MAGIC):
+                self._index = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if os.fstat(self._data_file.fileno()).st_size:
+            self._data = mmap.mmap(self._data_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _close_maps(self):
+        for mapped in (self._index, self._data):
+            if mapped is not None:
+                mapped.close()
+        self._index = self._data = None
+
+    def _records_count(self) -> int:
+        if self._index is None:
+            return 0
+        return (len(self._index) - len(INDEX_MAGIC)) // INDEX_RECORD.size
+
+    def _record_at(self, position: int) -> Tuple[bytes, int, int]:
+        return INDEX_RECORD.unpack_from(self._index, len(INDEX_MAGIC) + position * INDEX_RECORD.size)
+
+    def _find(self, key: bytes) -> Optional[Tuple[int, int]]:
+        low, high = 0, self._records_count()
+        while low < high:
+            middle = (low + high) // 2
+            found, offset, length = self._record_at(middle)
+            if found == key:
+                return offset, length
+            if found < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def _index_records(self):
+        for position in range(self._records_count()):
+            key, offset, length = self._record_at(position)
+            yield key, (offset, length)
+
+    def _recorded_keys(self):
+        return (key for key, _ in self._index_records())
+
+    def _read(self, offset: int, length: int) -> Tuple[dict, bytes]:
+        if self._data is not None and offset + length <= len(self._data):
+            entry = self._data[offset:offset + length]
+        else:
+            # entry was recorded after data file had been mapped
+            self._data_file.seek(offset)
+            entry = self._data_file.read(length)
+        header_length, = ENTRY_HEADER.unpack_from(entry)
+        header_end = ENTRY_HEADER.size + header_length
+        return json.loads(entry[ENTRY_HEADER.size:header_end]), entry[header_end:]
+
+
+class CassetteAdapter(BaseAdapter):
+    """
+    Transport adapter replaying responses from cassette and recording responses of delegate adapter
+    """
+
+    def __init__(self, cassette: Cassette, delegate: BaseAdapter):
+        super().__init__()
+        self.cassette = cassette
+        self.delegate = delegate
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:
+        cassette = self.cassette
+        if cassette.mode == "off":
+            return self.delegate.send(request, **kwargs)
+        key = request_key(request.method, request.url, request.body, request.headers.get("Content-Type"))
+        if cassette.mode in ("replay", "auto"):
+            response = cassette.lookup(key, request)
+            if response is not None:
+                response.connection = self
+                return response
+            if cassette.mode == "replay":
+                raise CassetteMissError(f"{request.method} {request.url} is not recorded in {cassette.path}")
+        response = self.delegate.send(request, **kwargs)
+        cassette.record(key, request, response)
+        return response
+
+    def close(self):
+        self.delegate.close()
+
+
+class _ReplayedRaw:
+    """
+    Stand-in of urllib3 response of replayed entry: carries recorded Set-Cookie headers,
+    so session stores replayed cookies the same way as the received ones
+    """
+
+    def __init__(self, set_cookies: List[str]):
+        self.msg = HTTPMessage()
+        for value in set_cookies:
+            self.msg["Set-Cookie"] = value
+        self._original_response = self
+
+    def release_conn(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _set_cookies(response: Response) -> List[str]:
+    """
+    Set-Cookie headers of the response one by one (response.headers joins them with comma)
+    """
+    getlist = getattr(getattr(response.raw, "headers", None), "getlist", None)
+    if getlist is not None:
+        return list(getlist("Set-Cookie"))
+    return [response.headers["Set-Cookie"]] if "Set-Cookie" in response.headers else []
+
+
+def _build_response(header: dict, body: bytes, request: PreparedRequest = None) -> Response:
+    response = Response()
+    response.status_code = header["status_code"]
+    response.reason = header["reason"]
+    response.headers = CaseInsensitiveDict(header["headers"])
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = header["url"]
+    response._content = body
+    response._content_consumed = True
+    set_cookies = header.get("set_cookies")
+    if set_cookies is None:  # recorded before Set-Cookie headers were kept separately
+        set_cookies = [response.headers["Set-Cookie"]] if "Set-Cookie" in response.headers else []
+    response.raw = _ReplayedRaw(set_cookies)
+    if request is not None:
+        response.request = request
+        extract_cookies_to_jar(response.cookies, request, response.raw)
+    return response
+
+
+_session_cassette: Optional[Cassette] = None
+
+
+def use_session_cassette(path: str, mode: str, max_age: float = None) -> Cassette:
+    """
+    Open cassette shared by all Rest sessions of the test session
+    """
+    global _session_cassette
+    if _session_cassette is not None:
+        _session_cassette.close()
+    _session_cassette = Cassette(path, mode=mode, max_age=max_age)
+    return _session_cassette
+
+
+def get_session_cassette() -> Optional[Cassette]:
+    """
+    Cassette of the test session, None if it is not used
+    """
+    return _session_cassette
@@ -1,7 +1,70 @@
 """
 REST API client wrapper module
 """
+from typing import Union
 from requests import Session
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
+from urllib3.util.retry import Retry
+from draftcoreatqc.wrappers.cassette import Cassette, CassetteAdapter
+
+RETRY_STATUSES = (502, 503, 504)
+
+
+def pooled_adapter(pool_size: int = 10,
+                   retries: Union[int, Retry] = 0,
+                   backoff_factor: float = 0.0,
+                   pool_hosts: int = DEFAULT_POOLSIZE) -> HTTPAdapter:
+    """
+    HTTP adapter with pool of keep-alive connections \n
+    Configured sizes are kept as pool_size and pool_hosts attributes of the adapter
+    :param pool_size: Number of connections kept per host (pool_maxsize)
+    :param retries: Number of retries on connection errors and 502/503/504 statuses (or Retry object)
+    :param backoff_factor: Backoff factor between retries
+    :param pool_hosts: Number of hosts whose connection pools are kept (pool_connections)
+    :return: HTTP adapter instance
+    """
+    if not isinstance(retries, Retry):
+        retries = Retry(total=retries,
+                        backoff_factor=backoff_factor,
+                        status_forcelist=RETRY_STATUSES,
+                        raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_hosts,
+                          pool_maxsize=pool_size,
+                          max_retries=retries)
+    adapter.pool_size = pool_size
+    adapter.pool_hosts = pool_hosts
+    return adapter
+
+
+def mount_pool(session: Session,
+               pool_size: int = 10,
+               retries: Union[int, Retry] = 0,
+               backoff_factor: float = 0.0):
+    """
+    Mount pooled adapter to the session for both http and https
+    """
+    for prefix in ("http://", "https://"):
+        session.mount(prefix, pooled_adapter(pool_size, retries, backoff_factor))
+
+
+def ensure_pool_size(session: Session, pool_size: int):
+    """
+    Remount session adapters which keep less than pool_size connections per host,
+    keeping their retries configuration (adapters wrapped by cassette are replaced inside it).
+    Replaced adapters are closed, releasing their pooled connections
+    """
+    for prefix in ("http://", "https://"):
+        adapter = session.get_adapter(prefix)
+        wrapped = getattr(adapter, "delegate", adapter)
+        # adapters not created by pooled_adapter have requests default sizes
+        if isinstance(wrapped, HTTPAdapter) and getattr(wrapped, "pool_size", DEFAULT_POOLSIZE) < pool_size:
+            replacement = pooled_adapter(pool_size, wrapped.max_retries,
+                                         pool_hosts=getattr(wrapped, "pool_hosts", DEFAULT_POOLSIZE))
+            if wrapped is adapter:
+                session.mount(prefix, replacement)
+            else:
+                adapter.delegate = replacement
+            wrapped.close()
 
 
 class Rest:
@@ -9,10 +72,34 @@ class Rest:
     Class of REST API client wrapper
     By default is initiated with cleared cookies
     """
-    def __init__(self):
+    def __init__(self,
+                 pool_size: int = None,
+                 retries: int = 0,
+                 backoff_factor: float = 0.0,
+                 cassette: Cassette = None):
+        """
+        :param pool_size: Number of keep-alive connections per host (requests default if not set)
+        :param retries: Number of retries on connection errors and 502/503/504 statuses
+        :param backoff_factor: Backoff factor between retries
+        :param cassette: Cassette to record and replay requests with
+        """
         self.rest = Session()
+        if pool_size or retries:
+            self.configure_pool(pool_size or 10, retries, backoff_factor)
+        if cassette:
+            cassette.mount(self.rest)
         self.clear_cookies()
 
+    def configure_pool(self, pool_size: int = 10, retries: int = 0, backoff_factor: float = 0.0):
+        """
+        Configure connections pool and retries of the session
+        """
+        cassettes = {prefix: adapter.cassette for prefix, adapter in self.rest.adapters.items()
+                     if isinstance(adapter, CassetteAdapter)}
+        mount_pool(self.rest, pool_size, retries, backoff_factor)
+        for cassette in set(cassettes.values()):
+            cassette.mount(self.rest)
+
     def clear_cookies(self):
         """
         Clear cookies
@@ -0,0 +1,191 @@
+"""
+Module for launching selenoid sessions in parallel across several hubs
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import namedtuple
+from string import Template
+from typing import Any, Dict, List
+from draftcoreatqc.wrappers.browser import Browser, SELENOID_HUB, SELENOID_CAPABILITIES
+
+HubStats = namedtuple('HubStats', ['url', 'active', 'started', 'failed', 'mean_startup', 'max_startup'])
+
+
+def render_template(template: Any, variables: Dict[str, Any]) -> Any:
+    """
+    Substitute $name / ${name} placeholders in all strings of the capabilities template.
+    String consisting of a single placeholder is replaced by the variable value as is,
+    so booleans and numbers keep their type
+    :param template: Capabilities template (dict, list or scalar)
+    :param variables: Values of placeholders
+    :return: Rendered capabilities
+    """
+    if isinstance(template, dict):
+        return {key: render_template(value, variables) for key, value in template.items()}
+    if isinstance(template, list):
+        return [render_template(value, variables) for value in template]
+    if isinstance(template, str):
+        name = template[2:-1] if template.startswith("${") and template.endswith("}") else None
+        if name in variables:
+            return variables[name]
+        return Template(template).safe_substitute(variables)
+    return template
+
+
+class _KeepMissing(dict):
+    """
+    Format variables leaving unknown {placeholders} as is
+    """
+
+    def __missing__(self, key):
+        return "{" + key + "}"
+
+
+def render_video_name(video_name: str, variables: Dict[str, Any]) -> str:
+    """
+    Substitute {name} placeholders of the video name, unknown placeholders are kept as is
+    """
+    try:
+        return str(video_name).format_map(_KeepMissing(variables))
+    except (ValueError, IndexError) as error:
+        raise ValueError(f"Invalid video_name template {video_name!r}: {error}")
+
+
+class SelenoidLauncher:
+    """
+    Class of selenoid sessions launcher \n
+    Sessions are created in parallel, every new session goes to the least loaded hub,
+    and failed attempts are retried with exponential backoff.
+    """
+
+    def __init__(self,
+                 hubs: List[str] = None,
+                 templates: Dict[str, Dict[str, Any]] = None,
+                 retries: int = 3,
+                 backoff: float = 1.0,
+                 max_workers: int = 10):
+        """
+        :param hubs: Selenoid hubs URLs (local hub by default)
+        :param templates: Capabilities templates per browser name (default selenoid capabilities if not set)
+        :param retries: Number of retries of failed session creation
+        :param backoff: Delay before the first retry, doubled for every next one
+        :param max_workers: Maximum number of sessions created simultaneously
+        """
+        self.hubs = list(hubs or [SELENOID_HUB])
+        self.templates = templates or SELENOID_CAPABILITIES
+        self.retries = retries
+        self.backoff = backoff
+        self.max_workers = max_workers
+        self._active = {hub: 0 for hub in self.hubs}
+        self._failed = {hub: 0 for hub in self.hubs}
+        self._startup = {hub: [] for hub in self.hubs}
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config_path: str, encoding=None) -> "SelenoidLauncher":
+        """
+        Create launcher from JSON config with keys: hubs, capabilities, retries, backoff, max_workers
+        :param config_path: Path to the config file
+        :param encoding: Encoding of the config file (None by default)
+        :return: Launcher instance
+        """
+        with open(config_path, encoding=encoding) as config_file:
+            config = json.loads(config_file.read())
+        return cls(hubs=config.get("hubs"),
+                   templates=config.get("capabilities"),
+                   retries=config.get("retries", 3),
+                   backoff=config.get("backoff", 1.0),
+                   max_workers=config.get("max_workers", 10))
+
+    def launch(self, browser_name: str, count: int = 1, **variables) -> list:
+        """
+        Create sessions in parallel
+        If any session cannot be created, already created ones are quit and the error is raised
+        :param browser_name: Browser name, the key of capabilities template
+        :param count: Number of sessions
+        :param variables: Values of template placeholders, video_name may contain {index} of the session
+        :return: List of remote browser driver instances
+        """
+        with ThreadPoolExecutor(max_workers=min(count, self.max_workers) or 1) as executor:
+            futures = [executor.submit(self.launch_one, browser_name, index=index, **variables)
+                       for index in range(count)]
+        drivers, errors = [], []
+        for future in futures:
+            try:
+                drivers.append(future.result())
+            except Exception as error:
+                errors.append(error)
+        if errors:
+            for driver in drivers:
+                self.quit(driver)
+            raise errors[0]
+        return drivers
+
+    def launch_one(self, browser_name: str, **variables):
+        """
+        Create session on the least loaded hub, retrying with backoff on failures
+        :param browser_name: Browser name, the key of capabilities template
+        :param variables: Values of template placeholders, explicit enable_video overrides the template
+        :return: Remote browser driver instance
+        """
+        if browser_name not in self.templates:
+            raise Exception(f'Unsupported browser {browser_name}')
+        enable_video = variables.get("enable_video")
+        video_name = render_video_name(variables.get("video_name", ""), variables)
+        capabilities = render_template(self.templates[browser_name], variables)
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            hub = self._reserve_hub()
+            start = time.perf_counter()
+            try:
+                driver = Browser().selenoid_browser(browser_name=browser_name,
+                                                    enable_video=enable_video,
+                                                    video_name=video_name,
+                                                    command_executor=hub,
+                                                    capabilities=capabilities)
+            except Exception:
+                with self._lock:
+                    self._active[hub] -= 1
+                    self._failed[hub] += 1
+                if attempt == self.retries:
+                    raise
+                time.sleep(delay)
+                delay *= 2
+                continue
+            with self._lock:
+                self._startup[hub].append(time.perf_counter() - start)
+                self._sessions[id(driver)] = hub
+            return driver
+
+    def quit(self, driver):
+        """
+        Quit session and release its place on the hub
+        """
+        with self._lock:
+            hub = self._sessions.pop(id(driver), None)
+            if hub:
+                self._active[hub] -= 1
+        driver.quit()
+
+    def stats(self) -> List[HubStats]:
+        """
+        Per hub statistics: active sessions, started and failed sessions, startup latency in seconds
+        """
+        with self._lock:
+            return [HubStats(url=hub,
+                             active=self._active[hub],
+                             started=len(self._startup[hub]),
+                             failed=self._failed[hub],
+                             mean_startup=sum(self._startup[hub]) / len(self._startup[hub])
+                             if self._startup[hub] else 0.0,
+                             max_startup=max(self._startup[hub], default=0.0))
+                    for hub in self.hubs]
+
+    def _reserve_hub(self) -> str:
+        with self._lock:
+            hub = min(self.hubs, key=lambda url: (self._active[url], self._failed[url]))
+            self._active[hub] += 1
+            return hub
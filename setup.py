@@ -26,5 +26,10 @@ setuptools.setup(
         'selenium',
         'allure-pytest',
         'pandas'
-    ]
+    ],
+    extras_require={
+        'async': ['aiohttp>=3.7.4'],
+        'streaming': ['ijson>=3.1'],
+        'fast-json': ['orjson>=3.5']
+    }
 )
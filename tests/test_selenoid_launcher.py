@@ -0,0 +1,167 @@
+"""
+Tests of selenoid launcher against local stand-in hubs
+"""
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from draftcoreatqc.wrappers.selenoid_launcher import SelenoidLauncher, render_video_name
+
+TEMPLATES = {
+    "chrome": {
+        "browserName": "chrome",
+        "browserVersion": "${version}",
+        "selenoid:options": {
+            "enableVNC": True,
+            "enableVideo": False,
+            "name": "$suite"
+        }
+    }
+}
+
+
+class StubHub(ThreadingHTTPServer):
+    """
+    Stand-in selenoid hub: creates sessions after startup delay, failing the first `failures` requests
+    """
+    daemon_threads = True
+
+    def __init__(self, startup: float = 0.0, failures: int = 0):
+        super().__init__(("127.0.0.1", 0), StubHubHandler)
+        self.startup = startup
+        self.failures = failures
+        self.capabilities = []
+        self.deleted = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/wd/hub"
+
+
+class StubHubHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        hub = self.server
+        time.sleep(hub.startup)
+        with hub.lock:
+            failed = hub.failures > 0
+            hub.failures -= failed
+            if not failed:
+                hub.capabilities.append(body["capabilities"]["alwaysMatch"])
+        if failed:
+            self._reply(500, {"error": "session not created", "message": "hub is busy", "stacktrace": ""})
+        else:
+            self._reply(200, {"sessionId": uuid.uuid4().hex, "capabilities": body["capabilities"]["alwaysMatch"]})
+
+    def do_DELETE(self):
+        with self.server.lock:
+            self.server.deleted.append(self.path.rsplit("/", 1)[-1])
+        self._reply(200, None)
+
+    def _reply(self, status: int, value):
+        payload = json.dumps({"value": value}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def hubs():
+    started = []
+
+    def start(count: int = 1, **kwargs):
+        for _ in range(count):
+            hub = StubHub(**kwargs)
+            threading.Thread(target=hub.serve_forever, daemon=True).start()
+            started.append(hub)
+        return started[-count:]
+
+    yield start
+    for hub in started:
+        hub.shutdown()
+        hub.server_close()
+
+
+def test_capabilities_are_rendered_from_template(hubs):
+    hub, = hubs()
+    launcher = SelenoidLauncher(hubs=[hub.url], templates=TEMPLATES, retries=0)
+    drivers = launcher.launch("chrome", count=2, version="120.0", suite="smoke",
+                              enable_video=True, video_name="run-{index}-{build}")
+    for driver in drivers:
+        launcher.quit(driver)
+
+    assert len(hub.capabilities) == 2
+    for capabilities in hub.capabilities:
+        assert capabilities["browserName"] == "chrome"
+        assert capabilities["browserVersion"] == "120.0"
+        assert capabilities["selenoid:options"]["enableVNC"] is True
+        assert capabilities["selenoid:options"]["name"] == "smoke"
+        # explicit argument overrides enableVideo of the template
+        assert capabilities["selenoid:options"]["enableVideo"] is True
+    assert sorted(c["selenoid:options"]["videoName"] for c in hub.capabilities) == \
+        ["run-0-{build}.mp4", "run-1-{build}.mp4"]
+    assert len(hub.deleted) == 2
+
+
+def test_template_keeps_video_setting_without_explicit_argument(hubs):
+    hub, = hubs()
+    launcher = SelenoidLauncher(hubs=[hub.url], templates=TEMPLATES, retries=0)
+    launcher.quit(launcher.launch_one("chrome", version="120.0", suite="smoke", video_name="run"))
+
+    assert hub.capabilities[0]["selenoid:options"]["enableVideo"] is False
+    assert "videoName" not in hub.capabilities[0]["selenoid:options"]
+
+
+def test_sessions_are_spread_across_hubs_in_parallel(hubs):
+    startup = 0.3
+    first, second = hubs(2, startup=startup)
+    launcher = SelenoidLauncher(hubs=[first.url, second.url], templates=TEMPLATES, retries=0)
+    start = time.perf_counter()
+    drivers = launcher.launch("chrome", count=4, version="120.0", suite="smoke")
+    elapsed = time.perf_counter() - start
+
+    assert len(first.capabilities) == len(second.capabilities) == 2
+    # four sessions are created at once, not one after another
+    assert elapsed < 4 * startup
+    stats = launcher.stats()
+    assert [hub.active for hub in stats] == [2, 2]
+    assert [hub.started for hub in stats] == [2, 2]
+    for hub in stats:
+        assert startup <= hub.mean_startup <= hub.max_startup
+    for driver in drivers:
+        launcher.quit(driver)
+    assert [hub.active for hub in launcher.stats()] == [0, 0]
+
+
+def test_failed_session_is_retried_on_another_hub(hubs):
+    busy, = hubs(failures=1)
+    free, = hubs()
+    launcher = SelenoidLauncher(hubs=[busy.url, free.url], templates=TEMPLATES, retries=1, backoff=0.01)
+    launcher.quit(launcher.launch_one("chrome", version="120.0", suite="smoke"))
+
+    busy_stats, free_stats = launcher.stats()
+    assert (busy_stats.failed, busy_stats.started) == (1, 0)
+    assert (free_stats.failed, free_stats.started) == (0, 1)
+
+
+def test_launch_raises_after_retries_are_exhausted(hubs):
+    hub, = hubs(failures=2)
+    launcher = SelenoidLauncher(hubs=[hub.url], templates=TEMPLATES, retries=1, backoff=0.01)
+    with pytest.raises(Exception, match="hub is busy"):
+        launcher.launch_one("chrome", version="120.0", suite="smoke")
+    assert launcher.stats()[0].failed == 2
+    assert launcher.stats()[0].active == 0
+
+
+def test_invalid_video_name_raises_value_error():
+    with pytest.raises(ValueError, match="video_name"):
+        render_video_name("run-{0}", {"index": 1})